@@ -4,6 +4,7 @@ from datetime import timedelta
 from typing import Dict, Generator, List, Optional, Set, Tuple
 
 import structlog
+from django.utils.timezone import now
 
 from ee.clickhouse.materialized_columns.columns import (
     DEFAULT_TABLE_COLUMN,
@@ -18,12 +19,14 @@ from ee.settings import (
     MATERIALIZE_COLUMNS_MINIMUM_QUERY_TIME,
 )
 from posthog.cache_utils import instance_memoize
+from posthog.clickhouse.property_access import get_property_costs
 from posthog.client import sync_execute
 from posthog.models.filters.mixins.utils import cached_property
 from posthog.models.person.sql import GET_EVENT_PROPERTIES_COUNT, GET_PERSON_PROPERTIES_COUNT
 from posthog.models.property import PropertyName, TableColumn, TableWithProperties
 from posthog.models.property_definition import PropertyDefinition
 from posthog.models.team import Team
+from posthog.settings import CLICKHOUSE_DATABASE
 
 Suggestion = Tuple[TableWithProperties, TableColumn, PropertyName, int]
 
@@ -162,6 +165,45 @@ def _analyze(queries: List[Query]) -> List[Suggestion]:
     ]
 
 
+def _analyze_property_costs(since_hours_ago: int) -> List[Suggestion]:
+    """
+    Suggests properties to materialize based on the property accesses recorded when slow queries were compiled.
+
+    Unlike `_analyze`, this knows exactly which table and column each property was extracted from. Costs are
+    recorded per team, but materialized columns are shared by all teams so they're added up here.
+    """
+    costs: defaultdict = defaultdict(int)
+    for (_, table, table_column, property_name), cost in get_property_costs(since_hours_ago).items():
+        costs[(table, table_column, property_name)] += cost
+
+    return [
+        (table, table_column, property_name, cost)
+        for (table, table_column, property_name), cost in sorted(costs.items(), key=lambda kv: -kv[1])
+    ]
+
+
+def estimate_backfill_bytes(table: TableWithProperties, table_column: TableColumn, backfill_period: timedelta) -> int:
+    "How much compressed JSON a backfill of a materialized column has to read, as a measure of how expensive it is"
+    rows = sync_execute(
+        """
+        SELECT sum(column_data_compressed_bytes)
+        FROM system.parts_columns
+        WHERE database = %(database)s
+          AND table = %(table)s
+          AND column = %(column)s
+          AND active
+          AND (%(table)s != 'sharded_events' OR max_date >= %(cutoff)s)
+        """,
+        {
+            "database": CLICKHOUSE_DATABASE,
+            "table": "sharded_events" if table == "events" else table,
+            "column": table_column,
+            "cutoff": (now() - backfill_period).strftime("%Y-%m-%d"),
+        },
+    )
+    return rows[0][0] if rows and rows[0][0] else 0
+
+
 def materialize_properties_task(
     columns_to_materialize: Optional[List[Suggestion]] = None,
     time_to_analyze_hours: int = MATERIALIZE_COLUMNS_ANALYSIS_PERIOD_HOURS,
@@ -171,11 +213,14 @@ def materialize_properties_task(
     dry_run: bool = False,
 ) -> None:
     """
-    Creates materialized columns for event and person properties based off of slow queries
+    Creates materialized columns for event, person and group properties based off of slow queries
     """
 
     if columns_to_materialize is None:
-        columns_to_materialize = _analyze(_get_queries(time_to_analyze_hours, min_query_time))
+        columns_to_materialize = _analyze_property_costs(time_to_analyze_hours)
+        if len(columns_to_materialize) == 0:
+            # Nothing has been recorded yet (e.g. right after upgrading), so fall back to parsing the query log
+            columns_to_materialize = _analyze(_get_queries(time_to_analyze_hours, min_query_time))
     result = []
     for suggestion in columns_to_materialize:
         table, table_column, property_name, _ = suggestion
@@ -187,9 +232,20 @@ def materialize_properties_task(
     else:
         logger.info("Found no columns to materialize.")
 
-    properties: Dict[TableWithProperties, List[Tuple[PropertyName, TableColumn]]] = {"events": [], "person": []}
+    properties: Dict[TableWithProperties, List[Tuple[PropertyName, TableColumn]]] = {
+        "events": [],
+        "person": [],
+        "groups": [],
+    }
     for table, table_column, property_name, cost in result[:maximum]:
-        logger.info(f"Materializing column. table={table}, property_name={property_name}, cost={cost}")
+        backfill_bytes = (
+            estimate_backfill_bytes(table, table_column, timedelta(days=backfill_period_days))
+            if backfill_period_days > 0
+            else 0
+        )
+        logger.info(
+            f"Materializing column. table={table}, table_column={table_column}, property_name={property_name}, cost={cost}, backfill_bytes={backfill_bytes}"
+        )
 
         if not dry_run:
             materialize(table, property_name, table_column=table_column)
@@ -199,3 +255,4 @@ def materialize_properties_task(
         logger.info(f"Starting backfill for new materialized columns. period_days={backfill_period_days}")
         backfill_materialized_columns("events", properties["events"], timedelta(days=backfill_period_days))
         backfill_materialized_columns("person", properties["person"], timedelta(days=backfill_period_days))
+        backfill_materialized_columns("groups", properties["groups"], timedelta(days=backfill_period_days))
@@ -1,5 +1,6 @@
-from ee.clickhouse.materialized_columns.analyze import Query, TeamManager
+from ee.clickhouse.materialized_columns.analyze import Query, TeamManager, _analyze_property_costs
 from posthog.clickhouse.kafka_engine import trim_quotes_expr
+from posthog.clickhouse.property_access import pop_property_accesses, record_property_access, record_property_costs
 from posthog.models import Person, PropertyDefinition
 from posthog.models.event.util import bulk_create_events
 from posthog.test.base import BaseTest, ClickhouseTestMixin
@@ -121,3 +122,27 @@ class TestMaterializedColumnsAnalyze(ClickhouseTestMixin, BaseTest):
             f"SELECT JSONExtractString(, 'prop') FROM events WHERE team_id = {self.team.pk}", 3340
         )
         self.assertEqual(list(query_with_invalid_column.properties(TeamManager())), [])
+
+    def test_analyze_recorded_property_costs(self):
+        with self.settings(MATERIALIZE_COLUMNS_MINIMUM_QUERY_TIME=3000):
+            record_property_access("events", "properties", "event_prop")
+            record_property_access("events", "group0_properties", "group_prop")
+            record_property_access("sessions", "properties", "ignored_prop")
+            record_property_costs(self.team.pk, pop_property_accesses(), 6723)
+
+            record_property_access("events", "properties", "event_prop")
+            record_property_access("groups", "group_properties", "industry")
+            record_property_costs(self.team.pk + 1, pop_property_accesses(), 3100)
+
+            # Fast queries aren't worth materializing for
+            record_property_access("person", "properties", "person_prop")
+            record_property_costs(self.team.pk, pop_property_accesses(), 100)
+
+        self.assertEqual(
+            _analyze_property_costs(24),
+            [
+                ("events", "properties", "event_prop", 5),
+                ("events", "group0_properties", "group_prop", 4),
+                ("groups", "group_properties", "industry", 1),
+            ],
+        )
@@ -629,6 +629,32 @@ class TestCohort(ClickhouseTestMixin, BaseTest):
         self.assertEqual(len(results), 1)
         self.assertEqual(results[0][0], p2.uuid)
 
+    def test_cohort_incremental_recalculation(self):
+        with freeze_time("2022-01-01"):
+            p1 = Person.objects.create(team_id=self.team.pk, distinct_ids=["1"], properties={"$some_prop": "something"})
+            p2 = Person.objects.create(team_id=self.team.pk, distinct_ids=["2"], properties={"$some_prop": "another"})
+            p3 = Person.objects.create(team_id=self.team.pk, distinct_ids=["3"], properties={"$some_prop": "something"})
+
+            cohort1 = Cohort.objects.create(
+                team=self.team,
+                groups=[{"properties": [{"key": "$some_prop", "value": "something", "type": "person"}]}],
+                name="cohort1",
+            )
+            cohort1.calculate_people_ch(pending_version=0)
+
+        with freeze_time("2022-01-02"):
+            p1.version = 1
+            p1.properties = {"$some_prop": "another"}
+            p1.save()
+            p2.version = 1
+            p2.properties = {"$some_prop": "something"}
+            p2.save()
+
+            cohort1.calculate_people_ch(pending_version=1, incremental=True)
+
+        results = self._get_cohortpeople(cohort1)
+        self.assertEqual(sorted(row[0] for row in results), sorted([p2.uuid, p3.uuid]))
+
     def test_static_cohort_precalculated(self):
         Person.objects.create(team_id=self.team.pk, distinct_ids=["1"])
         Person.objects.create(team_id=self.team.pk, distinct_ids=["123"])
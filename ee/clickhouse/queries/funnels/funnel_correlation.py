@@ -13,14 +13,14 @@ from typing import (
     cast,
 )
 
+import numpy as np
 from rest_framework.exceptions import ValidationError
 
 from ee.clickhouse.queries.column_optimizer import EnterpriseColumnOptimizer
 from ee.clickhouse.queries.groups_join_query import GroupsJoinQuery
 from posthog.clickhouse.materialized_columns import get_materialized_columns
 from posthog.constants import AUTOCAPTURE_EVENT, TREND_FILTER_TYPE_ACTIONS, FunnelCorrelationType
-from posthog.models.element.element import chain_to_elements
-from posthog.models.event.util import ElementSerializer
+from posthog.models.element.element import chain_to_element_dicts
 from posthog.models.filters import Filter
 from posthog.models.property.util import get_property_string_expr
 from posthog.models.team import Team
@@ -103,6 +103,7 @@ class FunnelCorrelation:
     MIN_PERSON_COUNT = 25
     MIN_PERSON_PERCENTAGE = 0.02
     PRIOR_COUNT = 1
+    MAX_RESULTS_PER_CORRELATION_TYPE = 10
 
     def __init__(
         self,
@@ -215,14 +216,7 @@ class FunnelCorrelation:
 
         event_join_query = self._get_events_join_query()
 
-        query = f"""
-            WITH
-                funnel_actors as ({funnel_persons_query}),
-                toDateTime(%(date_to)s, %(timezone)s) AS date_to,
-                toDateTime(%(date_from)s, %(timezone)s) AS date_from,
-                %(target_step)s AS target_step,
-                %(funnel_step_names)s as funnel_step_names
-
+        contingency_query = f"""
             SELECT
                 event.event AS name,
 
@@ -243,26 +237,18 @@ class FunnelCorrelation:
                 {event_join_query}
                 AND event.event NOT IN %(exclude_event_names)s
             GROUP BY name
+        """
 
-            -- To get the total success/failure numbers, we do an aggregation on
-            -- the funnel people CTE and count distinct actor_ids
-            UNION ALL
-
-            SELECT
-                -- We're not using WITH TOTALS because the resulting queries are
-                -- not runnable in Metabase
-                '{self.TOTAL_IDENTIFIER}' as name,
-
-                countDistinctIf(
-                    actors.actor_id,
-                    actors.steps = target_step
-                ) AS success_count,
+        query = f"""
+            WITH
+                funnel_actors as ({funnel_persons_query}),
+                toDateTime(%(date_to)s, %(timezone)s) AS date_to,
+                toDateTime(%(date_from)s, %(timezone)s) AS date_from,
+                %(target_step)s AS target_step,
+                %(funnel_step_names)s as funnel_step_names,
+                {self._get_totals_expression()} AS funnel_totals
 
-                countDistinctIf(
-                    actors.actor_id,
-                    actors.steps <> target_step
-                ) AS failure_count
-            FROM funnel_actors AS actors
+            {self._get_top_odds_ratios_query(contingency_query)}
         """
         params = {
             **funnel_persons_params,
@@ -296,14 +282,7 @@ class FunnelCorrelation:
                 arrayJoin(JSONExtractKeysAndValues(properties, 'String')) as prop
             """
 
-        query = f"""
-            WITH
-                funnel_actors as ({funnel_persons_query}),
-                toDateTime(%(date_to)s, %(timezone)s) AS date_to,
-                toDateTime(%(date_from)s, %(timezone)s) AS date_from,
-                %(target_step)s AS target_step,
-                %(funnel_step_names)s as funnel_step_names
-
+        contingency_query = f"""
             SELECT concat(event_name, '::', prop.1, '::', prop.2) as name,
                    countDistinctIf(actor_id, steps = target_step) as success_count,
                    countDistinctIf(actor_id, steps <> target_step) as failure_count
@@ -323,23 +302,18 @@ class FunnelCorrelation:
             -- This removes the long tail of random properties with empty, null, or very small values
             HAVING (success_count + failure_count) > 2
             AND prop.1 NOT IN %(exclude_property_names)s
+        """
 
-            UNION ALL
-            -- To get the total success/failure numbers, we do an aggregation on
-            -- the funnel people CTE and count distinct actor_ids
-            SELECT
-                '{self.TOTAL_IDENTIFIER}' as name,
-
-                countDistinctIf(
-                    actors.actor_id,
-                    actors.steps = target_step
-                ) AS success_count,
+        query = f"""
+            WITH
+                funnel_actors as ({funnel_persons_query}),
+                toDateTime(%(date_to)s, %(timezone)s) AS date_to,
+                toDateTime(%(date_from)s, %(timezone)s) AS date_from,
+                %(target_step)s AS target_step,
+                %(funnel_step_names)s as funnel_step_names,
+                {self._get_totals_expression()} AS funnel_totals
 
-                countDistinctIf(
-                    actors.actor_id,
-                    actors.steps <> target_step
-                ) AS failure_count
-            FROM funnel_actors AS actors
+            {self._get_top_odds_ratios_query(contingency_query)}
         """
         params = {
             **funnel_persons_params,
@@ -362,10 +336,7 @@ class FunnelCorrelation:
 
         aggregation_join_query, aggregation_join_params = self._get_aggregation_join_query()
 
-        query = f"""
-            WITH
-                funnel_actors as ({funnel_actors_query}),
-                %(target_step)s AS target_step
+        contingency_query = f"""
             SELECT
                 concat(prop.1, '::', prop.2) as name,
                 -- We generate a unique identifier for each property value as: PropertyName::Value
@@ -407,12 +378,15 @@ class FunnelCorrelation:
             -- Group by the tuple items: (property_name, property_value) generated by zip
             GROUP BY prop.1, prop.2
             HAVING prop.1 NOT IN %(exclude_property_names)s
-            UNION ALL
-            SELECT
-                '{self.TOTAL_IDENTIFIER}' as name,
-                countDistinctIf(actor_id, steps = target_step) AS success_count,
-                countDistinctIf(actor_id, steps <> target_step) AS failure_count
-            FROM funnel_actors
+        """
+
+        query = f"""
+            WITH
+                funnel_actors as ({funnel_actors_query}),
+                %(target_step)s AS target_step,
+                {self._get_totals_expression()} AS funnel_totals
+
+            {self._get_top_odds_ratios_query(contingency_query)}
         """
         params = {
             **funnel_actors_params,
@@ -425,6 +399,57 @@ class FunnelCorrelation:
 
         return query, params
 
+    def _get_totals_expression(self) -> str:
+        # To get the total success/failure numbers, we do an aggregation on
+        # the funnel actors CTE and count distinct actor_ids
+        return """(
+            SELECT tuple(
+                countDistinctIf(actor_id, steps = %(target_step)s),
+                countDistinctIf(actor_id, steps <> %(target_step)s)
+            )
+            FROM funnel_actors
+        )"""
+
+    def _get_top_odds_ratios_query(self, contingency_query: str) -> str:
+        """
+        Only returns the most correlated rows of the contingency table query for each correlation type, and then the
+        total success/failure numbers. There can be tens of thousands of rows for property correlations, most of
+        which would be discarded after being sent over the wire.
+
+        The odds ratio and significance are calculated the same as in `get_entity_odds_ratio` and
+        `are_results_insignificant`, which are then applied to the remaining rows.
+        """
+        prior = self.PRIOR_COUNT
+        return f"""
+            SELECT name, success_count, failure_count
+            FROM (
+                SELECT
+                    name,
+                    success_count,
+                    failure_count,
+                    toInt64(funnel_totals.1) AS success_total,
+                    toInt64(funnel_totals.2) AS failure_total,
+                    ((success_count + {prior}) * (failure_total - failure_count + {prior}))
+                        / ((success_total - success_count + {prior}) * (failure_count + {prior})) AS odds_ratio
+                FROM ({contingency_query})
+                WHERE success_count + failure_count >= least(
+                    {self.MIN_PERSON_COUNT}, {self.MIN_PERSON_PERCENTAGE} * (success_total + failure_total)
+                )
+                -- Most correlated first, for positive and negative correlations separately
+                ORDER BY if(odds_ratio > 1, -odds_ratio, odds_ratio), name
+                LIMIT {self.MAX_RESULTS_PER_CORRELATION_TYPE} BY odds_ratio > 1
+            )
+
+            UNION ALL
+
+            SELECT
+                -- We're not using WITH TOTALS because the resulting queries are
+                -- not runnable in Metabase
+                '{self.TOTAL_IDENTIFIER}' as name,
+                funnel_totals.1 AS success_count,
+                funnel_totals.2 AS failure_count
+        """
+
     def _get_aggregation_target_join_query(self) -> str:
 
         if self._team.person_on_events_mode == PersonOnEventsMode.V1_ENABLED:
@@ -654,26 +679,9 @@ class FunnelCorrelation:
         if success_total / failure_total > 10 or failure_total / success_total > 10:
             skewed_totals = True
 
-        odds_ratios = [
-            get_entity_odds_ratio(event_stats, FunnelCorrelation.PRIOR_COUNT)
-            for event_stats in event_contingency_tables
-            if not FunnelCorrelation.are_results_insignificant(event_stats)
-        ]
-
-        positively_correlated_events = sorted(
-            [odds_ratio for odds_ratio in odds_ratios if odds_ratio["correlation_type"] == "success"],
-            key=lambda x: x["odds_ratio"],
-            reverse=True,
+        events = get_top_odds_ratios(
+            event_contingency_tables, FunnelCorrelation.PRIOR_COUNT, FunnelCorrelation.MAX_RESULTS_PER_CORRELATION_TYPE
         )
-
-        negatively_correlated_events = sorted(
-            [odds_ratio for odds_ratio in odds_ratios if odds_ratio["correlation_type"] == "failure"],
-            key=lambda x: x["odds_ratio"],
-            reverse=False,
-        )
-
-        # Return the top ten positively correlated events, and top then negatively correlated events
-        events = positively_correlated_events[:10] + negatively_correlated_events[:10]
         return events, skewed_totals
 
     def construct_people_url(self, success: bool, event_definition: EventDefinition) -> Optional[str]:
@@ -878,7 +886,7 @@ class FunnelCorrelation:
             return EventDefinition(
                 event=event,
                 properties={self.AUTOCAPTURE_EVENT_TYPE: event_type},
-                elements=cast(list, ElementSerializer(chain_to_elements(elements_chain), many=True).data),
+                elements=[{"event": None, **element} for element in chain_to_element_dicts(elements_chain)],
             )
 
         return EventDefinition(event=event, properties={}, elements=[])
@@ -904,6 +912,52 @@ def get_entity_odds_ratio(event_contingency_table: EventContingencyTable, prior_
     )
 
 
+def get_top_odds_ratios(
+    event_contingency_tables: List[EventContingencyTable], prior_counts: int, limit: int
+) -> List[EventOddsRatio]:
+    """
+    Odds ratios of the significant contingency tables, calculated for all of them at once. Returns the `limit` most
+    positively correlated events, and then the `limit` most negatively correlated ones.
+    """
+    if not event_contingency_tables:
+        return []
+
+    counts = np.array(
+        [
+            (table.visited.success_count, table.visited.failure_count, table.success_total, table.failure_total)
+            for table in event_contingency_tables
+        ],
+        dtype=np.float64,
+    )
+    success_count, failure_count, success_total, failure_total = counts.T
+
+    # Same as `get_entity_odds_ratio`
+    odds_ratios = ((success_count + prior_counts) * (failure_total - failure_count + prior_counts)) / (
+        (success_total - success_count + prior_counts) * (failure_count + prior_counts)
+    )
+    # Same as `FunnelCorrelation.are_results_insignificant`
+    is_significant = success_count + failure_count >= np.minimum(
+        FunnelCorrelation.MIN_PERSON_COUNT, FunnelCorrelation.MIN_PERSON_PERCENTAGE * (success_total + failure_total)
+    )
+
+    (positive,) = np.nonzero(is_significant & (odds_ratios > 1))
+    (negative,) = np.nonzero(is_significant & (odds_ratios <= 1))
+    # Stable sorts, so that ties keep the order of the query results
+    top_positive = positive[np.argsort(-odds_ratios[positive], kind="stable")][:limit]
+    top_negative = negative[np.argsort(odds_ratios[negative], kind="stable")][:limit]
+
+    return [
+        EventOddsRatio(
+            event=event_contingency_tables[index].event,
+            success_count=event_contingency_tables[index].visited.success_count,
+            failure_count=event_contingency_tables[index].visited.failure_count,
+            odds_ratio=float(odds_ratios[index]),
+            correlation_type="success" if odds_ratios[index] > 1 else "failure",
+        )
+        for index in [*top_positive, *top_negative]
+    ]
+
+
 def build_selector(elements: List[Dict[str, Any]]) -> str:
     # build a CSS select given an "elements_chain"
     # NOTE: my source of what this should be doing is
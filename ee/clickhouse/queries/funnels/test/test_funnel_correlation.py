@@ -1,8 +1,15 @@
 import unittest
+from unittest.mock import patch
 
 from rest_framework.exceptions import ValidationError
 
-from ee.clickhouse.queries.funnels.funnel_correlation import EventContingencyTable, EventStats, FunnelCorrelation
+from ee.clickhouse.queries.funnels.funnel_correlation import (
+    EventContingencyTable,
+    EventStats,
+    FunnelCorrelation,
+    get_entity_odds_ratio,
+    get_top_odds_ratios,
+)
 from ee.clickhouse.queries.funnels.funnel_correlation_persons import FunnelCorrelationActors
 from posthog.constants import INSIGHT_FUNNELS
 from posthog.models.action import Action
@@ -1658,3 +1665,43 @@ class TestCorrelationFunctions(unittest.TestCase):
             if not FunnelCorrelation.are_results_insignificant(contingency_table)
         ]
         self.assertEqual(len(result), 0)
+
+    @patch.object(FunnelCorrelation, "MIN_PERSON_PERCENTAGE", 0.1)
+    @patch.object(FunnelCorrelation, "MIN_PERSON_COUNT", 3)
+    def test_get_top_odds_ratios(self):
+        contingency_tables = [
+            EventContingencyTable(
+                event=f"positively_related_{i}",
+                visited=EventStats(success_count=5 + i, failure_count=1),
+                success_total=20,
+                failure_total=20,
+            )
+            for i in range(12)
+        ] + [
+            EventContingencyTable(
+                event="negatively_related",
+                visited=EventStats(success_count=0, failure_count=5),
+                success_total=20,
+                failure_total=20,
+            ),
+            EventContingencyTable(
+                event="low_sig_negatively_related",
+                visited=EventStats(success_count=0, failure_count=2),
+                success_total=20,
+                failure_total=20,
+            ),
+        ]
+
+        result = get_top_odds_ratios(contingency_tables, prior_counts=1, limit=10)
+
+        self.assertEqual(
+            [odds_ratio["event"] for odds_ratio in result],
+            [f"positively_related_{i}" for i in range(11, 1, -1)] + ["negatively_related"],
+        )
+        self.assertEqual(
+            result,
+            [
+                get_entity_odds_ratio(contingency_table, prior_counts=1)
+                for contingency_table in [*reversed(contingency_tables[2:12]), contingency_tables[12]]
+            ],
+        )
@@ -2,7 +2,6 @@ import json
 from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Union
-from unittest.case import skip
 from unittest.mock import ANY
 
 import pytest
@@ -1190,7 +1189,6 @@ class ClickhouseTestTrendsCaching(ClickhouseTestMixin, LicensedTestMixin, APIBas
         assert data["$action"]["2012-01-14"].value == 0
         assert data["$action"]["2012-01-15"].value == 1
 
-    @skip("Don't handle breakdowns right now")
     def test_insight_trends_merging_breakdown(self):
         set_instance_setting("STRICT_CACHING_TEAMS", "all")
 
@@ -1270,7 +1268,6 @@ class ClickhouseTestTrendsCaching(ClickhouseTestMixin, LicensedTestMixin, APIBas
         assert data["$action - 2"]["2012-01-14"].value == 0
         assert data["$action - 2"]["2012-01-15"].value == 1
 
-    @skip("Don't handle breakdowns right now")
     def test_insight_trends_merging_breakdown_multiple(self):
         set_instance_setting("STRICT_CACHING_TEAMS", "all")
 
@@ -1389,7 +1386,7 @@ class ClickhouseTestTrendsCaching(ClickhouseTestMixin, LicensedTestMixin, APIBas
         assert data["$action - 2"]["2012-01-14"].value == 0
         assert data["$action - 2"]["2012-01-15"].value == 1
 
-    # When the latest time interval in the cached result doesn't match the current interval, do not use caching pattern
+    # Intervals settled since the cached result was calculated are queried along with the current one
     @snapshot_clickhouse_queries
     def test_insight_trends_merging_skipped_interval(self):
         set_instance_setting("STRICT_CACHING_TEAMS", "all")
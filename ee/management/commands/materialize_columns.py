@@ -20,7 +20,11 @@ class Command(BaseCommand):
 
         parser.add_argument("--property", help="Property to materialize. Skips analysis.")
         parser.add_argument(
-            "--property-table", type=str, default="events", choices=["events", "person"], help="Table of --property"
+            "--property-table",
+            type=str,
+            default="events",
+            choices=["events", "person", "groups"],
+            help="Table of --property",
         )
         parser.add_argument(
             "--table-column",
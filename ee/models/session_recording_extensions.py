@@ -1,8 +1,12 @@
 # EE extended functions for SessionRecording model
 
+import gzip
 import json
+import zlib
 from datetime import timedelta
-from typing import Optional
+from itertools import chain
+from time import perf_counter
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple, Union
 
 import structlog
 from django.utils import timezone
@@ -10,9 +14,15 @@ from sentry_sdk import capture_exception
 
 from posthog import settings
 from posthog.event_usage import report_team_action
-from posthog.models.session_recording.metadata import PersistedRecordingV1
+from posthog.models.session_recording.metadata import (
+    PersistedRecordingV1,
+    SessionRecordingEventSummary,
+    SnapshotData,
+    WindowId,
+)
 from posthog.models.session_recording.session_recording import SessionRecording
-from posthog.session_recordings.session_recording_helpers import compress_to_string, decompress
+from posthog.queries.session_recordings.session_recording_events import SessionRecordingEvents
+from posthog.session_recordings.session_recording_helpers import decompress, iterate_decompressed_snapshot_data
 from posthog.storage import object_storage
 
 logger = structlog.get_logger(__name__)
@@ -20,6 +30,13 @@ logger = structlog.get_logger(__name__)
 
 MINIMUM_AGE_FOR_RECORDING = timedelta(hours=24)
 
+PERSISTED_RECORDING_VERSION = "2022-12-22"
+
+# How many snapshot events are loaded from ClickHouse at a time while persisting a recording
+SNAPSHOTS_PAGE_SIZE = 1000
+
+GZIP_MAGIC_NUMBER = b"\x1f\x8b"
+
 
 def persist_recording(recording_id: str, team_id: int) -> None:
     """Persist a recording to the S3"""
@@ -65,28 +82,11 @@ def persist_recording(recording_id: str, team_id: int) -> None:
         recording.save()
         return
 
-    recording.load_snapshots(100_000)  # TODO: Paginate rather than hardcode a limit
-    analytics_payload["snapshots_load_time_ms"] = (
-        timezone.now() - start_time
-    ).total_seconds() * 1000 - analytics_payload["metadata_load_time_ms"]
-
-    content: PersistedRecordingV1 = {
-        "version": "2022-12-22",
-        "distinct_id": recording.distinct_id,
-        "snapshot_data_by_window_id": recording.snapshot_data_by_window_id,
-    }
-
-    # TODO: This is a hack workaround for datetime conversion
-    string_content = json.dumps(content, default=str)
-    analytics_payload["content_size_in_bytes"] = len(string_content.encode("utf-8"))
-    string_content = compress_to_string(string_content)
-    analytics_payload["compressed_size_in_bytes"] = len(string_content.encode("utf-8"))
-
     logger.info("Persisting recording: writing to S3...", recording_id=recording_id, team_id=team_id)
 
     try:
         object_path = recording.build_object_storage_path()
-        object_storage.write(object_path, string_content.encode("utf-8"))
+        object_storage.write_stream(object_path, _compressed_recording_content(recording, analytics_payload))
         recording.object_storage_path = object_path
         recording.save()
 
@@ -102,6 +102,87 @@ def persist_recording(recording_id: str, team_id: int) -> None:
         )
 
 
+def _compressed_recording_content(recording: SessionRecording, analytics_payload: Dict[str, Any]) -> Iterator[bytes]:
+    """
+    Page through the recording's snapshots, yielding them as gzipped JSON lines as they are loaded.
+
+    The first line holds the recording's details, every following one the snapshots of a single window, so the
+    snapshots of each window are in order when they are read back line by line.
+    """
+    snapshots = SessionRecordingEvents(
+        team=recording.team, session_recording_id=recording.session_id, recording_start_time=recording.start_time
+    ).iterate_snapshots(SNAPSHOTS_PAGE_SIZE)
+    lines = chain(
+        [{"version": PERSISTED_RECORDING_VERSION, "distinct_id": recording.distinct_id}],
+        ({"window_id": window_id, "data": data} for window_id, data in iterate_decompressed_snapshot_data(snapshots)),
+    )
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)  # gzip container
+
+    while True:
+        load_start = perf_counter()
+        line = next(lines, None)
+        analytics_payload["snapshots_load_time_ms"] += (perf_counter() - load_start) * 1000
+        if line is None:
+            break
+
+        # TODO: This is a hack workaround for datetime conversion
+        content = (json.dumps(line, default=str) + "\n").encode("utf-8")
+        analytics_payload["content_size_in_bytes"] += len(content)
+        compressed = compressor.compress(content)
+        if compressed:
+            analytics_payload["compressed_size_in_bytes"] += len(compressed)
+            yield compressed
+
+    compressed = compressor.flush()
+    analytics_payload["compressed_size_in_bytes"] += len(compressed)
+    yield compressed
+
+
+class _PrefixedStream:
+    """Puts bytes that have already been read from a stream back in front of it"""
+
+    def __init__(self, prefix: bytes, stream: IO[bytes]) -> None:
+        self._prefix = prefix
+        self._stream = stream
+
+    def read(self, size: int = -1) -> bytes:
+        if not self._prefix:
+            return self._stream.read(size) if size >= 0 else self._stream.read()
+        if size < 0:
+            content, self._prefix = self._prefix + self._stream.read(), b""
+            return content
+        content, self._prefix = self._prefix[:size], self._prefix[size:]
+        return content
+
+
+def _iterate_persisted_lines(stream: IO[bytes]) -> Iterator[Dict[str, Any]]:
+    prefix = stream.read(len(GZIP_MAGIC_NUMBER))
+
+    if prefix != GZIP_MAGIC_NUMBER:
+        # Recordings persisted before streaming are a single base64 encoded, gzipped JSON document
+        content: PersistedRecordingV1 = json.loads(decompress((prefix + stream.read()).decode("utf-8")))
+        yield {"version": content["version"], "distinct_id": content["distinct_id"]}
+        for window_id, data in content["snapshot_data_by_window_id"].items():
+            yield {"window_id": window_id, "data": data}
+        return
+
+    with gzip.GzipFile(fileobj=_PrefixedStream(prefix, stream), mode="rb") as lines:  # type: ignore
+        for line in lines:
+            yield json.loads(line)
+
+
+def stream_persisted_recording(recording: SessionRecording) -> Iterator[Tuple[WindowId, List[SnapshotData]]]:
+    """Stream the snapshots of a persisted recording from S3, without holding the whole recording in memory"""
+    stream = object_storage.read_stream(recording.object_storage_path)
+    if stream is None:
+        return
+
+    lines = _iterate_persisted_lines(stream)
+    next(lines)  # The recording's details
+    for line in lines:
+        yield line["window_id"], line["data"]
+
+
 def load_persisted_recording(recording: SessionRecording) -> Optional[PersistedRecordingV1]:
     """Load a persisted recording from S3"""
 
@@ -112,13 +193,25 @@ def load_persisted_recording(recording: SessionRecording) -> Optional[PersistedR
     )
 
     try:
-        content = object_storage.read(recording.object_storage_path)
-        decompressed = json.loads(decompress(content))
+        stream = object_storage.read_stream(recording.object_storage_path)
+        if stream is None:
+            return None
+
+        lines = _iterate_persisted_lines(stream)
+        details = next(lines)
+        snapshot_data_by_window_id: Dict[WindowId, List[Union[SnapshotData, SessionRecordingEventSummary]]] = {}
+        for line in lines:
+            snapshot_data_by_window_id.setdefault(line["window_id"], []).extend(line["data"])
+
         logger.info(
             "Persisting recording load: loaded!", recording_id=recording.session_id, path=recording.object_storage_path
         )
 
-        return decompressed
+        return {
+            "version": details["version"],
+            "distinct_id": details["distinct_id"],
+            "snapshot_data_by_window_id": snapshot_data_by_window_id,
+        }
     except object_storage.ObjectStorageError as ose:
         capture_exception(ose)
         logger.error(
@@ -1,22 +1,29 @@
+import json
 from datetime import timedelta
 from secrets import token_urlsafe
 from unittest.mock import patch
 
 from freezegun import freeze_time
 
-from ee.models.session_recording_extensions import load_persisted_recording, persist_recording
+from ee.models.session_recording_extensions import (
+    load_persisted_recording,
+    persist_recording,
+    stream_persisted_recording,
+)
 from posthog.models.session_recording.session_recording import SessionRecording
 from posthog.models.session_recording_playlist.session_recording_playlist import SessionRecordingPlaylist
 from posthog.models.session_recording_playlist_item.session_recording_playlist_item import SessionRecordingPlaylistItem
 from posthog.queries.session_recordings.test.session_replay_sql import produce_replay_summary
+from posthog.session_recordings.session_recording_helpers import compress_to_string
 from posthog.session_recordings.test.test_factory import create_session_recording_events
+from posthog.storage import object_storage
 from posthog.test.base import APIBaseTest, ClickhouseTestMixin
 
 long_url = f"https://app.posthog.com/my-url?token={token_urlsafe(600)}"
 
 
 class TestSessionRecordingExtensions(ClickhouseTestMixin, APIBaseTest):
-    def create_snapshot(self, session_id, timestamp):
+    def create_snapshot(self, session_id, timestamp, window_id="window_1", chunk_size=512 * 1024):
         team_id = self.team.pk
 
         snapshot = {
@@ -31,10 +38,19 @@ class TestSessionRecordingExtensions(ClickhouseTestMixin, APIBaseTest):
             distinct_id="distinct_id_1",
             timestamp=timestamp,
             session_id=session_id,
-            window_id="window_1",
+            window_id=window_id,
             snapshots=[snapshot],
+            chunk_size=chunk_size,
         )
 
+    def expected_snapshot(self, timestamp):
+        return {
+            "timestamp": timestamp.timestamp() * 1000,
+            "has_full_snapshot": 1,
+            "type": 2,
+            "data": {"source": 0, "href": long_url},
+        }
+
     def test_does_not_persist_too_recent_recording(self):
         recording = SessionRecording.objects.create(team=self.team, session_id="s1")
         self.create_snapshot(recording.session_id, recording.created_at)
@@ -125,3 +141,54 @@ class TestSessionRecordingExtensions(ClickhouseTestMixin, APIBaseTest):
             "compressed_size_in_bytes",
         ]:
             assert mock_capture.call_args_list[0][0][2][x] > 0
+
+    @patch("ee.models.session_recording_extensions.SNAPSHOTS_PAGE_SIZE", 2)
+    def test_persists_chunked_recording_spread_over_pages(self):
+        with freeze_time("2022-01-01T12:00:00Z"):
+            recording = SessionRecording.objects.create(team=self.team, session_id="s1")
+            first_timestamp = recording.created_at - timedelta(hours=48)
+            second_timestamp = recording.created_at - timedelta(hours=46)
+
+            # Every snapshot is split into several chunks, which are loaded in pages smaller than a snapshot
+            self.create_snapshot(recording.session_id, first_timestamp, window_id="window_1", chunk_size=100)
+            self.create_snapshot(recording.session_id, second_timestamp, window_id="window_2", chunk_size=100)
+
+            produce_replay_summary(
+                session_id=recording.session_id,
+                team_id=self.team.pk,
+                first_timestamp=first_timestamp.isoformat(),
+                last_timestamp=second_timestamp.isoformat(),
+                distinct_id="distinct_id_1",
+                first_url="https://app.posthog.com/my-url",
+            )
+
+        persist_recording(recording.session_id, recording.team_id)
+        recording.refresh_from_db()
+
+        assert load_persisted_recording(recording) == {
+            "version": "2022-12-22",
+            "distinct_id": "distinct_id_1",
+            "snapshot_data_by_window_id": {
+                "window_1": [self.expected_snapshot(first_timestamp)],
+                "window_2": [self.expected_snapshot(second_timestamp)],
+            },
+        }
+        assert list(stream_persisted_recording(recording)) == [
+            ("window_1", [self.expected_snapshot(first_timestamp)]),
+            ("window_2", [self.expected_snapshot(second_timestamp)]),
+        ]
+
+    def test_loads_recording_persisted_as_single_document(self):
+        recording = SessionRecording.objects.create(team=self.team, session_id="s1")
+        recording.object_storage_path = recording.build_object_storage_path()
+        content = {
+            "version": "2022-12-22",
+            "distinct_id": "distinct_id_1",
+            "snapshot_data_by_window_id": {"window_1": [{"type": 2, "data": {"source": 0}}]},
+        }
+
+        with self.settings(OBJECT_STORAGE_ENABLED=True):
+            object_storage.write(recording.object_storage_path, compress_to_string(json.dumps(content)).encode("utf-8"))
+
+            assert load_persisted_recording(recording) == content
+            assert list(stream_persisted_recording(recording)) == [("window_1", [{"type": 2, "data": {"source": 0}}])]
@@ -116,6 +116,13 @@ export interface DataNode extends Node {
     response?: Record<string, any>
 }
 
+export interface QueryTiming {
+    /** Key. Shortened to 'k' to save on data. */
+    k: string
+    /** Time in seconds. Shortened to 't' to save on data. */
+    t: number
+}
+
 export interface HogQLQueryResponse {
     query?: string
     hogql?: string
@@ -123,6 +130,8 @@ export interface HogQLQueryResponse {
     results?: any[]
     types?: any[]
     columns?: any[]
+    /** Measured timings for different parts of the query generation process */
+    timings?: QueryTiming[]
 }
 
 export interface HogQLQuery extends DataNode {
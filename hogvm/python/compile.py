@@ -0,0 +1,177 @@
+import re
+from dataclasses import dataclass
+from typing import List, Any, Dict, Callable, Optional, Iterable
+
+from hogvm.python.execute import HogVMException, call_function, compile_regex, get_nested_value, like
+from hogvm.python.operation import Operation, HOGQL_BYTECODE_IDENTIFIER, SUPPORTED_FUNCTIONS
+
+# An instruction takes the stack, the fields and the async operation callback, and updates the stack in place
+Instruction = Callable[[List[Any], Dict[str, Any], Optional[Callable[..., Any]]], None]
+
+
+@dataclass(frozen=True)
+class CompiledBytecode:
+    """Bytecode that has been decoded once into a flat list of instructions, with all operands already bound."""
+
+    instructions: List[Instruction]
+
+
+def _push(value: Any) -> Instruction:
+    def instruction(stack, fields, async_operation):
+        stack.append(value)
+
+    return instruction
+
+
+def _unary(func: Callable[[Any], Any]) -> Instruction:
+    def instruction(stack, fields, async_operation):
+        stack.append(func(stack.pop()))
+
+    return instruction
+
+
+def _binary(func: Callable[[Any, Any], Any]) -> Instruction:
+    # The first popped value (top of the stack) is the left hand side
+    def instruction(stack, fields, async_operation):
+        stack.append(func(stack.pop(), stack.pop()))
+
+    return instruction
+
+
+def _and(count: int) -> Instruction:
+    def instruction(stack, fields, async_operation):
+        stack.append(all([stack.pop() for _ in range(count)]))
+
+    return instruction
+
+
+def _or(count: int) -> Instruction:
+    def instruction(stack, fields, async_operation):
+        stack.append(any([stack.pop() for _ in range(count)]))
+
+    return instruction
+
+
+def _field(count: int) -> Instruction:
+    def instruction(stack, fields, async_operation):
+        chain = [stack.pop() for _ in range(count)]
+        stack.append(get_nested_value(fields, chain))
+
+    return instruction
+
+
+def _call(name: str, count: int) -> Instruction:
+    def instruction(stack, fields, async_operation):
+        args = [stack.pop() for _ in range(count)]
+        stack.append(call_function(name, args))
+
+    return instruction
+
+
+def _async(operation: Operation) -> Instruction:
+    def instruction(stack, fields, async_operation):
+        if async_operation is None:
+            raise HogVMException(f"HogVM async_operation {operation.name} not provided")
+        args = [operation, stack.pop(), stack.pop()]
+        stack.append(async_operation(*args))
+
+    return instruction
+
+
+# Jump table for all operations that take no operands from the bytecode
+SIMPLE_INSTRUCTIONS: Dict[Operation, Instruction] = {
+    Operation.TRUE: _push(True),
+    Operation.FALSE: _push(False),
+    Operation.NULL: _push(None),
+    Operation.NOT: _unary(lambda value: not value),
+    Operation.PLUS: _binary(lambda left, right: left + right),
+    Operation.MINUS: _binary(lambda left, right: left - right),
+    Operation.DIVIDE: _binary(lambda left, right: left / right),
+    Operation.MULTIPLY: _binary(lambda left, right: left * right),
+    Operation.MOD: _binary(lambda left, right: left % right),
+    Operation.EQ: _binary(lambda left, right: left == right),
+    Operation.NOT_EQ: _binary(lambda left, right: left != right),
+    Operation.GT: _binary(lambda left, right: left > right),
+    Operation.GT_EQ: _binary(lambda left, right: left >= right),
+    Operation.LT: _binary(lambda left, right: left < right),
+    Operation.LT_EQ: _binary(lambda left, right: left <= right),
+    Operation.LIKE: _binary(lambda string, pattern: like(string, pattern)),
+    Operation.ILIKE: _binary(lambda string, pattern: like(string, pattern, re.IGNORECASE)),
+    Operation.NOT_LIKE: _binary(lambda string, pattern: not like(string, pattern)),
+    Operation.NOT_ILIKE: _binary(lambda string, pattern: not like(string, pattern, re.IGNORECASE)),
+    Operation.IN: _binary(lambda left, right: left in right),
+    Operation.NOT_IN: _binary(lambda left, right: left not in right),
+    Operation.REGEX: _binary(lambda string, pattern: bool(compile_regex(pattern).search(string))),
+    Operation.NOT_REGEX: _binary(lambda string, pattern: not bool(compile_regex(pattern).search(string))),
+    Operation.IREGEX: _binary(
+        lambda string, pattern: bool(compile_regex(pattern, re.RegexFlag.IGNORECASE).search(string))
+    ),
+    Operation.NOT_IREGEX: _binary(
+        lambda string, pattern: not bool(compile_regex(pattern, re.RegexFlag.IGNORECASE).search(string))
+    ),
+    Operation.IN_COHORT: _async(Operation.IN_COHORT),
+    Operation.NOT_IN_COHORT: _async(Operation.NOT_IN_COHORT),
+}
+
+
+def compile_bytecode(bytecode: List[Any]) -> CompiledBytecode:
+    """Decode bytecode into a list of instructions, so that it can be executed many times without re-parsing it."""
+    iterator = iter(bytecode)
+    if next(iterator, None) != HOGQL_BYTECODE_IDENTIFIER:
+        raise HogVMException(f"Invalid bytecode. Must start with '{HOGQL_BYTECODE_IDENTIFIER}'")
+
+    def operand() -> Any:
+        try:
+            return next(iterator)
+        except StopIteration:
+            raise HogVMException("Unexpected end of bytecode")
+
+    instructions: List[Instruction] = []
+    while (symbol := next(iterator, None)) is not None:
+        if isinstance(symbol, str) and symbol in SIMPLE_INSTRUCTIONS:
+            instructions.append(SIMPLE_INSTRUCTIONS[symbol])
+            continue
+        match symbol:
+            case Operation.STRING | Operation.INTEGER | Operation.FLOAT:
+                instructions.append(_push(operand()))
+            case Operation.AND:
+                instructions.append(_and(operand()))
+            case Operation.OR:
+                instructions.append(_or(operand()))
+            case Operation.FIELD:
+                instructions.append(_field(operand()))
+            case Operation.CALL:
+                name = operand()
+                if name not in SUPPORTED_FUNCTIONS:
+                    raise HogVMException(f"Unsupported function call: {name}")
+                instructions.append(_call(name, operand()))
+            case _:
+                raise HogVMException(f"Unexpected node while running bytecode: {symbol}")
+
+    return CompiledBytecode(instructions=instructions)
+
+
+def execute_compiled(
+    program: CompiledBytecode, fields: Dict[str, Any], async_operation: Optional[Callable[..., Any]] = None
+) -> Any:
+    stack: List[Any] = []
+    try:
+        for instruction in program.instructions:
+            instruction(stack, fields, async_operation)
+
+        if len(stack) > 1:
+            raise HogVMException("Invalid bytecode. More than one value left on stack")
+
+        return stack.pop()
+    except IndexError:
+        raise HogVMException("Unexpected end of bytecode")
+
+
+def execute_bytecode_batch(
+    bytecode: List[Any] | CompiledBytecode,
+    fields_list: Iterable[Dict[str, Any]],
+    async_operation: Optional[Callable[..., Any]] = None,
+) -> List[Any]:
+    """Evaluate one program against many objects (e.g. events), compiling the bytecode only once."""
+    program = bytecode if isinstance(bytecode, CompiledBytecode) else compile_bytecode(bytecode)
+    return [execute_compiled(program, fields, async_operation) for fields in fields_list]
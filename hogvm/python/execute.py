@@ -1,4 +1,5 @@
 import re
+from functools import lru_cache
 from typing import List, Any, Dict, Callable, Optional
 
 from hogvm.python.operation import Operation, HOGQL_BYTECODE_IDENTIFIER
@@ -8,10 +9,22 @@ class HogVMException(Exception):
     pass
 
 
+# Filters are evaluated against many events with the same few patterns, so keep the compiled regexes around
+REGEX_CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=REGEX_CACHE_SIZE)
+def compile_regex(pattern: str, flags: int = 0) -> re.Pattern:
+    return re.compile(pattern, flags)
+
+
+@lru_cache(maxsize=REGEX_CACHE_SIZE)
+def compile_like(pattern: str, flags: int = 0) -> re.Pattern:
+    return re.compile(re.escape(pattern).replace("%", ".*"), flags)
+
+
 def like(string, pattern, flags=0):
-    pattern = re.escape(pattern).replace("%", ".*")
-    re_pattern = re.compile(pattern, flags)
-    return re_pattern.search(string) is not None
+    return compile_like(pattern, flags).search(string) is not None
 
 
 def get_nested_value(obj, chain) -> Any:
@@ -33,6 +46,29 @@ def to_concat_arg(arg) -> str:
     return str(arg)
 
 
+def call_function(name: str, args: List[Any]) -> Any:
+    if name == "concat":
+        return "".join([to_concat_arg(arg) for arg in args])
+    elif name == "match":
+        return bool(compile_regex(args[1]).search(args[0]))
+    elif name == "toString" or name == "toUUID":
+        if args[0] is True:
+            return "true"
+        elif args[0] is False:
+            return "false"
+        elif args[0] is None:
+            return "null"
+        else:
+            return str(args[0])
+    elif name == "toInt" or name == "toFloat":
+        try:
+            return int(args[0]) if name == "toInt" else float(args[0])
+        except ValueError:
+            return None
+    else:
+        raise HogVMException(f"Unsupported function call: {name}")
+
+
 def execute_bytecode(
     bytecode: List[Any], fields: Dict[str, Any], async_operation: Optional[Callable[..., Any]] = None
 ) -> Any:
@@ -108,42 +144,23 @@ def execute_bytecode(
                     stack.append(async_operation(*args))
                 case Operation.REGEX:
                     args = [stack.pop(), stack.pop()]
-                    stack.append(bool(re.search(re.compile(args[1]), args[0])))
+                    stack.append(bool(compile_regex(args[1]).search(args[0])))
                 case Operation.NOT_REGEX:
                     args = [stack.pop(), stack.pop()]
-                    stack.append(not bool(re.search(re.compile(args[1]), args[0])))
+                    stack.append(not bool(compile_regex(args[1]).search(args[0])))
                 case Operation.IREGEX:
                     args = [stack.pop(), stack.pop()]
-                    stack.append(bool(re.search(re.compile(args[1], re.RegexFlag.IGNORECASE), args[0])))
+                    stack.append(bool(compile_regex(args[1], re.RegexFlag.IGNORECASE).search(args[0])))
                 case Operation.NOT_IREGEX:
                     args = [stack.pop(), stack.pop()]
-                    stack.append(not bool(re.search(re.compile(args[1], re.RegexFlag.IGNORECASE), args[0])))
+                    stack.append(not bool(compile_regex(args[1], re.RegexFlag.IGNORECASE).search(args[0])))
                 case Operation.FIELD:
                     chain = [stack.pop() for _ in range(next(iterator))]
                     stack.append(get_nested_value(fields, chain))
                 case Operation.CALL:
                     name = next(iterator)
                     args = [stack.pop() for _ in range(next(iterator))]
-                    if name == "concat":
-                        stack.append("".join([to_concat_arg(arg) for arg in args]))
-                    elif name == "match":
-                        stack.append(bool(re.search(re.compile(args[1]), args[0])))
-                    elif name == "toString" or name == "toUUID":
-                        if args[0] is True:
-                            stack.append("true")
-                        elif args[0] is False:
-                            stack.append("false")
-                        elif args[0] is None:
-                            stack.append("null")
-                        else:
-                            stack.append(str(args[0]))
-                    elif name == "toInt" or name == "toFloat":
-                        try:
-                            stack.append(int(args[0]) if name == "toInt" else float(args[0]))
-                        except ValueError:
-                            stack.append(None)
-                    else:
-                        raise HogVMException(f"Unsupported function call: {name}")
+                    stack.append(call_function(name, args))
                 case _:
                     raise HogVMException(f"Unexpected node while running bytecode: {symbol}")
 
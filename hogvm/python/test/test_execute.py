@@ -1,6 +1,7 @@
 from typing import Any
 
-from hogvm.python.execute import execute_bytecode, get_nested_value
+from hogvm.python.compile import compile_bytecode, execute_bytecode_batch, execute_compiled
+from hogvm.python.execute import HogVMException, execute_bytecode, get_nested_value
 from hogvm.python.operation import Operation as op, HOGQL_BYTECODE_IDENTIFIER as _H
 from posthog.hogql.bytecode import create_bytecode
 from posthog.hogql.parser import parse_expr
@@ -131,3 +132,47 @@ class TestBytecodeExecute(BaseTest):
         self.assertEqual(
             execute_bytecode([_H, op.INTEGER, 2, op.STRING, "other_id", op.NOT_IN_COHORT], {}, async_operation), False
         )
+
+
+class TestCompiledBytecodeExecute(TestBytecodeExecute):
+    """Runs the same expressions through the compiled instruction path, which must match the reference VM."""
+
+    def _run(self, expr: str) -> Any:
+        fields = {
+            "properties": {"foo": "bar"},
+        }
+        return execute_compiled(compile_bytecode(create_bytecode(parse_expr(expr))), fields)
+
+    def test_compiled_errors(self):
+        with self.assertRaises(HogVMException) as e:
+            compile_bytecode([op.TRUE])
+        self.assertEqual(str(e.exception), "Invalid bytecode. Must start with '_h'")
+
+        with self.assertRaises(HogVMException) as e:
+            compile_bytecode([_H, op.TRUE, op.CALL, "notAFunction", 1])
+        self.assertEqual(str(e.exception), "Unsupported function call: notAFunction")
+
+        with self.assertRaises(HogVMException) as e:
+            compile_bytecode([_H, op.STRING])
+        self.assertEqual(str(e.exception), "Unexpected end of bytecode")
+
+        with self.assertRaises(HogVMException) as e:
+            execute_compiled(compile_bytecode([_H, op.CALL, "concat", 1]), {})
+        self.assertEqual(str(e.exception), "Unexpected end of bytecode")
+
+        with self.assertRaises(HogVMException) as e:
+            execute_compiled(compile_bytecode([_H, op.TRUE, op.TRUE, op.NOT]), {})
+        self.assertEqual(str(e.exception), "Invalid bytecode. More than one value left on stack")
+
+    def test_batch(self):
+        program = compile_bytecode(create_bytecode(parse_expr("properties.foo ilike '%BA%' and properties.num > 2")))
+        events = [
+            {"properties": {"foo": "bar", "num": 3}},
+            {"properties": {"foo": "bar", "num": 1}},
+            {"properties": {"foo": "baz", "num": 5}},
+            {"properties": {"foo": "qux", "num": 5}},
+        ]
+        self.assertEqual(execute_bytecode_batch(program, events), [True, False, True, False])
+        self.assertEqual(
+            execute_bytecode_batch(create_bytecode(parse_expr("properties.foo")), events), ["bar", "bar", "baz", "qux"]
+        )
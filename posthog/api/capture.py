@@ -1,6 +1,7 @@
 import hashlib
 import json
 import re
+import threading
 import time
 from datetime import datetime
 from random import random
@@ -12,7 +13,7 @@ from django.conf import settings
 from django.http import JsonResponse
 from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
-from kafka.errors import KafkaError, MessageSizeTooLargeError
+from kafka.errors import KafkaError, KafkaTimeoutError, MessageSizeTooLargeError
 from kafka.producer.future import FutureRecordMetadata
 from prometheus_client import Counter
 from rest_framework import status
@@ -24,6 +25,7 @@ from token_bucket import Limiter, MemoryStorage
 from posthog.api.utils import get_data, get_token, safe_clickhouse_string
 from posthog.exceptions import generate_exception_response
 from posthog.kafka_client.client import (
+    KafkaMessage,
     KafkaProducer,
     sessionRecordingKafkaProducer,
 )
@@ -86,6 +88,12 @@ TOKEN_SHAPE_INVALID_COUNTER = Counter(
     labelnames=["reason"],
 )
 
+KAFKA_UNCONFIRMED_PRODUCE_FAILURE_COUNTER = Counter(
+    "capture_kafka_unconfirmed_produce_failure_total",
+    "Events that failed to be produced to Kafka after capture had already responded, when running with CAPTURE_KAFKA_ACK_MODE=async.",
+    labelnames=["exception"],
+)
+
 # This is a heuristic of ids we have seen used as anonymous. As they frequently
 # have significantly more traffic than non-anonymous distinct_ids, and likely
 # don't refer to the same underlying person we prefer to partition them randomly
@@ -402,54 +410,56 @@ def get_event(request):
 
     with start_span(op="kafka.produce") as span:
         span.set_tag("event.count", len(processed_events))
-        for event, event_uuid, distinct_id in processed_events:
-            try:
-                futures.append(capture_internal(event, distinct_id, ip, site_url, now, sent_at, event_uuid, token))
-            except Exception as exc:
-                capture_exception(exc, {"data": data})
-                statsd.incr("posthog_cloud_raw_endpoint_failure", tags={"endpoint": "capture"})
-                logger.error("kafka_produce_failure", exc_info=exc)
-                return cors_response(
-                    request,
-                    generate_exception_response(
-                        "capture",
-                        "Unable to store event. Please try again. If you are the owner of this app you can check the logs for further details.",
-                        code="server_error",
-                        type="server_error",
-                        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                    ),
-                )
-
-    with start_span(op="kafka.wait"):
+        try:
+            if settings.CAPTURE_KAFKA_BATCH_PRODUCE:
+                futures = capture_batch_internal(processed_events, ip, site_url, now, sent_at, token)
+            else:
+                for event, event_uuid, distinct_id in processed_events:
+                    futures.append(capture_internal(event, distinct_id, ip, site_url, now, sent_at, event_uuid, token))
+        except Exception as exc:
+            capture_exception(exc, {"data": data})
+            statsd.incr("posthog_cloud_raw_endpoint_failure", tags={"endpoint": "capture"})
+            logger.error("kafka_produce_failure", exc_info=exc)
+            return cors_response(
+                request,
+                generate_exception_response(
+                    "capture",
+                    "Unable to store event. Please try again. If you are the owner of this app you can check the logs for further details.",
+                    code="server_error",
+                    type="server_error",
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                ),
+            )
+
+    with start_span(op="kafka.wait") as span:
         span.set_tag("future.count", len(futures))
-        start_time = time.monotonic()
-        for future in futures:
-            try:
-                future.get(timeout=settings.KAFKA_PRODUCE_ACK_TIMEOUT_SECONDS - (time.monotonic() - start_time))
-            except KafkaError as exc:
-                # TODO: distinguish between retriable errors and non-retriable
-                # errors, and set Retry-After header accordingly.
-                # TODO: return 400 error for non-retriable errors that require the
-                # client to change their request.
-
-                logger.error(
-                    "kafka_produce_failure",
-                    exc_info=exc,
-                    name=exc.__class__.__name__,
-                    # data could be large, so we don't always want to include it,
-                    # but we do want to include it for some errors to aid debugging
-                    data=data if isinstance(exc, MessageSizeTooLargeError) else None,
-                )
-                return cors_response(
-                    request,
-                    generate_exception_response(
-                        "capture",
-                        "Unable to store some events. Please try again. If you are the owner of this app you can check the logs for further details.",
-                        code="server_error",
-                        type="server_error",
-                        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                    ),
-                )
+        span.set_tag("ack.mode", settings.CAPTURE_KAFKA_ACK_MODE)
+        try:
+            wait_for_kafka_acks(futures)
+        except KafkaError as exc:
+            # TODO: distinguish between retriable errors and non-retriable
+            # errors, and set Retry-After header accordingly.
+            # TODO: return 400 error for non-retriable errors that require the
+            # client to change their request.
+
+            logger.error(
+                "kafka_produce_failure",
+                exc_info=exc,
+                name=exc.__class__.__name__,
+                # data could be large, so we don't always want to include it,
+                # but we do want to include it for some errors to aid debugging
+                data=data if isinstance(exc, MessageSizeTooLargeError) else None,
+            )
+            return cors_response(
+                request,
+                generate_exception_response(
+                    "capture",
+                    "Unable to store some events. Please try again. If you are the owner of this app you can check the logs for further details.",
+                    code="server_error",
+                    type="server_error",
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                ),
+            )
 
     try:
         if replay_events:
@@ -471,9 +481,7 @@ def get_event(request):
                 for event, event_uuid, distinct_id in processed_events:
                     futures.append(capture_internal(event, distinct_id, ip, site_url, now, sent_at, event_uuid, token))
 
-                start_time = time.monotonic()
-                for future in futures:
-                    future.get(timeout=settings.KAFKA_PRODUCE_ACK_TIMEOUT_SECONDS - (time.monotonic() - start_time))
+                wait_for_kafka_acks(futures)
 
     except Exception as exc:
         capture_exception(exc, {"data": data})
@@ -484,6 +492,73 @@ def get_event(request):
     return cors_response(request, JsonResponse({"status": 1}))
 
 
+def wait_for_kafka_acks(futures: List[FutureRecordMetadata]) -> None:
+    """Wait for Kafka to acknowledge the given produce futures, according to `CAPTURE_KAFKA_ACK_MODE`.
+
+    Raises the first `KafkaError` encountered, or a `KafkaTimeoutError` if the
+    futures did not all resolve within `KAFKA_PRODUCE_ACK_TIMEOUT_SECONDS`. In
+    "async" mode this never raises, failures are only counted and logged once
+    they happen.
+    """
+    timeout = settings.KAFKA_PRODUCE_ACK_TIMEOUT_SECONDS
+
+    if settings.CAPTURE_KAFKA_ACK_MODE == "async":
+        for future in futures:
+            future.add_errback(_on_unconfirmed_produce_failure)
+    elif settings.CAPTURE_KAFKA_ACK_MODE == "batch":
+        _wait_for_futures_batch(futures, timeout)
+    else:
+        start_time = time.monotonic()
+        for future in futures:
+            future.get(timeout=timeout - (time.monotonic() - start_time))
+
+
+def _on_unconfirmed_produce_failure(exc: Exception) -> None:
+    KAFKA_UNCONFIRMED_PRODUCE_FAILURE_COUNTER.labels(exception=exc.__class__.__name__).inc()
+    statsd.incr("capture_kafka_unconfirmed_produce_failure", tags={"exception": exc.__class__.__name__})
+    logger.error("kafka_unconfirmed_produce_failure", exc_info=exc, name=exc.__class__.__name__)
+
+
+def _wait_for_futures_batch(futures: List[FutureRecordMetadata], timeout: float) -> None:
+    """Wait on all futures at once with a single deadline.
+
+    Rather than blocking on each future in turn, we register callbacks on all of
+    them and wait on a single event that is set either when the last future
+    succeeds or as soon as any of them fails.
+    """
+    if not futures:
+        return
+
+    lock = threading.Lock()
+    all_done = threading.Event()
+    errors: List[Exception] = []
+    pending = len(futures)
+
+    def on_success(_: Any) -> None:
+        nonlocal pending
+        with lock:
+            pending -= 1
+            if pending == 0:
+                all_done.set()
+
+    def on_failure(exc: Exception) -> None:
+        with lock:
+            errors.append(exc)
+        all_done.set()
+
+    # NOTE: callbacks are called immediately for futures that are already
+    # resolved, so there is no race with futures completing before we get here.
+    for future in futures:
+        future.add_callback(on_success)
+        future.add_errback(on_failure)
+
+    if not all_done.wait(timeout):
+        raise KafkaTimeoutError(f"Timed out after {timeout} seconds waiting for {pending} events to be acknowledged")
+
+    if errors:
+        raise errors[0]
+
+
 def preprocess_events(events: List[Dict[str, Any]]) -> Iterator[Tuple[Dict[str, Any], UUIDT, str]]:
     for event in events:
         event_uuid = UUIDT()
@@ -519,6 +594,59 @@ def parse_event(event):
 
 
 def capture_internal(event, distinct_id, ip, site_url, now, sent_at, event_uuid=None, token=None):
+    parsed_event, kafka_partition_key = _build_kafka_event(
+        event, distinct_id, ip, site_url, now, sent_at, event_uuid, token
+    )
+    return log_event(parsed_event, event["event"], partition_key=kafka_partition_key)
+
+
+def capture_batch_internal(
+    events: List[Tuple[Dict[str, Any], UUIDT, str]],
+    ip: Optional[str],
+    site_url: str,
+    now: datetime,
+    sent_at: Optional[datetime],
+    token: str,
+) -> List[FutureRecordMetadata]:
+    """
+    Same as `capture_internal` for each of the events, but they are produced with a single `produce_batch` call per
+    producer, rather than one `produce` call per event.
+    """
+    messages: List[KafkaMessage] = []
+    session_recording_messages: List[KafkaMessage] = []
+    for event, event_uuid, distinct_id in events:
+        parsed_event, kafka_partition_key = _build_kafka_event(
+            event, distinct_id, ip, site_url, now, sent_at, event_uuid, token
+        )
+        message = KafkaMessage(
+            topic=_kafka_topic(event["event"], parsed_event), data=parsed_event, key=kafka_partition_key
+        )
+        if event["event"] in SESSION_RECORDING_DEDICATED_KAFKA_EVENTS:
+            session_recording_messages.append(message)
+        else:
+            messages.append(message)
+
+    futures: List[FutureRecordMetadata] = []
+    try:
+        if messages:
+            futures.extend(KafkaProducer().produce_batch(messages))
+        if session_recording_messages:
+            futures.extend(sessionRecordingKafkaProducer().produce_batch(session_recording_messages))
+    except Exception as e:
+        statsd.incr("capture_endpoint_log_event_error")
+        logger.exception("Failed to produce a batch of %s events to Kafka with error", len(events))
+        raise e
+
+    statsd.incr("posthog_cloud_plugin_server_ingestion", len(futures))
+    return futures
+
+
+def _build_kafka_event(
+    event, distinct_id, ip, site_url, now, sent_at, event_uuid=None, token=None
+) -> Tuple[Dict, Optional[str]]:
+    """
+    Build the data of an event as it's produced to Kafka, and the key it's partitioned by
+    """
     if event_uuid is None:
         event_uuid = UUIDT()
 
@@ -543,7 +671,7 @@ def capture_internal(event, distinct_id, ip, site_url, now, sent_at, event_uuid=
         # we only set the partition key for snapshot events.
         if event["event"] == "$snapshot":
             kafka_partition_key = event["properties"]["$session_id"]
-        return log_event(parsed_event, event["event"], partition_key=kafka_partition_key)
+        return parsed_event, kafka_partition_key
 
     candidate_partition_key = f"{token}:{distinct_id}"
 
@@ -554,7 +682,7 @@ def capture_internal(event, distinct_id, ip, site_url, now, sent_at, event_uuid=
     ):
         kafka_partition_key = hashlib.sha256(candidate_partition_key.encode()).hexdigest()
 
-    return log_event(parsed_event, event["event"], partition_key=kafka_partition_key)
+    return parsed_event, kafka_partition_key
 
 
 def is_randomly_partitioned(candidate_partition_key: str) -> bool:
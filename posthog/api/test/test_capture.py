@@ -1,5 +1,6 @@
 import base64
 import gzip
+import hashlib
 import json
 import pathlib
 import random
@@ -18,7 +19,7 @@ import structlog
 from django.test.client import Client
 from django.utils import timezone
 from freezegun import freeze_time
-from kafka.errors import KafkaError
+from kafka.errors import KafkaError, KafkaTimeoutError
 from kafka.producer.future import FutureProduceResult, FutureRecordMetadata
 from kafka.structs import TopicPartition
 from prance import ResolvingParser
@@ -33,7 +34,7 @@ from posthog.api.capture import (
 )
 from posthog.api.test.mock_sentry import mock_sentry_context_for_tagging
 from posthog.api.test.openapi_validation import validate_response
-from posthog.kafka_client.client import KafkaProducer, sessionRecordingKafkaProducer
+from posthog.kafka_client.client import KafkaProducer, KafkaProducerForTests, sessionRecordingKafkaProducer
 from posthog.kafka_client.topics import (
     KAFKA_EVENTS_PLUGIN_INGESTION_HISTORICAL,
     KAFKA_SESSION_RECORDING_EVENTS,
@@ -296,6 +297,60 @@ class TestCapture(BaseTest):
         response = self.client.get("/e/?data=%s" % quote(self._to_json(data)), HTTP_ORIGIN="https://localhost")
         self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
 
+    def _failed_produce_future(self) -> FutureRecordMetadata:
+        produce_future = FutureProduceResult(topic_partition=TopicPartition(KAFKA_EVENTS_PLUGIN_INGESTION_TOPIC, 1))
+        future = FutureRecordMetadata(
+            produce_future=produce_future,
+            relative_offset=0,
+            timestamp_ms=0,
+            checksum=0,
+            serialized_key_size=0,
+            serialized_value_size=0,
+            serialized_header_size=0,
+        )
+        future.failure(KafkaError("Failed to produce"))
+        return future
+
+    @patch("posthog.kafka_client.client._KafkaProducer.produce")
+    def test_capture_events_503_on_kafka_produce_errors_in_batch_ack_mode(self, kafka_produce):
+        kafka_produce.return_value = self._failed_produce_future()
+        data = {"event": "some_event", "properties": {"distinct_id": 2, "token": self.team.api_token}}
+
+        with self.settings(CAPTURE_KAFKA_ACK_MODE="batch"):
+            response = self.client.get("/e/?data=%s" % quote(self._to_json(data)), HTTP_ORIGIN="https://localhost")
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    @patch("posthog.kafka_client.client._KafkaProducer.produce")
+    def test_capture_events_200_on_kafka_produce_errors_in_async_ack_mode(self, kafka_produce):
+        kafka_produce.return_value = self._failed_produce_future()
+        data = {"event": "some_event", "properties": {"distinct_id": 2, "token": self.team.api_token}}
+
+        failures_before = capture.KAFKA_UNCONFIRMED_PRODUCE_FAILURE_COUNTER.labels(exception="KafkaError")._value.get()
+        with self.settings(CAPTURE_KAFKA_ACK_MODE="async"):
+            response = self.client.get("/e/?data=%s" % quote(self._to_json(data)), HTTP_ORIGIN="https://localhost")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            capture.KAFKA_UNCONFIRMED_PRODUCE_FAILURE_COUNTER.labels(exception="KafkaError")._value.get(),
+            failures_before + 1,
+        )
+
+    def test_batch_ack_mode_times_out_on_pending_futures(self):
+        pending_future = FutureRecordMetadata(
+            produce_future=FutureProduceResult(topic_partition=TopicPartition(KAFKA_EVENTS_PLUGIN_INGESTION_TOPIC, 1)),
+            relative_offset=0,
+            timestamp_ms=0,
+            checksum=0,
+            serialized_key_size=0,
+            serialized_value_size=0,
+            serialized_header_size=0,
+        )
+
+        with self.settings(CAPTURE_KAFKA_ACK_MODE="batch", KAFKA_PRODUCE_ACK_TIMEOUT_SECONDS=0.01):
+            with self.assertRaises(KafkaTimeoutError):
+                capture.wait_for_kafka_acks([pending_future])
+
     @patch("posthog.kafka_client.client._KafkaProducer.produce")
     def test_capture_event_ip(self, kafka_produce):
         data = {"event": "some_event", "properties": {"distinct_id": 2, "token": self.team.api_token}}
@@ -418,6 +473,34 @@ class TestCapture(BaseTest):
 
         validate_response(openapi_spec, response)
 
+    @patch("posthog.kafka_client.client._KafkaProducer.produce")
+    @patch("posthog.kafka_client.client._KafkaProducer.produce_batch")
+    def test_multiple_events_with_batch_produce(self, kafka_produce_batch, kafka_produce):
+        kafka_produce_batch.side_effect = lambda messages: [
+            KafkaProducerForTests().send(message.topic, message.data) for message in messages
+        ]
+        with self.settings(CAPTURE_KAFKA_BATCH_PRODUCE=True):
+            response = self.client.post(
+                "/batch/",
+                data={
+                    "data": json.dumps(
+                        [
+                            {"event": "beep", "properties": {"distinct_id": "eeee", "token": self.team.api_token}},
+                            {"event": "boop", "properties": {"distinct_id": "aaaa", "token": self.team.api_token}},
+                        ]
+                    ),
+                    "api_key": self.team.api_token,
+                },
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(kafka_produce.call_count, 0)
+        self.assertEqual(kafka_produce_batch.call_count, 1)
+        messages = kafka_produce_batch.call_args[0][0]
+        self.assertEqual([json.loads(message.data["data"])["event"] for message in messages], ["beep", "boop"])
+        self.assertEqual([message.topic for message in messages], [KAFKA_EVENTS_PLUGIN_INGESTION_TOPIC] * 2)
+        self.assertEqual(messages[0].key, hashlib.sha256(f"{self.team.api_token}:eeee".encode()).hexdigest())
+
     @patch("posthog.kafka_client.client._KafkaProducer.produce")
     def test_drops_performance_events(self, kafka_produce):
         self.client.post(
@@ -12,6 +12,8 @@ from rest_framework import status
 
 from posthog.models import Action, ActionStep, Element, Organization, Person, User
 from posthog.models.cohort import Cohort
+from posthog.queries.insight import insight_sync_execute
+from posthog.queries.property_values import get_indexed_property_values_for_key
 from posthog.test.base import (
     APIBaseTest,
     ClickhouseTestMixin,
@@ -250,6 +252,67 @@ class TestEvents(ClickhouseTestMixin, APIBaseTest):
             ).json()
             self.assertEqual(response, [])
 
+    def test_event_property_values_from_index(self):
+        with freeze_time("2020-01-20 20:00:00"):
+            for _ in range(3):
+                _create_event(distinct_id="bla", event="random event", team=self.team, properties={"plan": "free"})
+            _create_event(distinct_id="bla", event="random event", team=self.team, properties={"plan": "paid"})
+            _create_event(distinct_id="bla", event="other event", team=self.team, properties={"plan": "enterprise"})
+            # Outside of the date range
+            _create_event(
+                distinct_id="bla",
+                event="random event",
+                team=self.team,
+                properties={"plan": "old"},
+                timestamp="2020-01-01",
+            )
+            _create_event(
+                distinct_id="bla",
+                event="random event",
+                team=self.team,
+                properties={"plan": "new"},
+                timestamp="2020-01-25",
+            )
+            flush_persons_and_events()
+
+            with patch(
+                "posthog.queries.property_values.get_indexed_property_values_for_key",
+                wraps=get_indexed_property_values_for_key,
+            ) as get_indexed_values:
+                response = self.client.get(f"/api/projects/{self.team.id}/events/values/?key=plan").json()
+                get_indexed_values.assert_called_once()
+
+            # Most common values first
+            self.assertEqual(response[0]["name"], "free")
+            self.assertCountEqual([value["name"] for value in response], ["free", "enterprise", "paid"])
+
+            response = self.client.get(
+                f"/api/projects/{self.team.id}/events/values/?key=plan&event_name=random event"
+            ).json()
+            self.assertEqual([value["name"] for value in response], ["free", "paid"])
+
+            response = self.client.get(f"/api/projects/{self.team.id}/events/values/?key=plan&value=PA").json()
+            self.assertEqual([value["name"] for value in response], ["paid"])
+
+            # The index holds all values of the property, so events aren't scanned when none of them match
+            with patch("posthog.queries.property_values.insight_sync_execute", wraps=insight_sync_execute) as execute:
+                response = self.client.get(f"/api/projects/{self.team.id}/events/values/?key=plan&value=xyz").json()
+                self.assertEqual(execute.call_count, 1)
+            self.assertEqual(response, [])
+
+    def test_event_property_values_too_long_to_be_indexed(self):
+        long_value = "a" * 300 + "needle"
+        with freeze_time("2020-01-20 20:00:00"):
+            _create_event(distinct_id="bla", event="random event", team=self.team, properties={"text": "short"})
+            _create_event(distinct_id="bla", event="random event", team=self.team, properties={"text": long_value})
+            flush_persons_and_events()
+
+            response = self.client.get(f"/api/projects/{self.team.id}/events/values/?key=text").json()
+            self.assertEqual([value["name"] for value in response], ["short"])
+
+            response = self.client.get(f"/api/projects/{self.team.id}/events/values/?key=text&value=needle").json()
+            self.assertEqual([value["name"] for value in response], [long_value])
+
     def test_before_and_after(self):
         user = self._create_user("tim")
         self.client.force_login(user)
@@ -0,0 +1,55 @@
+from datetime import timedelta
+from functools import cached_property
+
+from django.utils import timezone
+
+from posthog.async_migrations.definition import AsyncMigrationDefinition, AsyncMigrationOperationSQL
+from posthog.client import sync_execute
+from posthog.constants import AnalyticsDBMS
+from posthog.models.event_property_values.sql import (
+    BACKFILL_EVENT_PROPERTY_VALUES_SQL,
+    EVENT_PROPERTY_VALUES_BACKFILL_DAYS,
+)
+from posthog.version_requirement import ServiceVersionRequirement
+
+
+class Migration(AsyncMigrationDefinition):
+    description = "Index the property values of recent events which were ingested before the event property values index existed, so their values are suggested in property filters."
+
+    depends_on = "0010_move_old_partitions"
+    posthog_min_version = "1.43.0"
+    posthog_max_version = "1.49.99"
+
+    service_version_requirements = [ServiceVersionRequirement(service="clickhouse", supported_version=">=22.3.0")]
+
+    def is_required(self) -> bool:
+        # The materialized view indexes new events, so only days before the first indexed one can be missing
+        today = timezone.now().date()
+        rows = sync_execute(
+            """
+            SELECT 1 FROM events
+            WHERE timestamp >= %(date_from)s
+            AND toDate(timestamp) < (SELECT ifNull(minOrNull(day), toDate(%(tomorrow)s)) FROM event_property_values)
+            LIMIT 1
+            """,
+            {
+                "date_from": (today - timedelta(days=EVENT_PROPERTY_VALUES_BACKFILL_DAYS)).isoformat(),
+                "tomorrow": (today + timedelta(days=1)).isoformat(),
+            },
+        )
+        return len(rows) > 0
+
+    @cached_property
+    def operations(self):
+        # A day at a time, so each insert only aggregates a day of events. Values of events ingested since the
+        # materialized view was created are counted twice, which only affects the order they're suggested in
+        today = timezone.now().date()
+        return [
+            AsyncMigrationOperationSQL(
+                database=AnalyticsDBMS.CLICKHOUSE,
+                sql=BACKFILL_EVENT_PROPERTY_VALUES_SQL(day=(today - timedelta(days=days_ago)).isoformat()),
+                rollback=None,
+                per_shard=True,
+            )
+            for days_ago in range(EVENT_PROPERTY_VALUES_BACKFILL_DAYS, -1, -1)
+        ]
@@ -0,0 +1,58 @@
+import pytest
+from freezegun import freeze_time
+
+from posthog.async_migrations.runner import start_async_migration
+from posthog.async_migrations.setup import get_async_migration_definition, setup_async_migrations
+from posthog.async_migrations.test.util import AsyncMigrationBaseTest
+from posthog.client import sync_execute
+from posthog.models.event.util import create_event
+from posthog.models.event_property_values.sql import TRUNCATE_EVENT_PROPERTY_VALUES_TABLE_SQL
+from posthog.models.utils import UUIDT
+from posthog.queries.property_values import get_indexed_property_values_for_key
+
+pytestmark = pytest.mark.async_migrations
+
+MIGRATION_NAME = "0011_backfill_event_property_values"
+
+MIGRATION_DEFINITION = get_async_migration_definition(MIGRATION_NAME)
+
+
+def run_migration():
+    setup_async_migrations(ignore_posthog_version=True)
+    return start_async_migration(MIGRATION_NAME, ignore_posthog_version=True)
+
+
+@freeze_time("2023-05-10T12:00:00Z")
+class Test0011BackfillEventPropertyValues(AsyncMigrationBaseTest):
+    def setUp(self):
+        super().setUp()
+        for timestamp, plan in [
+            ("2023-04-01T00:00:00Z", "too old"),
+            ("2023-05-04T00:00:00Z", "free"),
+            ("2023-05-09T00:00:00Z", "free"),
+            ("2023-05-10T00:00:00Z", "paid"),
+        ]:
+            create_event(
+                event_uuid=UUIDT(),
+                team=self.team,
+                distinct_id="1",
+                event="$pageview",
+                timestamp=timestamp,
+                properties={"plan": plan},
+            )
+        # As if the events had been ingested before the materialized view existed
+        sync_execute(TRUNCATE_EVENT_PROPERTY_VALUES_TABLE_SQL())
+
+    def test_is_required(self):
+        self.assertTrue(MIGRATION_DEFINITION.is_required())
+
+    def test_completes_successfully(self):
+        self.assertTrue(run_migration())
+
+        # A day at a time, from 7 days ago up to today
+        self.assertEqual(len(MIGRATION_DEFINITION.operations), 8)
+        self.assertIn("toDate(timestamp) = '2023-05-03'", MIGRATION_DEFINITION.operations[0].sql)  # type: ignore
+        self.assertIn("toDate(timestamp) = '2023-05-10'", MIGRATION_DEFINITION.operations[-1].sql)  # type: ignore
+
+        self.assertEqual(get_indexed_property_values_for_key("plan", self.team), [("free",), ("paid",)])
+        self.assertFalse(MIGRATION_DEFINITION.is_required())
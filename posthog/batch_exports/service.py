@@ -38,10 +38,14 @@ class S3BatchExportInputs:
         batch_window_size: The size in seconds of the batch window.
             For example, for one hour batches, this should be 3600.
         team_id: The team_id whose data we are exporting.
-        file_format: The format of the file to be created in S3, supported by ClickHouse.
-            A list of all supported formats can be found in https://clickhouse.com/docs/en/interfaces/formats.
         data_interval_end: For manual runs, the end date of the batch. This should be set to `None` for regularly
             scheduled runs and for backfills.
+        file_format: The format of the file to be created in S3, either "JSONLines" or "Parquet".
+        compression: The compression codec to use. JSONLines supports "gzip", and Parquet "snappy" (the default),
+            "zstd", "gzip", "brotli", "lz4" or "none".
+        row_group_size: For Parquet, the number of rows in each row group.
+        parallelism: The number of sub-ranges to split the batch window into. Sub-ranges are exported
+            concurrently, each one to its own file.
     """
 
     bucket_name: str
@@ -53,6 +57,10 @@ class S3BatchExportInputs:
     aws_access_key_id: str | None = None
     aws_secret_access_key: str | None = None
     data_interval_end: str | None = None
+    file_format: str = "JSONLines"
+    compression: str | None = None
+    row_group_size: int | None = None
+    parallelism: int = 1
 
 
 @dataclass
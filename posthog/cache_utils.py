@@ -1,12 +1,24 @@
 import threading
+from collections import OrderedDict
 from datetime import timedelta
 from functools import wraps
-from typing import no_type_check
+from time import monotonic
+from typing import Any, Callable, Optional, Tuple, no_type_check
+from uuid import uuid4
 
+from django.conf import settings
+from django.core.cache import cache
 from django.utils.timezone import now
+from prometheus_client import Counter
 
 from posthog.settings import TEST
 
+LOCAL_CACHE_READ_COUNTER = Counter(
+    "posthog_local_cache_read_total",
+    "Reads from the in-process cache tier in front of Redis, per cache and result (hit, revalidated or miss).",
+    labelnames=["cache", "result"],
+)
+
 
 def cache_for(cache_time: timedelta, background_refresh=False):
     def wrapper(fn):
@@ -61,3 +73,77 @@ def instance_memoize(callback):
         return memo[args]
 
     return _inner
+
+
+class LocalCache:
+    """
+    A bounded, per-process cache tier in front of Redis for hot lookups (e.g. teams by token).
+
+    Entries are served from memory for `LOCAL_CACHE_TTL_SECONDS`. After that, the version stored next to the
+    entry in Redis is compared with the local one, and the value is only reloaded if the version changed.
+    Writers call `bump_version` whenever they update the underlying Redis entry, so other processes see
+    the change at most one TTL later, and the writing process sees it immediately.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._entries: "OrderedDict[str, Tuple[float, Optional[str], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _version_key(self, key: str) -> str:
+        return f"local_cache_version:{self.name}:{key}"
+
+    def _get_version(self, key: str) -> Optional[str]:
+        try:
+            return cache.get(self._version_key(key))
+        except Exception:
+            # redis is unavailable
+            return None
+
+    def _store(self, key: str, version: Optional[str], value: Any, expires_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (expires_at, version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.LOCAL_CACHE_MAX_SIZE:
+                self._entries.popitem(last=False)
+
+    def get(self, key: str, load: Callable[[], Any]) -> Any:
+        """Return the value for `key`, calling `load` to fetch it from Redis if there is no fresh local copy."""
+        ttl = settings.LOCAL_CACHE_TTL_SECONDS
+        if ttl <= 0:
+            return load()
+
+        current_time = monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+
+        if entry is not None:
+            expires_at, version, value = entry
+            if current_time < expires_at:
+                LOCAL_CACHE_READ_COUNTER.labels(cache=self.name, result="hit").inc()
+                return value
+            if version is not None and self._get_version(key) == version:
+                LOCAL_CACHE_READ_COUNTER.labels(cache=self.name, result="revalidated").inc()
+                self._store(key, version, value, current_time + ttl)
+                return value
+
+        LOCAL_CACHE_READ_COUNTER.labels(cache=self.name, result="miss").inc()
+        # Read the version before the value, so that a write racing with us is picked up on the next revalidation
+        version = self._get_version(key)
+        value = load()
+        if value is not None:
+            self._store(key, version, value, current_time + ttl)
+        return value
+
+    def bump_version(self, key: str, timeout: Optional[int] = None) -> None:
+        """Mark the Redis entry for `key` as changed, invalidating local copies in every process."""
+        self.invalidate(key)
+        cache.set(self._version_key(key), uuid4().hex, timeout)
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
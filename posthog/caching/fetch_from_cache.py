@@ -5,10 +5,16 @@ from typing import Any, Optional, Union
 from django.utils.timezone import now
 from prometheus_client import Counter
 
-from posthog.caching.calculate_results import calculate_cache_key, calculate_result_by_insight
+from posthog.caching.calculate_results import (
+    CLICKHOUSE_MAX_EXECUTION_TIME,
+    calculate_cache_key,
+    calculate_result_by_insight,
+)
 from posthog.caching.insight_cache import update_cached_state
+from posthog.caching.single_flight import run_single_flight
 from posthog.models import DashboardTile, Insight
 from posthog.models.dashboard import Dashboard
+from posthog.models.insight import generate_insight_cache_key
 from posthog.utils import get_safe_cache
 
 insight_cache_read_counter = Counter(
@@ -48,6 +54,10 @@ def fetch_cached_insight_result(target: Union[Insight, DashboardTile], refresh_f
     if cache_key is None:
         return NothingInCacheResult(cache_key=None)
 
+    return _fetch_cached_result(cache_key, refresh_frequency)
+
+
+def _fetch_cached_result(cache_key: str, refresh_frequency: Optional[timedelta]) -> InsightResult:
     cached_result = get_safe_cache(cache_key)
 
     if cached_result is None:
@@ -56,8 +66,8 @@ def fetch_cached_insight_result(target: Union[Insight, DashboardTile], refresh_f
     else:
         insight_cache_read_counter.labels("cache_hit").inc()
         last_refresh = cached_result.get("last_refresh")
-        next_allowed_client_refresh = (
-            cached_result.get("next_allowed_client_refresh") or last_refresh + refresh_frequency
+        next_allowed_client_refresh = cached_result.get("next_allowed_client_refresh") or (
+            last_refresh + refresh_frequency if refresh_frequency else None
         )
 
         return InsightResult(
@@ -73,6 +83,24 @@ def fetch_cached_insight_result(target: Union[Insight, DashboardTile], refresh_f
 
 def synchronously_update_cache(
     insight: Insight, dashboard: Optional[Dashboard], refresh_frequency: Optional[timedelta] = None
+) -> InsightResult:
+    # Concurrent requests for the same insight wait for a single calculation, and then read its result from the cache
+    cache_key = generate_insight_cache_key(insight, dashboard)
+    insight_result = run_single_flight(
+        cache_key,
+        lambda: _calculate_and_update_cache(insight, dashboard, refresh_frequency),
+        timeout=CLICKHOUSE_MAX_EXECUTION_TIME,
+    )
+    if insight_result is None:
+        insight_result = _fetch_cached_result(cache_key, refresh_frequency)
+        if insight_result.result is None:
+            # The result was evicted right after being calculated
+            insight_result = _calculate_and_update_cache(insight, dashboard, refresh_frequency)
+    return insight_result
+
+
+def _calculate_and_update_cache(
+    insight: Insight, dashboard: Optional[Dashboard], refresh_frequency: Optional[timedelta]
 ) -> InsightResult:
     cache_key, cache_type, result = calculate_result_by_insight(team=insight.team, insight=insight, dashboard=dashboard)
     timestamp = now()
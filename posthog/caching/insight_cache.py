@@ -1,6 +1,6 @@
 from datetime import datetime, timedelta
 from time import perf_counter
-from typing import Any, List, Optional, Tuple, cast
+from typing import Any, List, Optional, Tuple
 from uuid import UUID
 
 import structlog
@@ -12,8 +12,10 @@ from prometheus_client import Counter
 from sentry_sdk.api import capture_exception
 from statshog.defaults.django import statsd
 
-from posthog.caching.calculate_results import calculate_result_by_insight
+from posthog.caching.calculate_results import CLICKHOUSE_MAX_EXECUTION_TIME, calculate_result_by_insight
+from posthog.caching.single_flight import run_single_flight
 from posthog.models import Dashboard, Insight, InsightCachingState, Team
+from posthog.models.insight import generate_insight_cache_key
 from posthog.models.instance_setting import get_instance_setting
 
 logger = structlog.get_logger(__name__)
@@ -92,7 +94,7 @@ def update_cache(caching_state_id: UUID):
     team: Team = insight.team
     start_time = perf_counter()
 
-    exception = cache_key = cache_type = None
+    exception = rows_updated = None
 
     metadata = {
         "team_id": team.pk,
@@ -102,21 +104,32 @@ def update_cache(caching_state_id: UUID):
         "last_refresh_queued_at": caching_state.last_refresh_queued_at,
     }
 
-    try:
+    def calculate_and_update_cached_state() -> int:
         cache_key, cache_type, result = calculate_result_by_insight(team=team, insight=insight, dashboard=dashboard)
-    except Exception as err:
-        capture_exception(err, metadata)
-        exception = err
-
-    duration = perf_counter() - start_time
-    if exception is None:
         timestamp = now()
-        rows_updated = update_cached_state(
+        return update_cached_state(
             caching_state.team_id,
-            cast(str, cache_key),
+            cache_key,
             timestamp,
             {"result": result, "type": cache_type, "last_refresh": timestamp},
         )
+
+    try:
+        # Requests refreshing the same insight in the meantime wait for this instead of calculating it again
+        rows_updated = run_single_flight(
+            generate_insight_cache_key(insight, dashboard),
+            calculate_and_update_cached_state,
+            timeout=CLICKHOUSE_MAX_EXECUTION_TIME,
+        )
+    except Exception as err:
+        capture_exception(err, metadata)
+        exception = err
+
+    duration = perf_counter() - start_time
+    if exception is None and rows_updated is None:
+        statsd.incr("caching_state_update_refreshed_elsewhere")
+        logger.warn("Insight cache was re-calculated elsewhere", duration=duration, **metadata)
+    elif exception is None:
         statsd.incr("caching_state_update_success")
         statsd.incr("caching_state_update_rows_updated", rows_updated)
         statsd.timing("caching_state_update_success_timing", duration)
@@ -1,12 +1,12 @@
 from datetime import datetime, timedelta
 from math import ceil
-from time import sleep
 from typing import Optional, Tuple, Union
 import zoneinfo
 from rest_framework import request
 
 from posthog.caching.calculate_results import CLICKHOUSE_MAX_EXECUTION_TIME, calculate_cache_key
 from posthog.caching.insight_caching_state import InsightCachingState
+from posthog.caching.single_flight import wait_for_single_flight
 from posthog.models import DashboardTile, Insight
 from posthog.models.filters.utils import get_filter
 from posthog.utils import refresh_requested_by_client
@@ -66,47 +66,10 @@ def should_refresh_insight(
             or (caching_state.last_refresh + refresh_frequency <= now)
         )
 
-        if refresh_insight_now:
-            has_refreshed_somewhere_else = _sleep_if_refresh_is_running_somewhere_else(caching_state, now)
+        if refresh_insight_now and cache_key is not None:
+            # If the insight is being refreshed somewhere else right now, wait for that instead of refreshing it again
+            has_refreshed_somewhere_else = wait_for_single_flight(cache_key, timeout=CLICKHOUSE_MAX_EXECUTION_TIME)
             if has_refreshed_somewhere_else:
                 refresh_insight_now = False
 
     return refresh_insight_now, refresh_frequency
-
-
-def _sleep_if_refresh_is_running_somewhere_else(caching_state: Optional[InsightCachingState], now: datetime) -> bool:
-    """Prevent the same query from running concurrently needlessly."""
-    is_refresh_currently_running = _is_refresh_currently_running_somewhere_else(caching_state, now)
-    if is_refresh_currently_running:
-        assert caching_state is not None  # Isn't None due to condition in _is_refresh_currently_running_somewhere_else
-        while is_refresh_currently_running:
-            sleep(1)
-            caching_state.refresh_from_db()
-            has_refresh_completed = (
-                caching_state.last_refresh is not None
-                and caching_state.last_refresh >= caching_state.last_refresh_queued_at
-            )
-            if has_refresh_completed:
-                return True  # Refresh has completed while being intitiated from somewhere else!
-            is_refresh_currently_running = _is_refresh_currently_running_somewhere_else(
-                caching_state, datetime.now(tz=zoneinfo.ZoneInfo("UTC"))
-            )
-    return False
-
-
-def _is_refresh_currently_running_somewhere_else(caching_state: Optional[InsightCachingState], now: datetime) -> bool:
-    """Return whether the refresh is most likely still running somewhere else."""
-    if (
-        caching_state is not None
-        # A refresh must have been queued at some point in the past
-        and caching_state.last_refresh_queued_at is not None
-        # That point was recent enough that the query might still be running
-        and caching_state.last_refresh_queued_at > now - timedelta(seconds=CLICKHOUSE_MAX_EXECUTION_TIME)
-        # And refreshing must have either never finished or last finished before it was queued now
-        and (caching_state.last_refresh is None or caching_state.last_refresh < caching_state.last_refresh_queued_at)
-    ):
-        return True
-    else:
-        # Otherwise we're sure the refresh isn't running at the moment - either it's not been queued or it's timed out
-        # (barring the occasional race condition related to fetching state from PG, but that much uncertainty is okay)
-        return False
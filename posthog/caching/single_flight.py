@@ -0,0 +1,123 @@
+from time import monotonic
+from typing import Callable, Optional, TypeVar
+from uuid import uuid4
+
+import structlog
+from prometheus_client import Counter
+
+from posthog.redis import get_client
+
+"""
+Distributed single-flight for expensive computations, e.g. insight refreshes.
+
+The first process to start computing a key holds a lock in Redis while it runs. Other processes asking for the same
+key subscribe to a channel and are notified as soon as the computation is done, instead of running it again or
+polling for it.
+"""
+
+logger = structlog.get_logger(__name__)
+
+T = TypeVar("T")
+
+SINGLE_FLIGHT_KEY_PREFIX = "posthog:single_flight"
+# How long the outcome of a computation is kept, for processes which subscribe just after it finished
+OUTCOME_TTL_SECONDS = 60
+
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+single_flight_counter = Counter(
+    "posthog_single_flight_total",
+    "Computations requested through single-flight, by whether they ran here, were waited on, or the wait timed out.",
+    labelnames=["result"],
+)
+
+# Only delete the lock if it's still ours, it might have expired and been taken over by another process
+RELEASE_LOCK_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+
+def run_single_flight(key: str, compute: Callable[[], T], timeout: int) -> Optional[T]:
+    """
+    Run `compute`, unless it's already running for the same key somewhere else, in which case wait up to `timeout`
+    seconds for that to finish instead.
+
+    Returns the result of `compute`, or None if it was computed somewhere else and its result should be read from
+    wherever that stores it. If the other computation fails or times out, it's computed here after all.
+    """
+    client = get_client()
+    token = uuid4().hex
+    if not client.set(_lock_key(key), token, nx=True, ex=timeout):
+        if wait_for_single_flight(key, timeout):
+            return None
+        # Whoever held the lock is done with it by now, try taking over
+        client.set(_lock_key(key), token, nx=True, ex=timeout)
+
+    single_flight_counter.labels(result="computed").inc()
+    outcome = FAILED
+    try:
+        result = compute()
+        outcome = SUCCEEDED
+        return result
+    finally:
+        try:
+            pipeline = client.pipeline(transaction=False)
+            pipeline.set(_outcome_key(key), outcome, ex=OUTCOME_TTL_SECONDS)
+            pipeline.eval(RELEASE_LOCK_SCRIPT, 1, _lock_key(key), token)
+            pipeline.publish(_channel(key), outcome)
+            pipeline.execute()
+        except Exception as err:
+            logger.warn("single_flight_release_failed", key=key, error=err)
+
+
+def wait_for_single_flight(key: str, timeout: int) -> bool:
+    """
+    If the computation for `key` is running somewhere else, wait up to `timeout` seconds for it to finish. Returns
+    whether it finished successfully, i.e. False when nothing was running or it failed or timed out.
+    """
+    client = get_client()
+    if not client.exists(_lock_key(key)):
+        return False
+
+    pubsub = client.pubsub(ignore_subscribe_messages=True)
+    try:
+        pubsub.subscribe(_channel(key))
+        deadline = monotonic() + timeout
+        # The computation might have finished between checking the lock and subscribing
+        while client.exists(_lock_key(key)):
+            remaining = deadline - monotonic()
+            if remaining <= 0:
+                single_flight_counter.labels(result="timed_out").inc()
+                return False
+            # Wake up every now and then, in case the lock expired without a notification
+            message = pubsub.get_message(timeout=min(remaining, 5))
+            if message is not None and message["type"] == "message":
+                outcome = message["data"]
+                break
+        else:
+            outcome = client.get(_outcome_key(key))
+    finally:
+        pubsub.close()
+
+    single_flight_counter.labels(result="waited").inc()
+    return _decode(outcome) == SUCCEEDED
+
+
+def _decode(value) -> Optional[str]:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def _lock_key(key: str) -> str:
+    return f"{SINGLE_FLIGHT_KEY_PREFIX}:lock:{key}"
+
+
+def _outcome_key(key: str) -> str:
+    return f"{SINGLE_FLIGHT_KEY_PREFIX}:outcome:{key}"
+
+
+def _channel(key: str) -> str:
+    return f"{SINGLE_FLIGHT_KEY_PREFIX}:channel:{key}"
@@ -1,14 +1,14 @@
 from datetime import datetime, timedelta
-from time import sleep
-from unittest.mock import patch
+import threading
 from django.http import HttpRequest
 
 import pytz
 from freezegun import freeze_time
 from rest_framework.request import Request
-from posthog.caching.calculate_results import CLICKHOUSE_MAX_EXECUTION_TIME
+from posthog.caching.calculate_results import CLICKHOUSE_MAX_EXECUTION_TIME, calculate_cache_key
 from posthog.caching.insight_caching_state import InsightCachingState
 from posthog.caching.insights_api import BASE_MINIMUM_INSIGHT_REFRESH_INTERVAL, should_refresh_insight
+from posthog.caching.single_flight import run_single_flight
 from posthog.test.base import BaseTest, ClickhouseTestMixin, _create_insight
 
 
@@ -139,22 +139,53 @@ class TestShouldRefreshInsight(ClickhouseTestMixin, BaseTest):
         self.assertEqual(should_refresh_now, False)
         self.assertEqual(refresh_frequency, BASE_MINIMUM_INSIGHT_REFRESH_INTERVAL)
 
-    @patch("posthog.caching.insights_api.sleep", side_effect=sleep)
-    def test_should_return_true_if_refresh_just_about_to_time_out_elsewhere(self, mock_sleep):
+    def test_should_return_false_if_refresh_finishes_elsewhere_while_waiting(self):
         insight, _, _ = _create_insight(self.team, {"events": [{"id": "$autocapture"}], "interval": "month"}, {})
         InsightCachingState.objects.filter(team=self.team, insight_id=insight.pk).update(
-            last_refresh=datetime.now(tz=pytz.timezone("UTC")) - timedelta(days=1),
-            # This insight is being calculated _somewhere_, since it was last refreshed
-            # earlier than the recent refresh has been queued
-            last_refresh_queued_at=datetime.now(tz=pytz.timezone("UTC"))
-            - timedelta(seconds=CLICKHOUSE_MAX_EXECUTION_TIME - 0.5),  # Half a second before timeout
+            last_refresh=datetime.now(tz=pytz.timezone("UTC")) - timedelta(days=1)
+        )
+        started, finish = threading.Event(), threading.Event()
+
+        def refresh_elsewhere():
+            started.set()
+            finish.wait(5)
+
+        # This insight is being calculated _somewhere_ else
+        thread = threading.Thread(
+            target=run_single_flight,
+            args=(calculate_cache_key(insight), refresh_elsewhere, CLICKHOUSE_MAX_EXECUTION_TIME),
+        )
+        thread.start()
+        started.wait(5)
+        threading.Timer(0.1, finish.set).start()
+
+        should_refresh_now, _ = should_refresh_insight(insight, None, request=self.refresh_request)
+        thread.join()
+
+        # The result of the refresh elsewhere is used instead
+        self.assertEqual(should_refresh_now, False)
+
+    def test_should_return_true_if_refresh_fails_elsewhere_while_waiting(self):
+        insight, _, _ = _create_insight(self.team, {"events": [{"id": "$autocapture"}], "interval": "month"}, {})
+        started, finish = threading.Event(), threading.Event()
+
+        def refresh_elsewhere():
+            started.set()
+            finish.wait(5)
+            raise Exception("Query failed")
+
+        thread = threading.Thread(
+            target=run_single_flight,
+            args=(calculate_cache_key(insight), refresh_elsewhere, CLICKHOUSE_MAX_EXECUTION_TIME),
         )
+        thread.start()
+        started.wait(5)
+        threading.Timer(0.1, finish.set).start()
 
         should_refresh_now, _ = should_refresh_insight(insight, None, request=self.refresh_request)
+        thread.join()
 
-        # We waited for 1 second before the query timed out
-        mock_sleep.assert_called_once_with(1)
-        # Still need to refresh, because they query didn't finish - it timed out
+        # Still need to refresh, because the refresh elsewhere didn't finish
         self.assertEqual(should_refresh_now, True)
 
     @freeze_time("2012-01-14T03:21:34.000Z")
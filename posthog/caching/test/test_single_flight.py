@@ -0,0 +1,77 @@
+import threading
+from unittest.mock import MagicMock
+
+from django.test import TestCase
+
+from posthog.caching.single_flight import run_single_flight, wait_for_single_flight
+from posthog.redis import get_client
+
+
+class TestSingleFlight(TestCase):
+    def setUp(self):
+        get_client().flushdb()
+
+    def _run_elsewhere(self, key: str, compute) -> threading.Thread:
+        started = threading.Event()
+
+        def run():
+            started.set()
+            try:
+                run_single_flight(key, compute, 10)
+            except Exception:
+                pass
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        started.wait(5)
+        return thread
+
+    def test_computes_when_nothing_is_running(self):
+        compute = MagicMock(return_value=[1, 2, 3])
+
+        self.assertEqual(run_single_flight("key", compute, 10), [1, 2, 3])
+        self.assertEqual(run_single_flight("key", compute, 10), [1, 2, 3])
+        self.assertEqual(compute.call_count, 2)
+        self.assertFalse(wait_for_single_flight("key", 10))
+
+    def test_waits_for_computation_running_elsewhere(self):
+        running, finish = threading.Event(), threading.Event()
+        compute_elsewhere = MagicMock(side_effect=lambda: running.set() or finish.wait(5))
+        thread = self._run_elsewhere("key", compute_elsewhere)
+        running.wait(5)
+        threading.Timer(0.1, finish.set).start()
+
+        compute = MagicMock()
+        result = run_single_flight("key", compute, 10)
+        thread.join()
+
+        # The result is read from wherever the computation elsewhere stored it
+        self.assertIsNone(result)
+        compute.assert_not_called()
+        compute_elsewhere.assert_called_once()
+
+    def test_computes_when_computation_elsewhere_fails(self):
+        running, finish = threading.Event(), threading.Event()
+
+        def compute_elsewhere():
+            running.set()
+            finish.wait(5)
+            raise Exception("Query failed")
+
+        thread = self._run_elsewhere("key", compute_elsewhere)
+        running.wait(5)
+        threading.Timer(0.1, finish.set).start()
+
+        result = run_single_flight("key", lambda: "computed here", 10)
+        thread.join()
+
+        self.assertEqual(result, "computed here")
+
+    def test_stops_waiting_after_timeout(self):
+        running, finish = threading.Event(), threading.Event()
+        thread = self._run_elsewhere("key", lambda: running.set() or finish.wait(5))
+        running.wait(5)
+
+        self.assertFalse(wait_for_single_flight("key", 0))
+        finish.set()
+        thread.join()
@@ -203,9 +203,11 @@ def pre_run_signal_handler(task_id, task, **kwargs):
     from statshog.defaults.django import statsd
 
     from posthog.clickhouse.client.connection import Workload, set_default_clickhouse_workload_type
+    from posthog.clickhouse.property_access import reset_property_accesses
     from posthog.clickhouse.query_tagging import tag_queries
 
     statsd.incr("celery_tasks_metrics.pre_run", tags={"name": task.name})
+    reset_property_accesses()
     tag_queries(kind="celery", id=task.name)
     set_default_clickhouse_workload_type(Workload.OFFLINE)
 
@@ -1,8 +1,10 @@
-from posthog.clickhouse.client.execute import query_with_columns, sync_execute
+from posthog.clickhouse.client.execute import ColumnarFormat, query_columns, query_with_columns, sync_execute
 from posthog.clickhouse.client.execute_async import execute_with_progress
 
 __all__ = [
     "sync_execute",
     "query_with_columns",
+    "query_columns",
+    "ColumnarFormat",
     "execute_with_progress",
 ]
@@ -2,9 +2,10 @@ import json
 import threading
 import types
 from contextlib import contextmanager
+from enum import Enum
 from functools import lru_cache
 from time import perf_counter
-from typing import Any, Dict, List, Optional, Sequence, Union
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple, Union
 
 import sqlparse
 from clickhouse_driver import Client as SyncClient
@@ -13,6 +14,8 @@ from statshog.defaults.django import statsd
 
 from posthog.clickhouse.client.connection import Workload, get_pool
 from posthog.clickhouse.client.escape import substitute_params
+from posthog.clickhouse.client.result_cache import get_or_execute, get_query_result_cache_key
+from posthog.clickhouse.property_access import PropertyAccess, pop_property_accesses, record_property_costs
 from posthog.clickhouse.query_tagging import get_query_tag_value, get_query_tags
 from posthog.errors import wrap_query_error
 from posthog.settings import TEST
@@ -37,6 +40,29 @@ CLICKHOUSE_SUPPORTED_JOIN_ALGORITHMS = [
 
 is_invalid_algorithm = lambda algo: algo not in CLICKHOUSE_SUPPORTED_JOIN_ALGORITHMS
 
+# Numeric ClickHouse types with an exact NumPy (and Arrow) equivalent, other columns are kept as Python objects
+CLICKHOUSE_NUMPY_DTYPES = {
+    "UInt8": "uint8",
+    "UInt16": "uint16",
+    "UInt32": "uint32",
+    "UInt64": "uint64",
+    "Int8": "int8",
+    "Int16": "int16",
+    "Int32": "int32",
+    "Int64": "int64",
+    "Float32": "float32",
+    "Float64": "float64",
+}
+
+
+class ColumnarFormat(Enum):
+    # Column name to a tuple of its values
+    DICT = "DICT"
+    # Column name to a NumPy array, typed for numeric columns
+    NUMPY = "NUMPY"
+    # A pyarrow.Table
+    ARROW = "ARROW"
+
 
 @lru_cache(maxsize=1)
 def default_settings() -> Dict:
@@ -81,7 +107,16 @@ def sync_execute(
     workload: Workload = Workload.DEFAULT,
     team_id: Optional[int] = None,
     readonly=False,
+    query_id: Optional[str] = None,
+    columnar=False,
+    cache_ttl: Optional[int] = None,
+    property_accesses: Optional[Set[PropertyAccess]] = None,
 ):
+    # Properties extracted by the query, when it was compiled on this thread. Popped before anything else can run a
+    # query, so they aren't charged to another one, nor left behind when the result is cached
+    if property_accesses is None:
+        property_accesses = pop_property_accesses()
+
     if TEST and flush:
         try:
             from posthog.test.base import flush_persons_and_events
@@ -90,11 +125,42 @@ def sync_execute(
         except ModuleNotFoundError:  # when we run plugin server tests it tries to run above, ignore
             pass
 
+    # Opt-in: identical reads within `cache_ttl` seconds share one result. Inserts pass their rows as a sequence
+    if cache_ttl and not isinstance(args, (list, tuple, types.GeneratorType)):
+        cache_key = get_query_result_cache_key(
+            query,
+            args,
+            team_id or get_query_tag_value("team_id"),
+            settings=settings,
+            with_column_types=with_column_types,
+            columnar=columnar,
+            workload=workload.value,
+            readonly=readonly,
+        )
+        return get_or_execute(
+            cache_key,
+            cache_ttl,
+            lambda: sync_execute(
+                query,
+                args,
+                settings,
+                with_column_types,
+                flush=False,
+                workload=workload,
+                team_id=team_id,
+                readonly=readonly,
+                query_id=query_id,
+                columnar=columnar,
+                property_accesses=property_accesses,
+            ),
+        )
+
     with get_pool(workload, team_id, readonly).get_client() as client:
         start_time = perf_counter()
 
         prepared_sql, prepared_args, tags = _prepare_query(client=client, query=query, args=args, workload=workload)
-        query_id = validated_client_query_id()
+        # Callers pass their own query id when they might need to cancel the query
+        query_id = query_id or validated_client_query_id()
         core_settings = {**default_settings(), **(settings or {})}
         tags["query_settings"] = core_settings
         settings = {**core_settings, "log_comment": json.dumps(tags, separators=(",", ":"))}
@@ -104,6 +170,7 @@ def sync_execute(
                 params=prepared_args,
                 settings=settings,
                 with_column_types=with_column_types,
+                columnar=columnar,
                 query_id=query_id,
             )
         except Exception as err:
@@ -119,6 +186,8 @@ def sync_execute(
             if query_counter := getattr(thread_local_storage, "query_counter", None):
                 query_counter.total_query_time += execution_time
 
+            record_property_costs(team_id or get_query_tag_value("team_id"), property_accesses, execution_time * 1000.0)
+
             if app_settings.SHELL_PLUS_PRINT_SQL:
                 print("Execution time: %.6fs" % (execution_time,))  # noqa T201
     return result
@@ -133,23 +202,63 @@ def query_with_columns(
     workload: Workload = Workload.DEFAULT,
     team_id: Optional[int] = None,
 ) -> List[Dict]:
-    if columns_to_remove is None:
-        columns_to_remove = []
-    if columns_to_rename is None:
-        columns_to_rename = {}
     metrics, types = sync_execute(query, args, with_column_types=True, workload=workload, team_id=team_id)
-    type_names = [key for key, _type in types]
+    columns = _kept_columns(types, columns_to_remove, columns_to_rename)
 
-    rows = []
-    for row in metrics:
-        result = {}
-        for type_name, value in zip(type_names, row):
-            if type_name not in columns_to_remove:
-                result[columns_to_rename.get(type_name, type_name)] = value
+    return [{name: row[index] for index, name, _type in columns} for row in metrics]
 
-        rows.append(result)
 
-    return rows
+def query_columns(
+    query: str,
+    args: Optional[QueryArgs] = None,
+    columns_to_remove: Optional[Sequence[str]] = None,
+    columns_to_rename: Optional[Dict[str, str]] = None,
+    *,
+    format: ColumnarFormat = ColumnarFormat.DICT,
+    workload: Workload = Workload.DEFAULT,
+    team_id: Optional[int] = None,
+) -> Any:
+    """
+    Like `query_with_columns`, but returns the result column by column, as ClickHouse sends it over the native
+    protocol. Avoids creating a tuple and a dict per row, and lets results be post-processed with vectorised operations.
+    """
+    data, types = sync_execute(query, args, with_column_types=True, columnar=True, workload=workload, team_id=team_id)
+    columns = _kept_columns(types, columns_to_remove, columns_to_rename)
+    # Results without rows come back without any columns
+    values = data or [()] * len(types)
+
+    if format == ColumnarFormat.NUMPY:
+        import numpy as np
+
+        return {
+            name: np.array(values[index], dtype=CLICKHOUSE_NUMPY_DTYPES[_type]) if _type in CLICKHOUSE_NUMPY_DTYPES
+            # `fromiter` keeps e.g. array values as one object each, instead of making a multidimensional array
+            else np.fromiter(values[index], dtype=object, count=len(values[index]))
+            for index, name, _type in columns
+        }
+    if format == ColumnarFormat.ARROW:
+        import pyarrow as pa
+
+        return pa.table(
+            {
+                name: pa.array(values[index], type=pa.type_for_alias(CLICKHOUSE_NUMPY_DTYPES[_type]))
+                if _type in CLICKHOUSE_NUMPY_DTYPES
+                else pa.array(values[index])
+                for index, name, _type in columns
+            }
+        )
+    return {name: values[index] for index, name, _type in columns}
+
+
+def _kept_columns(
+    types: List[Tuple[str, str]],
+    columns_to_remove: Optional[Sequence[str]],
+    columns_to_rename: Optional[Dict[str, str]],
+) -> List[Tuple[int, str, str]]:
+    "Index, output name and ClickHouse type of every column that isn't removed, worked out once per result"
+    removed = set(columns_to_remove or [])
+    renamed = columns_to_rename or {}
+    return [(index, renamed.get(name, name), _type) for index, (name, _type) in enumerate(types) if name not in removed]
 
 
 @patchable
@@ -0,0 +1,81 @@
+# This module caches the results of read queries for a short time, so that identical queries (e.g. from dashboards with
+# many viewers) are only run once in ClickHouse
+
+import hashlib
+import json
+import pickle
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict
+
+import sqlparse
+from django.conf import settings
+from django.core.cache import cache
+from prometheus_client import Counter
+
+from posthog.clickhouse.client.escape import substitute_params
+from posthog.utils import get_safe_cache
+
+QUERY_RESULT_CACHE_COUNTER = Counter(
+    "posthog_clickhouse_query_result_cache_total",
+    "Queries using the ClickHouse result cache, by result (hit, coalesced with a running query, miss or too_large).",
+    labelnames=["result"],
+)
+
+# Queries being executed by this process, which identical queries wait for instead of running again
+_in_flight: Dict[str, Future] = {}
+_in_flight_lock = threading.Lock()
+
+
+def get_query_result_cache_key(query: str, args: Any, team_id: Any, **options: Any) -> str:
+    """
+    Key of the result of a query, from its normalized SQL, the team and anything else that changes the result, e.g.
+    settings or whether column types are returned. Comments and whitespace between tokens don't change the key.
+    """
+    rendered_sql = substitute_params(query, args) if args else query
+    normalized_sql = sqlparse.format(rendered_sql, strip_comments=True, strip_whitespace=True)
+    payload = json.dumps({"sql": normalized_sql, "team_id": team_id, **options}, sort_keys=True, default=str)
+    return f"clickhouse_query_result_{hashlib.sha256(payload.encode()).hexdigest()}"
+
+
+def get_or_execute(cache_key: str, ttl: int, execute: Callable[[], Any]) -> Any:
+    """
+    Return the cached result for `cache_key`, or call `execute` and cache its result for `ttl` seconds. Concurrent
+    callers with the same key share a single execution. Every caller gets its own copy of the result.
+    """
+    cached_result = get_safe_cache(cache_key)
+    if cached_result is not None:
+        QUERY_RESULT_CACHE_COUNTER.labels(result="hit").inc()
+        return pickle.loads(cached_result)
+
+    with _in_flight_lock:
+        future = _in_flight.get(cache_key)
+        is_leader = future is None
+        if future is None:
+            future = _in_flight[cache_key] = Future()
+
+    if not is_leader:
+        QUERY_RESULT_CACHE_COUNTER.labels(result="coalesced").inc()
+        return pickle.loads(future.result())
+
+    QUERY_RESULT_CACHE_COUNTER.labels(result="miss").inc()
+    try:
+        result = execute()
+        serialized_result = pickle.dumps(result)
+        future.set_result(serialized_result)
+    except BaseException as err:
+        future.set_exception(err)
+        raise
+    finally:
+        with _in_flight_lock:
+            _in_flight.pop(cache_key, None)
+
+    if len(serialized_result) > settings.CLICKHOUSE_RESULT_CACHE_MAX_BYTES:
+        QUERY_RESULT_CACHE_COUNTER.labels(result="too_large").inc()
+    else:
+        try:
+            cache.set(cache_key, serialized_result, ttl)
+        except Exception:
+            # redis is unavailable
+            pass
+    return result
@@ -0,0 +1,69 @@
+from unittest.mock import patch
+
+import numpy as np
+
+from posthog.clickhouse.client import ColumnarFormat, query_columns, query_with_columns, sync_execute
+from posthog.clickhouse.property_access import record_property_access
+from posthog.test.base import BaseTest, ClickhouseTestMixin
+
+QUERY = "SELECT number AS n, toString(number) AS s, [number] AS a, toFloat64(number) / 2 AS f FROM numbers(3)"
+
+
+class TestExecute(ClickhouseTestMixin, BaseTest):
+    def test_query_with_columns(self):
+        rows = query_with_columns(QUERY, columns_to_remove=["a"], columns_to_rename={"s": "string"})
+
+        self.assertEqual(
+            rows,
+            [{"n": 0, "string": "0", "f": 0.0}, {"n": 1, "string": "1", "f": 0.5}, {"n": 2, "string": "2", "f": 1.0}],
+        )
+
+    def test_query_columns(self):
+        columns = query_columns(QUERY, columns_to_remove=["a"], columns_to_rename={"s": "string"})
+
+        self.assertEqual(columns, {"n": (0, 1, 2), "string": ("0", "1", "2"), "f": (0.0, 0.5, 1.0)})
+
+    def test_query_columns_as_numpy(self):
+        columns = query_columns(QUERY, format=ColumnarFormat.NUMPY)
+
+        self.assertEqual(columns["n"].dtype, np.uint64)
+        self.assertEqual(columns["f"].tolist(), [0.0, 0.5, 1.0])
+        self.assertEqual(columns["s"].dtype, object)
+        self.assertEqual(columns["a"].tolist(), [[0], [1], [2]])
+
+    def test_query_columns_as_arrow(self):
+        table = query_columns(QUERY, format=ColumnarFormat.ARROW)
+
+        self.assertEqual(table.column_names, ["n", "s", "a", "f"])
+        self.assertEqual(str(table.schema.field("n").type), "uint64")
+        self.assertEqual(table.column("s").to_pylist(), ["0", "1", "2"])
+
+    def test_query_columns_without_rows(self):
+        columns = query_columns("SELECT number AS n FROM numbers(0)", format=ColumnarFormat.NUMPY)
+
+        self.assertEqual(len(columns["n"]), 0)
+        self.assertEqual(columns["n"].dtype, np.uint64)
+
+    def test_sync_execute_with_result_cache(self):
+        query = "SELECT rand64() FROM numbers(1) WHERE %(value)s = %(value)s"
+
+        cached = sync_execute(query, {"value": 1}, cache_ttl=60)
+
+        self.assertEqual(sync_execute(query, {"value": 1}, cache_ttl=60), cached)
+        self.assertNotEqual(sync_execute(query, {"value": 1}), cached)
+        self.assertNotEqual(sync_execute(query, {"value": 2}, cache_ttl=60), cached)
+
+    @patch("posthog.clickhouse.client.execute.record_property_costs")
+    def test_property_accesses_are_recorded_for_the_query_they_were_compiled_for(self, patch_record_property_costs):
+        query = "SELECT rand64() FROM numbers(1)"
+
+        record_property_access("events", "properties", "$browser")
+        sync_execute(query, cache_ttl=60)
+        self.assertEqual(patch_record_property_costs.call_args[0][1], {("events", "properties", "$browser")})
+
+        # Cached results don't cost anything, but their accesses aren't left behind for the next query either
+        record_property_access("events", "properties", "$os")
+        sync_execute(query, cache_ttl=60)
+        sync_execute(query, property_accesses={("person", "properties", "email")})
+        self.assertEqual(patch_record_property_costs.call_count, 2)
+        self.assertEqual(patch_record_property_costs.call_args[0][1], {("person", "properties", "email")})
@@ -0,0 +1,87 @@
+import threading
+from unittest.mock import MagicMock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from posthog.clickhouse.client.result_cache import get_or_execute, get_query_result_cache_key
+
+
+class TestResultCache(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_cache_key_ignores_comments_and_whitespace(self):
+        key = get_query_result_cache_key("SELECT 1 FROM events WHERE team_id = %(team_id)s", {"team_id": 2}, 2)
+
+        self.assertEqual(
+            key,
+            get_query_result_cache_key(
+                "/* dashboard */ SELECT 1\n  FROM events\n  WHERE team_id = %(team_id)s", {"team_id": 2}, 2
+            ),
+        )
+        self.assertNotEqual(
+            key, get_query_result_cache_key("SELECT 1 FROM events WHERE team_id = %(team_id)s", {"team_id": 3}, 3)
+        )
+        self.assertNotEqual(
+            key,
+            get_query_result_cache_key(
+                "SELECT 1 FROM events WHERE team_id = %(team_id)s", {"team_id": 2}, 2, with_column_types=True
+            ),
+        )
+
+    def test_results_are_cached(self):
+        execute = MagicMock(return_value=[(1, "a")])
+
+        self.assertEqual(get_or_execute("key", 60, execute), [(1, "a")])
+        result = get_or_execute("key", 60, execute)
+
+        self.assertEqual(result, [(1, "a")])
+        self.assertEqual(execute.call_count, 1)
+        # Every caller gets its own copy
+        self.assertIsNot(result, execute.return_value)
+
+    def test_errors_are_not_cached(self):
+        execute = MagicMock(side_effect=[Exception("boom"), [(1,)]])
+
+        with self.assertRaises(Exception):
+            get_or_execute("key", 60, execute)
+
+        self.assertEqual(get_or_execute("key", 60, execute), [(1,)])
+
+    def test_concurrent_identical_queries_are_executed_once(self):
+        started = threading.Event()
+        release = threading.Event()
+        calls = 0
+
+        def execute():
+            nonlocal calls
+            calls += 1
+            started.set()
+            release.wait(5)
+            return [(calls,)]
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(get_or_execute("key", 60, execute)))
+        leader.start()
+        started.wait(5)
+        followers = [
+            threading.Thread(target=lambda: results.append(get_or_execute("key", 60, execute))) for _ in range(3)
+        ]
+        for follower in followers:
+            follower.start()
+        release.set()
+        for thread in [leader, *followers]:
+            thread.join()
+
+        self.assertEqual(calls, 1)
+        self.assertEqual(results, [[(1,)]] * 4)
+
+    def test_large_results_are_not_cached(self):
+        execute = MagicMock(return_value=[(1,)])
+
+        with self.settings(CLICKHOUSE_RESULT_CACHE_MAX_BYTES=1):
+            get_or_execute("key", 60, execute)
+            get_or_execute("key", 60, execute)
+
+        self.assertEqual(execute.call_count, 2)
@@ -0,0 +1,12 @@
+from posthog.clickhouse.client.migration_tools import run_sql_with_exceptions
+from posthog.models.event_property_values.sql import (
+    DISTRIBUTED_EVENT_PROPERTY_VALUES_TABLE_SQL,
+    EVENT_PROPERTY_VALUES_TABLE_MV_SQL,
+    EVENT_PROPERTY_VALUES_TABLE_SQL,
+)
+
+operations = [
+    run_sql_with_exceptions(EVENT_PROPERTY_VALUES_TABLE_SQL()),
+    run_sql_with_exceptions(DISTRIBUTED_EVENT_PROPERTY_VALUES_TABLE_SQL()),
+    run_sql_with_exceptions(EVENT_PROPERTY_VALUES_TABLE_MV_SQL()),
+]
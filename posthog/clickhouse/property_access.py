@@ -0,0 +1,91 @@
+# This module records which JSON properties slow queries extract at runtime, so that they can be materialized
+
+import json
+import threading
+import time
+from typing import Dict, Optional, Set, Tuple
+
+from django.conf import settings
+from sentry_sdk import capture_exception
+
+from posthog.redis import get_client
+
+# Table, the JSON column in it and the property name, e.g. ("events", "person_properties", "email")
+PropertyAccess = Tuple[str, str, str]
+
+PROPERTY_COSTS_KEY_PREFIX = "posthog:materialized_columns:property_costs"
+PROPERTY_COSTS_BUCKET_SIZE = 60 * 60  # duration in seconds
+# Accesses of queries that are compiled but never executed shouldn't pile up
+MAX_PENDING_PROPERTY_ACCESSES = 1000
+
+thread_local_storage = threading.local()
+
+
+def record_property_access(table: str, table_column: str, property_name: str) -> None:
+    "Called when compiling a query that extracts a property from JSON instead of reading a materialized column"
+    if table not in ("events", "person", "groups"):
+        return
+    try:
+        accesses = thread_local_storage.property_accesses
+    except AttributeError:
+        accesses = thread_local_storage.property_accesses = set()
+    if len(accesses) < MAX_PENDING_PROPERTY_ACCESSES:
+        accesses.add((table, table_column, property_name))
+
+
+def pop_property_accesses() -> Set[PropertyAccess]:
+    """
+    Property accesses recorded on this thread since they were last popped. Queries which are executed on another
+    thread than they're compiled on need to pop them after compiling and pass them to `sync_execute`.
+    """
+    accesses: Set[PropertyAccess] = getattr(thread_local_storage, "property_accesses", set())
+    thread_local_storage.property_accesses = set()
+    return accesses
+
+
+def reset_property_accesses() -> None:
+    "Drop the accesses of queries which were compiled but never executed, e.g. at the start of a request or task"
+    thread_local_storage.property_accesses = set()
+
+
+def record_property_costs(team_id: Optional[int], accesses: Set[PropertyAccess], query_time_ms: float) -> None:
+    """
+    Add the cost of a query to each of the properties it extracted, in the same units as the materialized columns
+    analysis uses. Costs are kept per team and hour, for as long as the analysis period.
+    """
+    min_query_time = getattr(settings, "MATERIALIZE_COLUMNS_MINIMUM_QUERY_TIME", None)
+    if not accesses or min_query_time is None or query_time_ms < min_query_time:
+        return
+
+    cost = int((query_time_ms - min_query_time) / 1000) + 1
+    try:
+        key = get_property_costs_key(int(time.time() / PROPERTY_COSTS_BUCKET_SIZE))
+        pipeline = get_client().pipeline(transaction=False)
+        for table, table_column, property_name in accesses:
+            pipeline.hincrby(key, json.dumps([team_id, table, table_column, property_name]), cost)
+        pipeline.expire(key, (settings.MATERIALIZE_COLUMNS_ANALYSIS_PERIOD_HOURS + 1) * PROPERTY_COSTS_BUCKET_SIZE)
+        pipeline.execute()
+    except Exception as error:
+        capture_exception(error)
+
+
+def get_property_costs(since_hours_ago: int) -> Dict[Tuple[Optional[int], str, str, str], int]:
+    "Cost of every property extracted by slow queries within the period, per team"
+    current_bucket = int(time.time() / PROPERTY_COSTS_BUCKET_SIZE)
+    buckets = range(current_bucket - since_hours_ago * 60 * 60 // PROPERTY_COSTS_BUCKET_SIZE, current_bucket + 1)
+
+    pipeline = get_client().pipeline(transaction=False)
+    for bucket in buckets:
+        pipeline.hgetall(get_property_costs_key(bucket))
+
+    costs: Dict = {}
+    for bucket_costs in pipeline.execute():
+        for field, cost in bucket_costs.items():
+            team_id, table, table_column, property_name = json.loads(field)
+            key = (team_id, table, table_column, property_name)
+            costs[key] = costs.get(key, 0) + int(cost)
+    return costs
+
+
+def get_property_costs_key(bucket: int) -> str:
+    return f"{PROPERTY_COSTS_KEY_PREFIX}:{bucket}"
@@ -6,6 +6,11 @@ from posthog.clickhouse.plugin_log_entries import *
 from posthog.models.app_metrics.sql import *
 from posthog.models.cohort.sql import *
 from posthog.models.event.sql import *
+from posthog.models.event_property_values.sql import (
+    DISTRIBUTED_EVENT_PROPERTY_VALUES_TABLE_SQL,
+    EVENT_PROPERTY_VALUES_TABLE_MV_SQL,
+    EVENT_PROPERTY_VALUES_TABLE_SQL,
+)
 from posthog.models.group.sql import *
 from posthog.models.ingestion_warnings.sql import (
     DISTRIBUTED_INGESTION_WARNINGS_TABLE_SQL,
@@ -51,6 +56,7 @@ CREATE_MERGETREE_TABLE_QUERIES = (
     APP_METRICS_DATA_TABLE_SQL,
     PERFORMANCE_EVENTS_TABLE_SQL,
     SESSION_REPLAY_EVENTS_TABLE_SQL,
+    EVENT_PROPERTY_VALUES_TABLE_SQL,
 )
 CREATE_DISTRIBUTED_TABLE_QUERIES = (
     WRITABLE_EVENTS_TABLE_SQL,
@@ -62,6 +68,7 @@ CREATE_DISTRIBUTED_TABLE_QUERIES = (
     WRITABLE_PERFORMANCE_EVENTS_TABLE_SQL,
     DISTRIBUTED_PERFORMANCE_EVENTS_TABLE_SQL,
     DISTRIBUTED_SESSION_REPLAY_EVENTS_TABLE_SQL,
+    DISTRIBUTED_EVENT_PROPERTY_VALUES_TABLE_SQL,
 )
 CREATE_KAFKA_TABLE_QUERIES = (
     KAFKA_DEAD_LETTER_QUEUE_TABLE_SQL,
@@ -92,6 +99,7 @@ CREATE_MV_TABLE_QUERIES = (
     APP_METRICS_MV_TABLE_SQL,
     PERFORMANCE_EVENTS_TABLE_MV_SQL,
     SESSION_REPLAY_EVENTS_TABLE_MV_SQL,
+    EVENT_PROPERTY_VALUES_TABLE_MV_SQL,
 )
 
 CREATE_TABLE_QUERIES = (
@@ -3,11 +3,12 @@ import math
 import random
 import string
 from datetime import datetime
-from typing import Any, List, Tuple, cast
+from typing import Any, Dict, List, Optional, Tuple, cast
 
 import pytest
 from pytest_mock import MockerFixture
 
+from posthog.session_recordings import session_recording_helpers
 from posthog.session_recordings.session_recording_helpers import (
     RRWEB_MAP_EVENT_TYPE,
     SessionRecordingEventSummary,
@@ -16,6 +17,7 @@ from posthog.session_recordings.session_recording_helpers import (
     decompress_chunked_snapshot_data,
     get_events_summary_from_snapshot_data,
     is_active_event,
+    iterate_decompressed_snapshot_data,
     legacy_preprocess_session_recording_events_for_clickhouse,
     preprocess_replay_events_for_blob_ingestion,
     split_replay_events,
@@ -290,6 +292,38 @@ def test_paginate_decompression(chunked_and_compressed_snapshot_events):
     assert len(paginated_events["snapshot_data_by_window_id"][None]) == 2
 
 
+def test_decompression_skips_chunks_before_offset(chunked_and_compressed_snapshot_events, mocker: MockerFixture):
+    snapshot_data = [
+        SnapshotDataTaggedWithWindowId(
+            snapshot_data=event["properties"]["$snapshot_data"], window_id=event["properties"].get("$window_id")
+        )
+        for event in chunked_and_compressed_snapshot_events
+    ]
+    decompress_spy = mocker.spy(session_recording_helpers, "decompress")
+
+    paginated_events = decompress_chunked_snapshot_data(snapshot_data, 1, 1)
+
+    assert len(paginated_events["snapshot_data_by_window_id"]["1"]) == 2
+    assert decompress_spy.call_count == 1
+
+
+def test_iterate_decompressed_snapshot_data(chunked_and_compressed_snapshot_events):
+    snapshot_data = [
+        SnapshotDataTaggedWithWindowId(
+            snapshot_data=event["properties"]["$snapshot_data"], window_id=event["properties"].get("$window_id")
+        )
+        for event in chunked_and_compressed_snapshot_events
+    ]
+    # Chunks arriving out of order are only yielded once they are complete
+    snapshot_data = snapshot_data[-3:] + snapshot_data[0:-3]
+
+    iterated: Dict[Optional[str], List[SnapshotData]] = {}
+    for window_id, snapshots in iterate_decompressed_snapshot_data(snapshot_data):
+        iterated.setdefault(window_id, []).extend(snapshots)
+
+    assert iterated == decompress_chunked_snapshot_data(snapshot_data)["snapshot_data_by_window_id"]
+
+
 def test_decompress_empty_list(chunked_and_compressed_snapshot_events):
     paginated_events = decompress_chunked_snapshot_data([])
     assert paginated_events["has_next"] is False
@@ -1,7 +1,12 @@
-from typing import Dict, List, Literal, Optional, cast
+from copy import deepcopy
+from functools import lru_cache
+from typing import Callable, Dict, List, Literal, Optional, cast
 
 from antlr4 import CommonTokenStream, InputStream, ParseTreeVisitor, ParserRuleContext
+from antlr4.atn.PredictionMode import PredictionMode
 from antlr4.error.ErrorListener import ErrorListener
+from antlr4.error.ErrorStrategy import BailErrorStrategy, DefaultErrorStrategy
+from antlr4.error.Errors import ParseCancellationException
 
 from posthog.hogql import ast
 from posthog.hogql.base import AST
@@ -12,31 +17,93 @@ from posthog.hogql.grammar.HogQLParser import HogQLParser
 from posthog.hogql.parse_string import parse_string, parse_string_literal
 from posthog.hogql.placeholders import replace_placeholders
 
+# - "python" runs the ANTLR runtime in full LL prediction mode.
+# - "python_sll" first tries the much cheaper SLL prediction mode, and only reparses in full LL mode if that fails.
+#   A successful SLL parse produces the same tree as an LL parse, so this only changes how fast we get there.
+HogQLParserBackend = Literal["python", "python_sll"]
+DEFAULT_PARSER_BACKEND: HogQLParserBackend = "python_sll"
 
-def parse_expr(expr: str, placeholders: Optional[Dict[str, ast.Expr]] = None, start: Optional[int] = 0) -> ast.Expr:
-    parse_tree = get_parser(expr).expr()
-    node = HogQLParseTreeConverter(start=start).visit(parse_tree)
+# Number of parsed ASTs to keep around per rule. The same property filters and placeholders get parsed over and over.
+PARSER_CACHE_SIZE = 1024
+
+HogQLRule = Literal["expr", "order_expr", "select"]
+
+RULE_TO_PARSE_FUNCTION: Dict[HogQLRule, Callable[[HogQLParser], ParserRuleContext]] = {
+    "expr": lambda parser: parser.expr(),
+    "order_expr": lambda parser: parser.orderExpr(),
+    "select": lambda parser: parser.select(),
+}
+
+
+def parse_expr(
+    expr: str,
+    placeholders: Optional[Dict[str, ast.Expr]] = None,
+    start: Optional[int] = 0,
+    *,
+    backend: Optional[HogQLParserBackend] = None,
+) -> ast.Expr:
+    node = _parse_cached("expr", expr, start, backend or DEFAULT_PARSER_BACKEND)
     if placeholders:
         return replace_placeholders(node, placeholders)
-    return node
+    return deepcopy(node)
 
 
-def parse_order_expr(order_expr: str, placeholders: Optional[Dict[str, ast.Expr]] = None) -> ast.Expr:
-    parse_tree = get_parser(order_expr).orderExpr()
-    node = HogQLParseTreeConverter().visit(parse_tree)
+def parse_order_expr(
+    order_expr: str,
+    placeholders: Optional[Dict[str, ast.Expr]] = None,
+    *,
+    backend: Optional[HogQLParserBackend] = None,
+) -> ast.Expr:
+    node = _parse_cached("order_expr", order_expr, 0, backend or DEFAULT_PARSER_BACKEND)
     if placeholders:
         return replace_placeholders(node, placeholders)
-    return node
+    return deepcopy(node)
 
 
 def parse_select(
-    statement: str, placeholders: Optional[Dict[str, ast.Expr]] = None
+    statement: str,
+    placeholders: Optional[Dict[str, ast.Expr]] = None,
+    *,
+    backend: Optional[HogQLParserBackend] = None,
 ) -> ast.SelectQuery | ast.SelectUnionQuery:
-    parse_tree = get_parser(statement).select()
-    node = HogQLParseTreeConverter().visit(parse_tree)
+    node = _parse_cached("select", statement, 0, backend or DEFAULT_PARSER_BACKEND)
     if placeholders:
-        node = replace_placeholders(node, placeholders)
-    return node
+        return cast(ast.SelectQuery | ast.SelectUnionQuery, replace_placeholders(node, placeholders))
+    return deepcopy(node)
+
+
+@lru_cache(maxsize=PARSER_CACHE_SIZE)
+def _parse_cached(rule: HogQLRule, query: str, start: Optional[int], backend: HogQLParserBackend) -> AST:
+    """Parse and convert the query. The returned node is shared between callers, so it must never be mutated."""
+    parse_tree = _get_parse_tree(rule, query, backend)
+    return HogQLParseTreeConverter(start=start).visit(parse_tree)
+
+
+def _get_parse_tree(rule: HogQLRule, query: str, backend: HogQLParserBackend) -> ParserRuleContext:
+    parse = RULE_TO_PARSE_FUNCTION[rule]
+    if backend == "python":
+        return parse(get_parser(query))
+    if backend != "python_sll":
+        raise ValueError(f"Unknown HogQL parser backend: {backend}")
+
+    parser = get_parser(query)
+    # First stage: SLL prediction, bailing out on the first error without reporting it
+    parser.removeErrorListeners()
+    parser._errHandler = BailErrorStrategy()
+    parser._interp.predictionMode = PredictionMode.SLL
+    try:
+        return parse(parser)
+    except ParseCancellationException:
+        pass
+
+    # Second stage: either the query is invalid, or SLL was too weak for it. Reparse the already lexed tokens in
+    # full LL mode, which reports the same errors as the "python" backend.
+    parser.getTokenStream().seek(0)
+    parser.reset()
+    parser.addErrorListener(HogQLErrorListener(query))
+    parser._errHandler = DefaultErrorStrategy()
+    parser._interp.predictionMode = PredictionMode.LL
+    return parse(parser)
 
 
 def get_parser(query: str) -> HogQLParser:
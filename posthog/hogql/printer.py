@@ -5,6 +5,7 @@ from difflib import get_close_matches
 from typing import List, Literal, Optional, Union, cast
 from uuid import UUID
 
+from posthog.clickhouse.property_access import record_property_access
 from posthog.hogql import ast
 from posthog.hogql.base import AST
 from posthog.hogql.constants import (
@@ -764,6 +765,8 @@ class _Printer(Visitor):
                 property_sql = self._print_identifier(materialized_column)
                 property_sql = f"{self.visit(field_type.table_type)}.{property_sql}"
                 materialized_property_sql = property_sql
+            elif self.dialect == "clickhouse":
+                record_property_access(table_name, field_name, type.chain[0])
         elif (
             self.context.within_non_hogql_query
             and (isinstance(table, ast.SelectQueryAliasType) and table.alias == "events__pdi__person")
@@ -771,11 +774,14 @@ class _Printer(Visitor):
         ):
             # :KLUDGE: Legacy person properties handling. Only used within non-HogQL queries, such as insights.
             if self.context.person_on_events_mode != PersonOnEventsMode.DISABLED:
-                materialized_column = self._get_materialized_column("events", type.chain[0], "person_properties")
+                table_name, field_name = "events", "person_properties"
             else:
-                materialized_column = self._get_materialized_column("person", type.chain[0], "properties")
+                table_name, field_name = "person", "properties"
+            materialized_column = self._get_materialized_column(table_name, type.chain[0], field_name)
             if materialized_column:
                 materialized_property_sql = self._print_identifier(materialized_column)
+            else:
+                record_property_access(table_name, field_name, type.chain[0])
 
         args: List[str] = []
         if materialized_property_sql is not None:
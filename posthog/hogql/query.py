@@ -3,11 +3,15 @@ from typing import Dict, Optional, Union, cast
 from posthog.clickhouse.client.connection import Workload
 from posthog.hogql import ast
 from posthog.hogql.constants import HogQLSettings
+from posthog.hogql.database.database import create_hogql_database
 from posthog.hogql.hogql import HogQLContext
 from posthog.hogql.parser import parse_select
 from posthog.hogql.placeholders import replace_placeholders
-from posthog.hogql.printer import prepare_ast_for_printing, print_ast, print_prepared_ast
-from posthog.hogql.visitor import clone_expr
+from posthog.hogql.printer import print_prepared_ast
+from posthog.hogql.resolver import resolve_types
+from posthog.hogql.timings import HogQLTimings
+from posthog.hogql.transforms.lazy_tables import resolve_lazy_tables
+from posthog.hogql.transforms.property_types import resolve_property_types
 from posthog.models.team import Team
 from posthog.clickhouse.query_tagging import tag_queries
 from posthog.client import sync_execute
@@ -23,13 +27,17 @@ def execute_hogql_query(
     settings: Optional[HogQLSettings] = None,
     default_limit: Optional[int] = None,
 ) -> HogQLQueryResponse:
-    if isinstance(query, ast.SelectQuery):
-        select_query = query
-        query = None
-    else:
-        select_query = parse_select(str(query))
+    timings = HogQLTimings()
 
-    select_query = replace_placeholders(select_query, placeholders)
+    with timings.measure("parse_select"):
+        if isinstance(query, ast.SelectQuery):
+            select_query = query
+            query = None
+        else:
+            select_query = parse_select(str(query))
+
+    with timings.measure("replace_placeholders"):
+        select_query = replace_placeholders(select_query, placeholders)
 
     if select_query.limit is None:
         # One more "max" of MAX_SELECT_RETURNED_ROWS (100k) in applied in the query printer, overriding this if higher.
@@ -37,31 +45,49 @@ def execute_hogql_query(
 
         select_query.limit = ast.Constant(value=default_limit or DEFAULT_RETURNED_ROWS)
 
-    # Get printed HogQL query, and returned columns. Using a cloned query.
+    with timings.measure("create_hogql_database"):
+        database = create_hogql_database(team.pk)
+
+    # Resolve the query only once. The HogQL query and the returned columns are printed from the typed AST before
+    # the ClickHouse-specific transforms run on it. Separate contexts keep ClickHouse values out of the HogQL print.
     hogql_query_context = HogQLContext(
-        team_id=team.pk, enable_select_queries=True, person_on_events_mode=team.person_on_events_mode
+        team_id=team.pk,
+        database=database,
+        enable_select_queries=True,
+        person_on_events_mode=team.person_on_events_mode,
     )
-    select_query_hogql = cast(
-        ast.SelectQuery,
-        prepare_ast_for_printing(node=clone_expr(select_query, True), context=hogql_query_context, dialect="hogql"),
+    clickhouse_context = HogQLContext(
+        team_id=team.pk,
+        database=database,
+        enable_select_queries=True,
+        person_on_events_mode=team.person_on_events_mode,
     )
-    hogql = print_prepared_ast(select_query_hogql, hogql_query_context, "hogql")
-    print_columns = []
-    for node in select_query_hogql.select:
-        if isinstance(node, ast.Alias):
-            print_columns.append(node.alias)
-        else:
-            print_columns.append(
-                print_prepared_ast(node=node, context=hogql_query_context, dialect="hogql", stack=[select_query_hogql])
-            )
+
+    with timings.measure("resolve_types"):
+        resolved_query = cast(ast.SelectQuery, resolve_types(select_query, clickhouse_context))
+
+    with timings.measure("print_hogql"):
+        hogql = print_prepared_ast(resolved_query, hogql_query_context, "hogql")
+        print_columns = []
+        for node in resolved_query.select:
+            if isinstance(node, ast.Alias):
+                print_columns.append(node.alias)
+            else:
+                print_columns.append(
+                    print_prepared_ast(node=node, context=hogql_query_context, dialect="hogql", stack=[resolved_query])
+                )
 
     # Print the ClickHouse SQL query
-    clickhouse_context = HogQLContext(
-        team_id=team.pk, enable_select_queries=True, person_on_events_mode=team.person_on_events_mode
-    )
-    clickhouse_sql = print_ast(
-        select_query, context=clickhouse_context, dialect="clickhouse", settings=settings or HogQLSettings()
-    )
+    with timings.measure("resolve_property_types"):
+        resolved_query = cast(ast.SelectQuery, resolve_property_types(resolved_query, clickhouse_context))
+
+    with timings.measure("resolve_lazy_tables"):
+        resolve_lazy_tables(resolved_query, None, clickhouse_context)
+
+    with timings.measure("print_clickhouse"):
+        clickhouse_sql = print_prepared_ast(
+            resolved_query, context=clickhouse_context, dialect="clickhouse", settings=settings or HogQLSettings()
+        )
 
     tag_queries(
         team_id=team.pk,
@@ -70,14 +96,15 @@ def execute_hogql_query(
         has_json_operations="JSONExtract" in clickhouse_sql or "JSONHas" in clickhouse_sql,
     )
 
-    results, types = sync_execute(
-        clickhouse_sql,
-        clickhouse_context.values,
-        with_column_types=True,
-        workload=workload,
-        team_id=team.pk,
-        readonly=True,
-    )
+    with timings.measure("clickhouse_execute"):
+        results, types = sync_execute(
+            clickhouse_sql,
+            clickhouse_context.values,
+            with_column_types=True,
+            workload=workload,
+            team_id=team.pk,
+            readonly=True,
+        )
 
     return HogQLQueryResponse(
         query=query,
@@ -86,4 +113,5 @@ def execute_hogql_query(
         results=results,
         columns=print_columns,
         types=types,
+        timings=timings.to_list(),
     )
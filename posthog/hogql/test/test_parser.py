@@ -4,19 +4,20 @@ import math
 
 from posthog.hogql import ast
 from posthog.hogql.errors import HogQLException
-from posthog.hogql.parser import parse_expr, parse_order_expr, parse_select
+from posthog.hogql.parser import HogQLParserBackend, parse_expr, parse_order_expr, parse_select
 from posthog.hogql.visitor import clear_locations
 from posthog.test.base import BaseTest
 
 
 class TestParser(BaseTest):
     maxDiff = None
+    backend: HogQLParserBackend = "python"
 
     def _expr(self, expr: str, placeholders: Optional[Dict[str, ast.Expr]] = None) -> ast.Expr:
-        return clear_locations(parse_expr(expr, placeholders=placeholders))
+        return clear_locations(parse_expr(expr, placeholders=placeholders, backend=self.backend))
 
     def _select(self, query: str, placeholders: Optional[Dict[str, ast.Expr]] = None) -> ast.Expr:
-        return clear_locations(parse_select(query, placeholders=placeholders))
+        return clear_locations(parse_select(query, placeholders=placeholders, backend=self.backend))
 
     def test_numbers(self):
         self.assertEqual(self._expr("1"), ast.Constant(value=1))
@@ -743,15 +744,15 @@ class TestParser(BaseTest):
 
     def test_order_by(self):
         self.assertEqual(
-            parse_order_expr("1 ASC"),
+            parse_order_expr("1 ASC", backend=self.backend),
             ast.OrderExpr(expr=ast.Constant(value=1, start=0, end=1), order="ASC", start=0, end=5),
         )
         self.assertEqual(
-            parse_order_expr("event"),
+            parse_order_expr("event", backend=self.backend),
             ast.OrderExpr(expr=ast.Field(chain=["event"], start=0, end=5), order="ASC", start=0, end=5),
         )
         self.assertEqual(
-            parse_order_expr("timestamp DESC"),
+            parse_order_expr("timestamp DESC", backend=self.backend),
             ast.OrderExpr(expr=ast.Field(chain=["timestamp"], start=0, end=9), order="DESC", start=0, end=14),
         )
 
@@ -1109,3 +1110,36 @@ class TestParser(BaseTest):
             self._select(query)
         self.assertEqual(e.exception.start, 7)
         self.assertEqual(e.exception.end, 24)
+
+    def test_parser_cache_returns_fresh_nodes(self):
+        first = parse_select("SELECT event FROM events WHERE 1 = 1", backend=self.backend)
+        second = parse_select("SELECT event FROM events WHERE 1 = 1", backend=self.backend)
+        self.assertEqual(first, second)
+        self.assertIsNot(first, second)
+
+        # mutating a returned node must not leak into later parses of the same query
+        cast(ast.SelectQuery, first).where = None
+        cast(ast.Field, cast(ast.SelectQuery, first).select[0]).chain.append("properties")
+        third = cast(ast.SelectQuery, parse_select("SELECT event FROM events WHERE 1 = 1", backend=self.backend))
+        self.assertEqual(clear_locations(cast(ast.Expr, third.where)), self._expr("1 = 1"))
+        self.assertEqual(cast(ast.Field, third.select[0]).chain, ["event"])
+
+    def test_parser_cache_keeps_placeholders_separate(self):
+        self.assertEqual(
+            self._expr("{a} + 1", placeholders={"a": ast.Constant(value=1)}),
+            ast.ArithmeticOperation(
+                op=ast.ArithmeticOperationOp.Add, left=ast.Constant(value=1), right=ast.Constant(value=1)
+            ),
+        )
+        self.assertEqual(
+            self._expr("{a} + 1", placeholders={"a": ast.Constant(value=2)}),
+            ast.ArithmeticOperation(
+                op=ast.ArithmeticOperationOp.Add, left=ast.Constant(value=2), right=ast.Constant(value=1)
+            ),
+        )
+
+
+class TestParserSLL(TestParser):
+    """Runs the whole parser test suite against the two-stage SLL/LL backend, to make sure it produces identical ASTs."""
+
+    backend: HogQLParserBackend = "python_sll"
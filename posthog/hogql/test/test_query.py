@@ -39,6 +39,23 @@ class TestQuery(ClickhouseTestMixin, APIBaseTest):
         flush_persons_and_events()
         return random_uuid
 
+    def test_query_timings(self):
+        with freeze_time("2020-01-10"):
+            response = execute_hogql_query("select count(), event from events group by event", team=self.team)
+            timing_keys = [timing.k for timing in response.timings or []]
+            for key in [
+                "./parse_select",
+                "./replace_placeholders",
+                "./create_hogql_database",
+                "./resolve_types",
+                "./print_hogql",
+                "./print_clickhouse",
+                "./clickhouse_execute",
+                ".",
+            ]:
+                self.assertIn(key, timing_keys)
+            self.assertTrue(all(timing.t >= 0 for timing in response.timings or []))
+
     def test_query(self):
         with freeze_time("2020-01-10"):
             random_uuid = self._create_random_events()
@@ -0,0 +1,51 @@
+from unittest.mock import patch
+
+from posthog.hogql.timings import HogQLTimings
+from posthog.test.base import BaseTest
+
+
+class FakePerfCounter:
+    def __init__(self):
+        self.current = 0.0
+
+    def __call__(self):
+        self.current += 1.0
+        return self.current
+
+
+class TestHogQLTimings(BaseTest):
+    def test_basic_timing(self):
+        with patch("posthog.hogql.timings.perf_counter", FakePerfCounter()):
+            timings = HogQLTimings()
+            with timings.measure("test"):
+                pass
+            results = timings.to_dict()
+            self.assertEqual(results["./test"], 1.0)
+            self.assertEqual(results["."], 3.0)
+
+    def test_nested_timing(self):
+        with patch("posthog.hogql.timings.perf_counter", FakePerfCounter()):
+            timings = HogQLTimings()
+            with timings.measure("outer"):
+                with timings.measure("inner"):
+                    pass
+            results = timings.to_dict()
+            self.assertEqual(results["./outer/inner"], 1.0)
+            self.assertEqual(results["./outer"], 3.0)
+            self.assertEqual(results["."], 5.0)
+
+    def test_repeated_timings_add_up(self):
+        with patch("posthog.hogql.timings.perf_counter", FakePerfCounter()):
+            timings = HogQLTimings()
+            with timings.measure("test"):
+                pass
+            with timings.measure("test"):
+                pass
+            self.assertEqual(timings.to_dict()["./test"], 2.0)
+
+    def test_to_list(self):
+        with patch("posthog.hogql.timings.perf_counter", FakePerfCounter()):
+            timings = HogQLTimings()
+            with timings.measure("test"):
+                pass
+            self.assertEqual([(timing.k, timing.t) for timing in timings.to_list()], [("./test", 1.0), (".", 3.0)])
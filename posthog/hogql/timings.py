@@ -0,0 +1,40 @@
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Dict, List
+
+from posthog.schema import QueryTiming
+
+
+class HogQLTimings:
+    """Collects how long the different stages of a HogQL query take. Nested measurements are keyed by their path."""
+
+    def __init__(self):
+        # Completed time in seconds for different parts of the HogQL query
+        self.timings: Dict[str, float] = {}
+        # Used for housekeeping
+        self._timing_starts: Dict[str, float] = {}
+        self._timing_pointer = "."
+        self._timing_starts[self._timing_pointer] = perf_counter()
+
+    @contextmanager
+    def measure(self, key: str):
+        last_key = self._timing_pointer
+        full_key = f"{self._timing_pointer}/{key}"
+        self._timing_pointer = full_key
+        self._timing_starts[full_key] = perf_counter()
+        try:
+            yield
+        finally:
+            duration = perf_counter() - self._timing_starts[full_key]
+            self.timings[full_key] = self.timings.get(full_key, 0.0) + duration
+            del self._timing_starts[full_key]
+            self._timing_pointer = last_key
+
+    def to_dict(self) -> Dict[str, float]:
+        timings = {**self.timings}
+        for key, start in reversed(self._timing_starts.items()):
+            timings[key] = timings.get(key, 0.0) + (perf_counter() - start)
+        return timings
+
+    def to_list(self) -> List[QueryTiming]:
+        return [QueryTiming(k=key, t=time) for key, time in self.to_dict().items()]
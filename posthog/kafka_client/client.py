@@ -1,6 +1,8 @@
 import json
+import threading
+from collections import Counter
 from enum import Enum
-from typing import Any, Callable, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
 
 import kafka.errors
 from kafka import KafkaConsumer as KC
@@ -19,6 +21,9 @@ KAFKA_PRODUCER_RETRIES = 5
 
 logger = get_logger(__name__)
 
+# Shared by all messages, `json.dumps` would otherwise check its arguments for every one of them
+_json_encoder = json.JSONEncoder()
+
 
 class KafkaProducerForTests:
     def __init__(self):
@@ -80,6 +85,13 @@ class _KafkaSecurityProtocol(str, Enum):
     SASL_SSL = "SASL_SSL"
 
 
+class KafkaMessage(NamedTuple):
+    topic: str
+    data: Any
+    key: Optional[str] = None
+    headers: Optional[List[Tuple[str, str]]] = None
+
+
 def _sasl_params():
     if settings.KAFKA_SECURITY_PROTOCOL in [_KafkaSecurityProtocol.SASL_PLAINTEXT, _KafkaSecurityProtocol.SASL_SSL]:
         return {
@@ -101,6 +113,8 @@ class _KafkaProducer:
         kafka_security_protocol=None,
         max_request_size=None,
         compression_type=None,
+        linger_ms=None,
+        batch_size=None,
     ):
         if kafka_security_protocol is None:
             kafka_security_protocol = settings.KAFKA_SECURITY_PROTOCOL
@@ -108,24 +122,32 @@ class _KafkaProducer:
             kafka_hosts = settings.KAFKA_HOSTS
         if kafka_base64_keys is None:
             kafka_base64_keys = settings.KAFKA_BASE64_KEYS
+        if linger_ms is None:
+            linger_ms = settings.KAFKA_PRODUCER_LINGER_MS
+        if batch_size is None:
+            batch_size = settings.KAFKA_PRODUCER_BATCH_SIZE_BYTES
 
         if test:
             self.producer = KafkaProducerForTests()
         elif kafka_base64_keys:
-            self.producer = helper.get_kafka_producer(retries=KAFKA_PRODUCER_RETRIES, value_serializer=lambda d: d)
+            self.producer = helper.get_kafka_producer(
+                retries=KAFKA_PRODUCER_RETRIES, value_serializer=lambda d: d, linger_ms=linger_ms, batch_size=batch_size
+            )
         else:
             self.producer = KP(
                 retries=KAFKA_PRODUCER_RETRIES,
                 bootstrap_servers=kafka_hosts,
                 security_protocol=kafka_security_protocol or _KafkaSecurityProtocol.PLAINTEXT,
                 compression_type=compression_type,
+                linger_ms=linger_ms,
+                batch_size=batch_size,
                 **{"max_request_size": max_request_size} if max_request_size else {},
                 **_sasl_params(),
             )
 
     @staticmethod
     def json_serializer(d):
-        b = json.dumps(d).encode("utf-8")
+        b = _json_encoder.encode(d).encode("utf-8")
         return b
 
     def on_send_success(self, record_metadata: RecordMetadata):
@@ -144,21 +166,78 @@ class _KafkaProducer:
     ):
         if not value_serializer:
             value_serializer = self.json_serializer
-        b = value_serializer(data)
+        future = self._send(topic, value_serializer(data), key, headers)
+        # Record if the send request was successful or not
+        future.add_callback(self.on_send_success).add_errback(lambda exc: self.on_send_failure(topic=topic, exc=exc))
+        return future
+
+    def produce_batch(
+        self,
+        messages: List[KafkaMessage],
+        on_complete: Optional[Callable[[List[Exception]], None]] = None,
+    ) -> List[FutureRecordMetadata]:
+        """
+        Produce several messages at once, e.g. all events of a capture request, serialized as JSON.
+
+        Rather than separate success and failure callbacks for every message, the whole batch shares one completion
+        callback, which records metrics per topic and calls `on_complete` with the errors of the batch once every
+        message has been acknowledged or has failed. The futures of the messages are returned in the same order.
+        """
+        callback = _BatchProduceCallback(len(messages), on_complete)
+        futures = []
+        for message in messages:
+            future = self._send(message.topic, self.json_serializer(message.data), message.key, message.headers)
+            future.add_both(callback, message.topic)
+            futures.append(future)
+        return futures
+
+    def _send(
+        self, topic: str, value: Any, key: Any = None, headers: Optional[List[Tuple[str, str]]] = None
+    ) -> FutureRecordMetadata:
         if key is not None:
             key = key.encode("utf-8")
         encoded_headers = (
             [(header[0], header[1].encode("utf-8")) for header in headers] if headers is not None else None
         )
-        future = self.producer.send(topic, value=b, key=key, headers=encoded_headers)
-        # Record if the send request was successful or not
-        future.add_callback(self.on_send_success).add_errback(lambda exc: self.on_send_failure(topic=topic, exc=exc))
-        return future
+        return self.producer.send(topic, value=value, key=key, headers=encoded_headers)
 
     def close(self):
         self.producer.flush()
 
 
+class _BatchProduceCallback:
+    def __init__(self, size: int, on_complete: Optional[Callable[[List[Exception]], None]]) -> None:
+        self._pending = size
+        self._on_complete = on_complete
+        self._succeeded: Counter = Counter()
+        self._failed: Counter = Counter()
+        self._errors: List[Exception] = []
+        self._lock = threading.Lock()
+        if size == 0:
+            self._complete()
+
+    def __call__(self, topic: str, result: Any) -> None:
+        # Called with the record metadata on success, or the exception on failure
+        with self._lock:
+            if isinstance(result, Exception):
+                self._errors.append(result)
+                self._failed[(topic, result.__class__.__name__)] += 1
+            else:
+                self._succeeded[topic] += 1
+            self._pending -= 1
+            if self._pending > 0:
+                return
+        self._complete()
+
+    def _complete(self) -> None:
+        for topic, count in self._succeeded.items():
+            statsd.incr("posthog_cloud_kafka_send_success", count, tags={"topic": topic})
+        for (topic, exception), count in self._failed.items():
+            statsd.incr("posthog_cloud_kafka_send_failure", count, tags={"topic": topic, "exception": exception})
+        if self._on_complete is not None:
+            self._on_complete(self._errors)
+
+
 def can_connect():
     """
     This is intended to validate if we are able to connect to kafka, without
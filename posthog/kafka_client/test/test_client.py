@@ -1,9 +1,10 @@
-from unittest.mock import patch
+from unittest.mock import Mock, patch
 
 import kafka
 from django.test import TestCase, override_settings
+from kafka.future import Future
 
-from posthog.kafka_client.client import _KafkaProducer, build_kafka_consumer
+from posthog.kafka_client.client import KafkaMessage, _KafkaProducer, build_kafka_consumer
 
 
 class KafkaClientTestCase(TestCase):
@@ -20,6 +21,38 @@ class KafkaClientTestCase(TestCase):
         msg = next(consumer)
         self.assertEqual(msg, "message 1 from test_topic topic")
 
+    def test_kafka_produce_batch(self):
+        producer = _KafkaProducer(test=True)
+        on_complete = Mock()
+
+        futures = producer.produce_batch(
+            [KafkaMessage(topic=self.topic, data=self.payload), KafkaMessage(topic=self.topic, data="any", key="key")],
+            on_complete=on_complete,
+        )
+
+        self.assertEqual(len(futures), 2)
+        self.assertTrue(all(future.succeeded() for future in futures))
+        on_complete.assert_called_once_with([])
+
+    def test_kafka_produce_batch_reports_errors_once(self):
+        producer = _KafkaProducer(test=True)
+        on_complete = Mock()
+        pending_futures = [Future(), Future()]
+
+        with patch.object(producer.producer, "send", side_effect=pending_futures):
+            producer.produce_batch([KafkaMessage(topic=self.topic, data=self.payload)] * 2, on_complete=on_complete)
+
+        error = kafka.errors.KafkaTimeoutError()
+        pending_futures[0].failure(error)
+        on_complete.assert_not_called()
+        pending_futures[1].success(None)
+        on_complete.assert_called_once_with([error])
+
+    def test_kafka_produce_batch_without_messages(self):
+        on_complete = Mock()
+        self.assertEqual(_KafkaProducer(test=True).produce_batch([], on_complete=on_complete), [])
+        on_complete.assert_called_once_with([])
+
     def test_kafka_produce(self):
         producer = _KafkaProducer(test=False)
         producer.produce(topic=self.topic, data=self.payload)
@@ -20,6 +20,7 @@ from statshog.defaults.django import statsd
 from posthog.api.capture import get_event
 from posthog.api.decide import get_decide
 from posthog.clickhouse.client.execute import clickhouse_query_counter
+from posthog.clickhouse.property_access import reset_property_accesses
 from posthog.clickhouse.query_tagging import QueryCounter, reset_query_tags, tag_queries
 from posthog.cloud_utils import is_cloud
 from posthog.exceptions import generate_exception_response
@@ -208,6 +209,8 @@ class CHQueries:
 
         user = cast(User, request.user)
 
+        # Workers are reused, so accesses of a query the previous request compiled but didn't execute are dropped
+        reset_property_accesses()
         tag_queries(
             user_id=user.pk,
             kind="request",
@@ -189,15 +189,21 @@ class Cohort(models.Model):
             "deleted": self.deleted,
         }
 
-    def calculate_people_ch(self, pending_version):
+    def calculate_people_ch(self, pending_version, incremental: bool = False):
         from posthog.models.cohort.util import recalculate_cohortpeople
         from posthog.tasks.calculate_cohort import clear_stale_cohort
 
-        logger.warn("cohort_calculation_started", id=self.pk, current_version=self.version, new_version=pending_version)
+        logger.warn(
+            "cohort_calculation_started",
+            id=self.pk,
+            current_version=self.version,
+            new_version=pending_version,
+            incremental=incremental,
+        )
         start_time = time.monotonic()
 
         try:
-            count = recalculate_cohortpeople(self, pending_version)
+            count = recalculate_cohortpeople(self, pending_version, incremental=incremental)
             self.count = count
 
             self.last_calculation = timezone.now()
@@ -43,6 +43,31 @@ FROM cohortpeople
 WHERE team_id = %(team_id)s AND cohort_id = %(cohort_id)s AND version < %(new_version)s AND sign = 1
 """
 
+# Persons whose properties have changed (or who were deleted or merged) since the given time
+GET_CHANGED_PERSON_IDS = """
+SELECT id FROM person WHERE team_id = %(team_id)s AND _timestamp >= %(changed_since)s
+"""
+
+# Same as RECALCULATE_COHORT_BY_ID, except that the cohort filter is only evaluated for the persons that have changed
+# since the current version was calculated. Everyone else keeps their membership of the current version.
+RECALCULATE_COHORT_INCREMENTALLY_BY_ID = """
+INSERT INTO cohortpeople
+SELECT DISTINCT person_id, %(cohort_id)s as cohort_id, %(team_id)s as team_id, 1 AS sign, %(new_version)s AS version
+FROM cohortpeople
+WHERE team_id = %(team_id)s AND cohort_id = %(cohort_id)s AND version = %(current_version)s AND sign = 1
+AND person_id NOT IN ({changed_persons})
+UNION ALL
+SELECT id, %(cohort_id)s as cohort_id, %(team_id)s as team_id, 1 AS sign, %(new_version)s AS version
+FROM (
+    {cohort_filter}
+) as person
+WHERE id IN ({changed_persons})
+UNION ALL
+SELECT person_id, cohort_id, team_id, -1, version
+FROM cohortpeople
+WHERE team_id = %(team_id)s AND cohort_id = %(cohort_id)s AND version < %(new_version)s AND sign = 1
+"""
+
 # NOTE: Group by version id to ensure that signs are summed between corresponding rows.
 # Version filtering is not necessary as only positive rows of the latest version will be selected by sum(sign) > 0
 
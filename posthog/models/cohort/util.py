@@ -17,12 +17,14 @@ from posthog.models.async_deletion import AsyncDeletion, DeletionType
 from posthog.models.cohort.cohort import Cohort
 from posthog.models.cohort.sql import (
     CALCULATE_COHORT_PEOPLE_SQL,
+    GET_CHANGED_PERSON_IDS,
     GET_COHORT_SIZE_SQL,
     GET_COHORTS_BY_PERSON_UUID,
     GET_PERSON_ID_BY_PRECALCULATED_COHORT_ID,
     GET_STATIC_COHORT_SIZE_SQL,
     GET_STATIC_COHORTPEOPLE_BY_PERSON_UUID,
     RECALCULATE_COHORT_BY_ID,
+    RECALCULATE_COHORT_INCREMENTALLY_BY_ID,
     STALE_COHORTPEOPLE,
 )
 from posthog.models.person.sql import (
@@ -38,6 +40,10 @@ from posthog.queries.person_distinct_id_query import get_team_distinct_ids_query
 # temporary marker to denote when cohortpeople table started being populated
 TEMP_PRECALCULATED_MARKER = parser.parse("2021-06-07T15:00:00+00:00")
 
+# How far before the last calculation changed persons are looked for, to cover the calculation's own duration and
+# persons ingested into ClickHouse late
+INCREMENTAL_RECALCULATION_LOOKBACK = timedelta(hours=1)
+
 logger = structlog.get_logger(__name__)
 
 
@@ -246,30 +252,52 @@ def get_static_cohort_size(cohort: Cohort) -> Optional[int]:
         return None
 
 
-def recalculate_cohortpeople(cohort: Cohort, pending_version: int) -> Optional[int]:
+def can_recalculate_incrementally(cohort: Cohort) -> bool:
+    """
+    Whether only the persons that changed since the last calculation need to be evaluated again.
+
+    That's the case for cohorts that only filter on person properties: membership of behavioral cohorts changes as
+    time passes even without new events, and cohorts of cohorts change along with the cohorts they're based on.
+    """
+    if cohort.is_static or cohort.version is None or cohort.last_calculation is None or cohort.errors_calculating:
+        return False
+    properties = cohort.properties.flat
+    return len(properties) > 0 and all(prop.type == "person" for prop in properties)
+
+
+def recalculate_cohortpeople(cohort: Cohort, pending_version: int, incremental: bool = False) -> Optional[int]:
     hogql_context = HogQLContext(within_non_hogql_query=True, team_id=cohort.team_id)
     cohort_query, cohort_params = format_person_query(cohort, 0, hogql_context)
+    incremental = incremental and can_recalculate_incrementally(cohort)
 
     before_count = get_cohort_size(cohort)
 
     if before_count:
         logger.warn(
-            "Recalculating cohortpeople starting", team_id=cohort.team_id, cohort_id=cohort.pk, size_before=before_count
+            "Recalculating cohortpeople starting",
+            team_id=cohort.team_id,
+            cohort_id=cohort.pk,
+            size_before=before_count,
+            incremental=incremental,
         )
 
-    recalcluate_cohortpeople_sql = RECALCULATE_COHORT_BY_ID.format(cohort_filter=cohort_query)
+    params = {
+        **cohort_params,
+        **hogql_context.values,
+        "cohort_id": cohort.pk,
+        "team_id": cohort.team_id,
+        "new_version": pending_version,
+    }
+    if incremental:
+        recalcluate_cohortpeople_sql = RECALCULATE_COHORT_INCREMENTALLY_BY_ID.format(
+            cohort_filter=cohort_query, changed_persons=GET_CHANGED_PERSON_IDS
+        )
+        changed_since = cohort.last_calculation - INCREMENTAL_RECALCULATION_LOOKBACK
+        params.update(current_version=cohort.version, changed_since=changed_since.strftime("%Y-%m-%d %H:%M:%S"))
+    else:
+        recalcluate_cohortpeople_sql = RECALCULATE_COHORT_BY_ID.format(cohort_filter=cohort_query)
 
-    sync_execute(
-        recalcluate_cohortpeople_sql,
-        {
-            **cohort_params,
-            **hogql_context.values,
-            "cohort_id": cohort.pk,
-            "team_id": cohort.team_id,
-            "new_version": pending_version,
-        },
-        settings={"optimize_on_insert": 0},
-    )
+    sync_execute(recalcluate_cohortpeople_sql, params, settings={"optimize_on_insert": 0})
 
     count = get_cohort_size(cohort, override_version=pending_version)
 
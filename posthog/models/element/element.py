@@ -1,5 +1,7 @@
 import re
-from typing import List
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 from django.contrib.postgres.fields import ArrayField
 from django.db import models
@@ -58,34 +60,103 @@ def elements_to_string(elements: List[Element]) -> str:
     return ";".join(ret)
 
 
+@dataclass(frozen=True, slots=True)
+class ParsedElement:
+    """
+    An element parsed from an `elements_chain`, with the same fields as `Element`. Parsed chains are cached and
+    shared, which is why these are immutable, and much cheaper to create than model instances.
+    """
+
+    order: int
+    tag_name: Optional[str] = None
+    attr_class: Optional[Tuple[str, ...]] = None
+    href: Optional[str] = None
+    attr_id: Optional[str] = None
+    nth_child: Optional[int] = None
+    nth_of_type: Optional[int] = None
+    text: Optional[str] = None
+    attributes: Tuple[Tuple[str, str], ...] = field(default=())
+
+    def to_element(self) -> Element:
+        return Element(
+            order=self.order,
+            tag_name=self.tag_name,
+            attr_class=list(self.attr_class) if self.attr_class is not None else None,
+            href=self.href,
+            attr_id=self.attr_id,
+            nth_child=self.nth_child,
+            nth_of_type=self.nth_of_type,
+            text=self.text,
+            attributes=dict(self.attributes),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        "Same as serializing the element with `ElementSerializer`, without creating a model instance"
+        return {
+            "text": self.text,
+            "tag_name": self.tag_name,
+            "attr_class": list(self.attr_class) if self.attr_class is not None else None,
+            "href": self.href,
+            "attr_id": self.attr_id,
+            "nth_child": self.nth_child,
+            "nth_of_type": self.nth_of_type,
+            "attributes": dict(self.attributes),
+            "order": self.order,
+        }
+
+
 def chain_to_elements(chain: str) -> List[Element]:
-    elements = []
-    for idx, el_string in enumerate(re.findall(split_chain_regex, chain)):
-        el_string_split = re.findall(split_class_attributes, el_string)[0]
-        attributes = re.finditer(parse_attributes_regex, el_string_split[2]) if len(el_string_split) > 2 else []
-
-        element = Element(order=idx)
-
-        if el_string_split[0]:
-            tag_and_class = el_string_split[0].split(".", 1)
-            element.tag_name = tag_and_class[0]
-            if len(tag_and_class) > 1:
-                element.attr_class = [cl for cl in tag_and_class[1].split(".") if cl != ""]
-
-        for ii in attributes:
-            item = ii.groupdict()
-            if item["key"] == "href":
-                element.href = item["value"]
-            elif item["key"] == "nth-child":
-                element.nth_child = int(item["value"])
-            elif item["key"] == "nth-of-type":
-                element.nth_of_type = int(item["value"])
-            elif item["key"] == "text":
-                element.text = item["value"]
-            elif item["key"] == "attr_id":
-                element.attr_id = item["value"]
-            elif item["key"]:
-                element.attributes[item["key"]] = item["value"]
-
-        elements.append(element)
-    return elements
+    return [element.to_element() for element in parse_elements_chain(chain)]
+
+
+def chain_to_element_dicts(chain: str) -> List[Dict[str, Any]]:
+    "The elements of the chain, serialized the same as with `ElementSerializer`"
+    return [element.to_dict() for element in parse_elements_chain(chain)]
+
+
+def parse_elements_chains(chains: Iterable[str]) -> Dict[str, Tuple[ParsedElement, ...]]:
+    "Parse many chains at once, e.g. of a page of events, parsing each distinct chain only once"
+    return {chain: parse_elements_chain(chain) for chain in set(chains)}
+
+
+@lru_cache(maxsize=4096)
+def parse_elements_chain(chain: str) -> Tuple[ParsedElement, ...]:
+    """
+    Parse an `elements_chain`. The same chains come up over and over again, e.g. for every autocapture event on the
+    same button, so parsed chains are cached.
+    """
+    return tuple(_parse_element(idx, el_string) for idx, el_string in enumerate(split_chain_regex.findall(chain)))
+
+
+def _parse_element(order: int, el_string: str) -> ParsedElement:
+    # Matches at the start of any string, as both the tag/classes and the attributes can be empty
+    tag_and_classes, _, attributes_string = split_class_attributes.match(el_string).groups("")  # type: ignore
+
+    tag_name = None
+    attr_class = None
+    if tag_and_classes:
+        tag_and_class = tag_and_classes.split(".", 1)
+        tag_name = tag_and_class[0]
+        if len(tag_and_class) > 1:
+            attr_class = tuple(cl for cl in tag_and_class[1].split(".") if cl != "")
+
+    fields: Dict[str, Any] = {}
+    attributes: Dict[str, str] = {}
+    for match in parse_attributes_regex.finditer(attributes_string):
+        key, value = match.group("key", "value")
+        if key == "href":
+            fields["href"] = value
+        elif key == "nth-child":
+            fields["nth_child"] = int(value)
+        elif key == "nth-of-type":
+            fields["nth_of_type"] = int(value)
+        elif key == "text":
+            fields["text"] = value
+        elif key == "attr_id":
+            fields["attr_id"] = value
+        elif key:
+            attributes[key] = value
+
+    return ParsedElement(
+        order=order, tag_name=tag_name, attr_class=attr_class, attributes=tuple(attributes.items()), **fields
+    )
@@ -6,7 +6,6 @@ from dateutil.parser import isoparse
 from django.db.models import Prefetch
 from django.utils.timezone import now
 
-from posthog.api.element import ElementSerializer
 from posthog.api.utils import get_pk_or_uuid
 from posthog.clickhouse.client.connection import Workload
 from posthog.hogql import ast
@@ -14,7 +13,7 @@ from posthog.hogql.parser import parse_expr, parse_order_expr
 from posthog.hogql.property import action_to_expr, has_aggregation, property_to_expr
 from posthog.hogql.query import execute_hogql_query
 from posthog.models import Action, Person, Team
-from posthog.models.element import chain_to_elements
+from posthog.models.element import chain_to_element_dicts
 from posthog.models.person.util import get_persons_by_distinct_ids
 from posthog.schema import EventsQuery, EventsQueryResponse
 from posthog.utils import relative_date_parse
@@ -152,9 +151,7 @@ def run_events_query(
             new_result = dict(zip(SELECT_STAR_FROM_EVENTS_FIELDS, select))
             new_result["properties"] = json.loads(new_result["properties"])
             if new_result["elements_chain"]:
-                new_result["elements"] = ElementSerializer(
-                    chain_to_elements(new_result["elements_chain"]), many=True
-                ).data
+                new_result["elements"] = chain_to_element_dicts(new_result["elements_chain"])
             query_result.results[index][star_idx] = new_result
 
     if len(person_indices) > 0 and len(query_result.results) > 0:
@@ -12,7 +12,7 @@ from posthog.client import sync_execute
 from posthog.kafka_client.client import ClickhouseProducer
 from posthog.kafka_client.topics import KAFKA_EVENTS_JSON
 from posthog.models import Group
-from posthog.models.element.element import Element, chain_to_elements, elements_to_string
+from posthog.models.element.element import Element, chain_to_element_dicts, elements_to_string
 from posthog.models.event.sql import BULK_INSERT_EVENT_SQL, INSERT_EVENT_SQL
 from posthog.models.person import Person
 from posthog.models.team import Team
@@ -313,7 +313,7 @@ class ClickhouseEventSerializer(serializers.Serializer):
     def get_elements(self, event):
         if not event["elements_chain"]:
             return []
-        return ElementSerializer(chain_to_elements(event["elements_chain"]), many=True).data
+        return [{"event": None, **element} for element in chain_to_element_dicts(event["elements_chain"])]
 
     def get_elements_chain(self, event):
         return event["elements_chain"]
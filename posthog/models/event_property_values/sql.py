@@ -0,0 +1,167 @@
+from django.conf import settings
+
+from posthog.clickhouse.kafka_engine import trim_quotes_expr
+from posthog.clickhouse.table_engines import AggregatingMergeTree, Distributed, ReplicationScheme
+
+EVENT_PROPERTY_VALUES_DATA_TABLE = lambda: "sharded_event_property_values"
+
+"""
+Index of the values seen for each event property, used to suggest values in property filters without scanning events.
+
+Rows are written by a materialized view on the events data table, so every shard indexes the events it stores. The
+table is aggregated by (team_id, property_key, event, day) and only keeps the most common values of each of these, along
+with an estimate of how many distinct values there are. That bounds the size of the index no matter how many distinct
+values a property has, e.g. for URLs or IDs, and the distinct count tells whether the index holds all of them.
+"""
+
+# Properties which are different for nearly every event, so suggesting their values is useless
+EVENT_PROPERTY_VALUES_EXCLUDED_KEYS = (
+    "$insert_id",
+    "$time",
+    "$sent_at",
+    "$session_id",
+    "$window_id",
+    "$pageview_id",
+    "$anon_distinct_id",
+    "$device_id",
+    "$user_id",
+    "distinct_id",
+    "token",
+    "$ip",
+    "$performance_raw",
+    "$snapshot_data",
+)
+# Longer values are rarely picked from suggestions and take up most of the space. They're counted as an empty value
+# instead, which real values never are, so it's known when values are missing from the index
+EVENT_PROPERTY_VALUES_MAX_VALUE_LENGTH = 200
+# How many of the most common values are kept per property, event and day
+EVENT_PROPERTY_VALUES_TOP_K = 100
+
+EVENT_PROPERTY_VALUES_TTL_DAYS = 30
+# Values are suggested from the last 7 days of events
+EVENT_PROPERTY_VALUES_BACKFILL_DAYS = 7
+
+EVENT_PROPERTY_VALUES_TABLE_BASE_SQL = """
+CREATE TABLE IF NOT EXISTS {table_name} ON CLUSTER '{cluster}'
+(
+    team_id Int64,
+    property_key VARCHAR,
+    event VARCHAR,
+    day Date,
+    top_values AggregateFunction(topK({top_k}), String),
+    distinct_values AggregateFunction(uniq, String)
+) ENGINE = {engine}
+"""
+
+EVENT_PROPERTY_VALUES_DATA_TABLE_ENGINE = lambda: AggregatingMergeTree(
+    "event_property_values", replication_scheme=ReplicationScheme.SHARDED
+)
+
+EVENT_PROPERTY_VALUES_TABLE_SQL = lambda: (
+    EVENT_PROPERTY_VALUES_TABLE_BASE_SQL
+    + """
+ORDER BY (team_id, property_key, event, day)
+TTL day + INTERVAL {ttl_days} DAY
+"""
+).format(
+    table_name=EVENT_PROPERTY_VALUES_DATA_TABLE(),
+    cluster=settings.CLICKHOUSE_CLUSTER,
+    engine=EVENT_PROPERTY_VALUES_DATA_TABLE_ENGINE(),
+    top_k=EVENT_PROPERTY_VALUES_TOP_K,
+    ttl_days=EVENT_PROPERTY_VALUES_TTL_DAYS,
+)
+
+EVENT_PROPERTY_VALUES_SELECT_SQL = """
+SELECT
+team_id,
+property_key,
+event,
+toDate(timestamp) AS day,
+topKState({top_k})(if(length(property_value) <= {max_value_length}, property_value, '')) AS top_values,
+uniqState(property_value) AS distinct_values
+FROM (
+    SELECT
+        team_id,
+        event,
+        timestamp,
+        property.1 AS property_key,
+        {property_value} AS property_value
+    FROM {{database}}.{{events_table}}
+    ARRAY JOIN JSONExtractKeysAndValuesRaw(properties) AS property
+    WHERE property_key NOT IN {excluded_keys}
+    AND notEmpty(property_value)
+    {{events_filter}}
+)
+GROUP BY team_id, property_key, event, day
+""".format(
+    top_k=EVENT_PROPERTY_VALUES_TOP_K,
+    property_value=trim_quotes_expr("property.2"),
+    excluded_keys="({})".format(", ".join(f"'{key}'" for key in EVENT_PROPERTY_VALUES_EXCLUDED_KEYS)),
+    max_value_length=EVENT_PROPERTY_VALUES_MAX_VALUE_LENGTH,
+)
+
+EVENT_PROPERTY_VALUES_TABLE_MV_SQL = lambda: """
+CREATE MATERIALIZED VIEW IF NOT EXISTS event_property_values_mv ON CLUSTER '{cluster}'
+TO {database}.{target_table}
+AS {select}
+""".format(
+    target_table=EVENT_PROPERTY_VALUES_DATA_TABLE(),
+    cluster=settings.CLICKHOUSE_CLUSTER,
+    database=settings.CLICKHOUSE_DATABASE,
+    select=EVENT_PROPERTY_VALUES_SELECT_SQL.format(
+        database=settings.CLICKHOUSE_DATABASE, events_table="sharded_events", events_filter=""
+    ),
+)
+
+# Indexes a day of the events which were ingested before the materialized view existed, on the shard they're stored on.
+# Run per day by an async migration, see 0011_backfill_event_property_values
+BACKFILL_EVENT_PROPERTY_VALUES_SQL = lambda day: """
+INSERT INTO {database}.{target_table}
+(team_id, property_key, event, day, top_values, distinct_values)
+{select}
+""".format(
+    database=settings.CLICKHOUSE_DATABASE,
+    target_table=EVENT_PROPERTY_VALUES_DATA_TABLE(),
+    select=EVENT_PROPERTY_VALUES_SELECT_SQL.format(
+        database=settings.CLICKHOUSE_DATABASE,
+        events_table="sharded_events",
+        events_filter=f"AND toDate(timestamp) = '{day}'",
+    ),
+)
+
+# This table is responsible for reading from event_property_values on a cluster setting
+DISTRIBUTED_EVENT_PROPERTY_VALUES_TABLE_SQL = lambda: EVENT_PROPERTY_VALUES_TABLE_BASE_SQL.format(
+    table_name="event_property_values",
+    cluster=settings.CLICKHOUSE_CLUSTER,
+    engine=Distributed(data_table=EVENT_PROPERTY_VALUES_DATA_TABLE(), sharding_key="sipHash64(team_id)"),
+    top_k=EVENT_PROPERTY_VALUES_TOP_K,
+)
+
+DROP_EVENT_PROPERTY_VALUES_TABLE_SQL = lambda: (
+    f"DROP TABLE IF EXISTS {EVENT_PROPERTY_VALUES_DATA_TABLE()} ON CLUSTER '{settings.CLICKHOUSE_CLUSTER}'"
+)
+
+TRUNCATE_EVENT_PROPERTY_VALUES_TABLE_SQL = lambda: (
+    f"TRUNCATE TABLE IF EXISTS {EVENT_PROPERTY_VALUES_DATA_TABLE()} ON CLUSTER '{settings.CLICKHOUSE_CLUSTER}'"
+)
+
+# The most common values of the property within the date range, and how many distinct values there are in total
+SELECT_INDEXED_PROP_VALUES_SQL = """
+SELECT
+    arrayFilter(property_value -> notEmpty(property_value) {value_filter}, top_property_values),
+    distinct_count,
+    has(top_property_values, '') AS has_long_values
+FROM (
+    SELECT
+        topKMerge({top_k})(top_values) AS top_property_values,
+        uniqMerge(distinct_values) AS distinct_count
+    FROM
+        event_property_values
+    WHERE
+        team_id = %(team_id)s
+        AND property_key = %(key)s
+        AND day >= %(date_from)s
+        AND day <= %(date_to)s
+        {event_filter}
+)
+"""
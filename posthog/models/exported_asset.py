@@ -1,6 +1,7 @@
+import os
 import secrets
 from datetime import timedelta
-from typing import List, Optional
+from typing import IO, List, Optional
 
 import structlog
 from django.conf import settings
@@ -158,12 +159,48 @@ def save_content(exported_asset: ExportedAsset, content: bytes) -> None:
         save_content_to_exported_asset(exported_asset, content)
 
 
+def save_content_from_file(exported_asset: ExportedAsset, file: IO[bytes]) -> None:
+    """
+    Save content which was written to a file, e.g. a large CSV export, without reading all of it into memory if it
+    can be streamed to object storage.
+    """
+    file.seek(0, os.SEEK_END)
+    size = file.tell()
+    file.seek(0)
+
+    if not settings.OBJECT_STORAGE_ENABLED or size <= object_storage.MULTIPART_UPLOAD_PART_SIZE:
+        save_content(exported_asset, file.read())
+        return
+
+    try:
+        object_path = _get_object_storage_path(exported_asset)
+        object_storage.write_stream(
+            object_path, iter(lambda: file.read(object_storage.MULTIPART_UPLOAD_PART_SIZE), b"")
+        )
+        exported_asset.content_location = object_path
+        exported_asset.save(update_fields=["content_location"])
+    except ObjectStorageError as ose:
+        capture_exception(ose)
+        logger.error(
+            "exported_asset.object-storage-error", exported_asset_id=exported_asset.id, exception=ose, exc_info=True
+        )
+        file.seek(0)
+        save_content_to_exported_asset(exported_asset, file.read())
+
+
 def save_content_to_exported_asset(exported_asset: ExportedAsset, content: bytes) -> None:
     exported_asset.content = content
     exported_asset.save(update_fields=["content"])
 
 
 def save_content_to_object_storage(exported_asset: ExportedAsset, content: bytes) -> None:
+    object_path = _get_object_storage_path(exported_asset)
+    object_storage.write(object_path, content)
+    exported_asset.content_location = object_path
+    exported_asset.save(update_fields=["content_location"])
+
+
+def _get_object_storage_path(exported_asset: ExportedAsset) -> str:
     path_parts: List[str] = [
         settings.OBJECT_STORAGE_EXPORTS_FOLDER,
         exported_asset.export_format.split("/")[1],
@@ -171,7 +208,4 @@ def save_content_to_object_storage(exported_asset: ExportedAsset, content: bytes
         f"task-{exported_asset.id}",
         str(UUIDT()),
     ]
-    object_path = "/".join(path_parts)
-    object_storage.write(object_path, content)
-    exported_asset.content_location = object_path
-    exported_asset.save(update_fields=["content_location"])
+    return "/".join(path_parts)
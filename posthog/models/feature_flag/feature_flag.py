@@ -1,6 +1,7 @@
+import copy
 import json
 import structlog
-from typing import Dict, List, Optional, cast
+from typing import Any, Dict, List, Optional, Tuple, cast
 
 from django.core.cache import cache
 from django.db import models
@@ -8,6 +9,7 @@ from django.db.models.signals import post_delete, post_save, pre_delete
 from django.utils import timezone
 from sentry_sdk.api import capture_exception
 
+from posthog.cache_utils import LocalCache
 from posthog.constants import PropertyOperatorType
 from posthog.models.cohort import Cohort
 from posthog.models.experiment import Experiment
@@ -20,6 +22,8 @@ FIVE_DAYS = 60 * 60 * 24 * 5  # 5 days in seconds
 
 logger = structlog.get_logger(__name__)
 
+feature_flags_local_cache = LocalCache("team_feature_flags")
+
 
 class FeatureFlag(models.Model):
     class Meta:
@@ -53,6 +57,10 @@ class FeatureFlag(models.Model):
     # whether a feature is sending us rich analytics, like views & interactions.
     has_enriched_analytics: models.BooleanField = models.BooleanField(default=False, null=True, blank=True)
 
+    # For flags loaded from the team's flag cache, the compiled flags (see `flag_matching.compile_feature_flag`) shared
+    # by every flag loaded from the same cache entry, keyed by flag key
+    shared_compiled_flags: Optional[Dict[str, Any]] = None
+
     def get_analytics_metadata(self) -> Dict:
         filter_count = sum(len(condition.get("properties", [])) for condition in self.conditions)
         variants_count = len(self.variants)
@@ -303,6 +311,7 @@ def set_feature_flags_for_team_in_cache(
 
     try:
         cache.set(f"team_feature_flags_{team_id}", json.dumps(serialized_flags), FIVE_DAYS)
+        feature_flags_local_cache.bump_version(str(team_id), FIVE_DAYS)
     except Exception:
         # redis is unavailable
         logger.exception("Redis is unavailable")
@@ -311,7 +320,7 @@ def set_feature_flags_for_team_in_cache(
     return all_feature_flags
 
 
-def get_feature_flags_for_team_in_cache(team_id: int) -> Optional[List[FeatureFlag]]:
+def _get_feature_flags_data_for_team_in_cache(team_id: int) -> Optional[List[Dict]]:
     try:
         flag_data = cache.get(f"team_feature_flags_{team_id}")
     except Exception:
@@ -321,13 +330,42 @@ def get_feature_flags_for_team_in_cache(team_id: int) -> Optional[List[FeatureFl
 
     if flag_data is not None:
         try:
-            parsed_data = json.loads(flag_data)
-            return [FeatureFlag(**flag) for flag in parsed_data]
+            return json.loads(flag_data)
+        except Exception as e:
+            logger.exception("Error parsing flags from cache")
+            capture_exception(e)
+            return None
+
+    return None
+
+
+def _load_feature_flags_for_local_cache(team_id: int) -> Optional[Tuple[List[Dict], Dict[str, Any]]]:
+    parsed_data = _get_feature_flags_data_for_team_in_cache(team_id)
+    if parsed_data is None:
+        return None
+    # The flags are compiled lazily into the second dict, which lives as long as the local cache entry does, so they
+    # are compiled once per version of the team's flags rather than once per request
+    return parsed_data, {}
+
+
+def get_feature_flags_for_team_in_cache(team_id: int) -> Optional[List[FeatureFlag]]:
+    # Only the parsed data is kept in the local tier, so that every caller gets its own FeatureFlag instances. It's
+    # copied because the instances hold on to nested values (e.g. filters), which callers might mutate
+    cached = feature_flags_local_cache.get(str(team_id), lambda: _load_feature_flags_for_local_cache(team_id))
+
+    if cached is not None:
+        parsed_data, compiled_flags = cached
+        try:
+            feature_flags = [FeatureFlag(**flag) for flag in copy.deepcopy(parsed_data)]
         except Exception as e:
             logger.exception("Error parsing flags from cache")
             capture_exception(e)
             return None
 
+        for feature_flag in feature_flags:
+            feature_flag.shared_compiled_flags = compiled_flags
+        return feature_flags
+
     return None
 
 
@@ -6,6 +6,7 @@ import structlog
 from typing import Dict, List, Optional, Tuple, Union
 
 from prometheus_client import Counter
+from django.conf import settings
 from django.db import DatabaseError, IntegrityError, OperationalError
 from django.db.models.expressions import ExpressionWrapper, RawSQL
 from django.db.models.fields import BooleanField
@@ -90,6 +91,68 @@ class FeatureFlagMatch:
     payload: Optional[object] = None
 
 
+@dataclass(frozen=True)
+class CompiledFeatureFlag:
+    """The parts of a flag's conditions that don't depend on who we're evaluating it for, parsed once."""
+
+    condition_properties: List[List[Property]]
+    super_condition_properties: List[List[Property]]
+    variant_lookup_table: List[Dict]
+
+
+def compile_feature_flag(feature_flag: FeatureFlag) -> CompiledFeatureFlag:
+    return CompiledFeatureFlag(
+        condition_properties=[
+            Filter(data=condition).property_groups.flat if condition.get("properties") else []
+            for condition in feature_flag.conditions
+        ],
+        super_condition_properties=[
+            Filter(data=condition).property_groups.flat if condition.get("properties") else []
+            for condition in feature_flag.super_conditions
+        ],
+        variant_lookup_table=build_variant_lookup_table(feature_flag),
+    )
+
+
+def build_variant_lookup_table(feature_flag: FeatureFlag) -> List[Dict]:
+    # Define contiguous sub-domains within [0, 1].
+    # By looking up a random hash value, you can find the associated variant key.
+    # e.g. the first of two variants with 50% rollout percentage will have value_max: 0.5
+    # and the second will have value_min: 0.5 and value_max: 1.0
+    lookup_table = []
+    value_min = 0
+    for variant in feature_flag.variants:
+        value_max = value_min + variant["rollout_percentage"] / 100
+        lookup_table.append({"value_min": value_min, "value_max": value_max, "key": variant["key"]})
+        value_min = value_max
+    return lookup_table
+
+
+def get_compiled_feature_flags(feature_flags: List[FeatureFlag]) -> Dict[str, CompiledFeatureFlag]:
+    """
+    Returns compiled flags keyed by flag key. Flags loaded from the team's flag cache share their compiled versions
+    with every other request served from the same cache entry, so each flag is compiled once per version of the
+    team's flags. Anything else (e.g. flags just loaded from the database) is compiled for this call only.
+    """
+    compiled_flags = {}
+    for feature_flag in feature_flags:
+        shared_compiled_flags = feature_flag.shared_compiled_flags
+        if shared_compiled_flags is not None and feature_flag.key in shared_compiled_flags:
+            compiled_flag = shared_compiled_flags[feature_flag.key]
+        else:
+            try:
+                compiled_flag = compile_feature_flag(feature_flag)
+            except Exception:
+                # Invalid filters: leave the flag out, so the error surfaces when the flag itself is evaluated
+                compiled_flag = None
+            if shared_compiled_flags is not None:
+                shared_compiled_flags[feature_flag.key] = compiled_flag
+
+        if compiled_flag is not None:
+            compiled_flags[feature_flag.key] = compiled_flag
+    return compiled_flags
+
+
 class FlagsMatcherCache:
     def __init__(self, team_id: int):
         self.team_id = team_id
@@ -138,6 +201,8 @@ class FeatureFlagMatcher:
         self.group_property_value_overrides = group_property_value_overrides
         self.skip_database_flags = skip_database_flags
         self.cohorts_cache: Dict[int, Cohort] = {}
+        self.compiled_flags = get_compiled_feature_flags(self.feature_flags)
+        self.local_evaluation_enabled = settings.DECIDE_LOCAL_FLAG_EVALUATION_ENABLED
 
     def get_match(self, feature_flag: FeatureFlag) -> FeatureFlagMatch:
         # If aggregating flag by groups and relevant group type is not passed - flag is off!
@@ -248,8 +313,20 @@ class FeatureFlagMatcher:
         # Don't skip test: test_super_condition_with_override_properties_doesnt_make_database_requests when this is fixed.
         # This also doesn't handle the case when the super condition has a property & a non-100 percentage rollout; but
         # we don't support that with super conditions anyway.
-        super_condition_value_is_set = self._super_condition_is_set(feature_flag)
-        super_condition_value = self._super_condition_matches(feature_flag)
+        super_condition_properties = self.get_super_condition_properties(feature_flag)
+        if (
+            self.local_evaluation_enabled
+            and super_condition_properties
+            and self.can_compute_locally(super_condition_properties, feature_flag.aggregation_group_type_index)
+        ):
+            # All properties of the super condition are overridden, so it's set, and we can match it in memory
+            super_condition_value_is_set: Optional[bool] = True
+            super_condition_value = self.match_properties_locally(
+                super_condition_properties, feature_flag.aggregation_group_type_index
+            )
+        else:
+            super_condition_value_is_set = self._super_condition_is_set(feature_flag)
+            super_condition_value = self._super_condition_matches(feature_flag)
 
         if super_condition_value_is_set:
             return True, super_condition_value, FeatureFlagMatchReason.SUPER_CONDITION_VALUE
@@ -275,17 +352,12 @@ class FeatureFlagMatcher:
     ) -> Tuple[bool, FeatureFlagMatchReason]:
         rollout_percentage = condition.get("rollout_percentage")
         if len(condition.get("properties", [])) > 0:
-            properties = Filter(data=condition).property_groups.flat
+            properties = self.get_condition_properties(feature_flag, condition, condition_index)
             if self.can_compute_locally(properties, feature_flag.aggregation_group_type_index):
                 # :TRICKY: If overrides are enough to determine if a condition is a match,
                 # we can skip checking the query.
                 # This ensures match even if the person hasn't been ingested yet.
-                target_properties = self.property_value_overrides
-                if feature_flag.aggregation_group_type_index is not None:
-                    target_properties = self.group_property_value_overrides.get(
-                        self.cache.group_type_index_to_name[feature_flag.aggregation_group_type_index], {}
-                    )
-                condition_match = all(match_property(property, target_properties) for property in properties)
+                condition_match = self.match_properties_locally(properties, feature_flag.aggregation_group_type_index)
             else:
                 condition_match = self._condition_matches(feature_flag, condition_index)
 
@@ -315,18 +387,36 @@ class FeatureFlagMatcher:
             raise DatabaseError("Database healthcheck failed, not fetching flag conditions.")
         return self.query_conditions.get(key, False)
 
-    # Define contiguous sub-domains within [0, 1].
-    # By looking up a random hash value, you can find the associated variant key.
-    # e.g. the first of two variants with 50% rollout percentage will have value_max: 0.5
-    # and the second will have value_min: 0.5 and value_max: 1.0
     def variant_lookup_table(self, feature_flag: FeatureFlag):
-        lookup_table = []
-        value_min = 0
-        for variant in feature_flag.variants:
-            value_max = value_min + variant["rollout_percentage"] / 100
-            lookup_table.append({"value_min": value_min, "value_max": value_max, "key": variant["key"]})
-            value_min = value_max
-        return lookup_table
+        compiled_flag = self.compiled_flags.get(feature_flag.key)
+        if compiled_flag is None:
+            return build_variant_lookup_table(feature_flag)
+        return compiled_flag.variant_lookup_table
+
+    def get_condition_properties(self, feature_flag: FeatureFlag, condition: Dict, condition_index: int):
+        compiled_flag = self.compiled_flags.get(feature_flag.key)
+        if compiled_flag is None or condition_index >= len(compiled_flag.condition_properties):
+            return Filter(data=condition).property_groups.flat
+        return compiled_flag.condition_properties[condition_index]
+
+    def get_super_condition_properties(self, feature_flag: FeatureFlag) -> List[Property]:
+        if not feature_flag.super_conditions:
+            return []
+        compiled_flag = self.compiled_flags.get(feature_flag.key)
+        if compiled_flag is None or not compiled_flag.super_condition_properties:
+            condition = feature_flag.super_conditions[0]
+            return Filter(data=condition).property_groups.flat if condition.get("properties") else []
+        return compiled_flag.super_condition_properties[0]
+
+    def match_properties_locally(
+        self, properties: List[Property], group_type_index: Optional[GroupTypeIndex] = None
+    ) -> bool:
+        target_properties = self.property_value_overrides
+        if group_type_index is not None:
+            target_properties = self.group_property_value_overrides.get(
+                self.cache.group_type_index_to_name[group_type_index], {}
+            )
+        return all(match_property(property, target_properties) for property in properties)
 
     @cached_property
     def query_conditions(self) -> Dict[str, bool]:
@@ -355,7 +445,16 @@ class FeatureFlagMatcher:
 
                 person_fields: List[str] = []
 
-                def condition_eval(key, condition):
+                def is_resolved_locally(properties: List[Property]) -> bool:
+                    # Conditions resolved in memory from the overrides don't need to be sent to the database
+                    if not self.local_evaluation_enabled:
+                        return False
+                    group_type_index = feature_flag.aggregation_group_type_index
+                    if group_type_index is not None and group_type_index not in self.cache.group_type_index_to_name:
+                        return False
+                    return self.can_compute_locally(properties, group_type_index)
+
+                def condition_eval(key, condition, properties):
                     expr = None
                     annotate_query = True
                     nonlocal person_query
@@ -368,7 +467,7 @@ class FeatureFlagMatcher:
                                 self.cache.group_type_index_to_name[feature_flag.aggregation_group_type_index], {}
                             )
                         expr = properties_to_Q(
-                            Filter(data=condition).property_groups.flat,
+                            properties,
                             override_property_values=target_properties,
                             cohorts_cache=self.cohorts_cache,
                             using_database=DATABASE_FOR_FLAG_MATCHING,
@@ -426,9 +525,10 @@ class FeatureFlagMatcher:
                     if feature_flag.super_conditions and len(feature_flag.super_conditions) > 0:
                         condition = feature_flag.super_conditions[0]
                         prop_key = (condition.get("properties") or [{}])[0].get("key")
-                        if prop_key:
+                        super_condition_properties = self.get_super_condition_properties(feature_flag)
+                        if prop_key and not is_resolved_locally(super_condition_properties):
                             key = f"flag_{feature_flag.pk}_super_condition"
-                            condition_eval(key, condition)
+                            condition_eval(key, condition, super_condition_properties)
 
                             is_set_key = f"flag_{feature_flag.pk}_super_condition_is_set"
                             is_set_condition = {
@@ -439,11 +539,15 @@ class FeatureFlagMatcher:
                                     }
                                 ]
                             }
-                            condition_eval(is_set_key, is_set_condition)
+                            condition_eval(
+                                is_set_key, is_set_condition, Filter(data=is_set_condition).property_groups.flat
+                            )
 
                     for index, condition in enumerate(feature_flag.conditions):
                         key = f"flag_{feature_flag.pk}_condition_{index}"
-                        condition_eval(key, condition)
+                        properties = self.get_condition_properties(feature_flag, condition, index)
+                        if not is_resolved_locally(properties):
+                            condition_eval(key, condition, properties)
 
                 if len(person_fields) > 0:
                     person_query = person_query.values(*person_fields)
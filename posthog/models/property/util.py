@@ -18,6 +18,7 @@ from rest_framework import exceptions
 from posthog.clickhouse.client.escape import escape_param_for_clickhouse
 from posthog.clickhouse.kafka_engine import trim_quotes_expr
 from posthog.clickhouse.materialized_columns import TableWithProperties, get_materialized_columns
+from posthog.clickhouse.property_access import record_property_access
 from posthog.constants import PropertyOperatorType
 from posthog.hogql import ast
 from posthog.hogql.hogql import HogQLContext
@@ -665,6 +666,7 @@ def get_property_string_expr(
     ):
         return f'{table_string}"{materialized_columns[(property_name, materialised_table_column)]}"', True
 
+    record_property_access(table, materialised_table_column, property_name)
     return trim_quotes_expr(f"JSONExtractRaw({table_string}{column}, {var})"), False
 
 
@@ -1,14 +1,19 @@
+import copy
 import json
 from typing import TYPE_CHECKING, Optional
 
 from django.core.cache import cache
 from sentry_sdk import capture_exception
 
+from posthog.cache_utils import LocalCache
+
 if TYPE_CHECKING:
     from posthog.models.team import Team
 
 FIVE_DAYS = 60 * 60 * 24 * 5  # 5 days in seconds
 
+team_local_cache = LocalCache("team_token")
+
 
 def set_team_in_cache(token: str, team: Optional["Team"] = None) -> None:
     from posthog.api.team import CachingTeamSerializer
@@ -19,16 +24,16 @@ def set_team_in_cache(token: str, team: Optional["Team"] = None) -> None:
             team = Team.objects.get(api_token=token)
         except (Team.DoesNotExist, Team.MultipleObjectsReturned):
             cache.delete(f"team_token:{token}")
+            team_local_cache.bump_version(token, FIVE_DAYS)
             return
 
     serialized_team = CachingTeamSerializer(team).data
 
     cache.set(f"team_token:{token}", json.dumps(serialized_team), FIVE_DAYS)
+    team_local_cache.bump_version(token, FIVE_DAYS)
 
 
-def get_team_in_cache(token: str) -> Optional["Team"]:
-    from posthog.models.team import Team
-
+def _get_team_data_in_cache(token: str) -> Optional[dict]:
     try:
         team_data = cache.get(f"team_token:{token}")
     except Exception:
@@ -37,8 +42,23 @@ def get_team_in_cache(token: str) -> Optional["Team"]:
 
     if team_data:
         try:
-            parsed_data = json.loads(team_data)
-            return Team(**parsed_data)
+            return json.loads(team_data)
+        except Exception as e:
+            capture_exception(e)
+            return None
+
+    return None
+
+
+def get_team_in_cache(token: str) -> Optional["Team"]:
+    from posthog.models.team import Team
+
+    # Only the parsed data is kept in the local tier, so that every caller gets its own Team instance. It's copied
+    # because the instance holds on to nested values (e.g. test_account_filters), which callers might mutate
+    parsed_data = team_local_cache.get(token, lambda: _get_team_data_in_cache(token))
+    if parsed_data:
+        try:
+            return Team(**copy.deepcopy(parsed_data))
         except Exception as e:
             capture_exception(e)
             return None
@@ -1,5 +1,7 @@
 from typing import Optional
 
+from django.conf import settings
+
 from posthog.clickhouse.query_tagging import tag_queries
 from posthog.client import query_with_columns, sync_execute
 from posthog.types import FilterType
@@ -12,6 +14,7 @@ def insight_sync_execute(
     tag_queries(team_id=team_id)
     _tag_query(query, query_type, filter)
 
+    kwargs.setdefault("cache_ttl", settings.INSIGHT_QUERY_RESULT_CACHE_TTL_SECONDS or None)
     return sync_execute(query, args=args, team_id=team_id, **kwargs)
 
 
@@ -0,0 +1,177 @@
+import threading
+from concurrent.futures import FIRST_EXCEPTION, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from functools import lru_cache
+from time import monotonic, perf_counter
+from typing import Any, Dict, List, Optional, Set
+
+from clickhouse_driver.errors import ServerException
+from django.conf import settings
+from prometheus_client import Gauge, Histogram
+from sentry_sdk import capture_exception, push_scope
+
+from posthog.clickhouse.client.execute import validated_client_query_id
+from posthog.clickhouse.property_access import PropertyAccess
+from posthog.clickhouse.query_tagging import reset_query_tags, tag_queries
+from posthog.client import sync_execute
+from posthog.errors import wrap_query_error
+from posthog.queries.insight import insight_sync_execute
+from posthog.types import FilterType
+
+INSIGHT_QUERY_QUEUE_DEPTH = Gauge(
+    "posthog_insight_query_queue_depth",
+    "Insight sub-queries submitted to the insight query executor which haven't started running yet.",
+)
+INSIGHT_QUERY_WAIT_TIME = Histogram(
+    "posthog_insight_query_wait_seconds",
+    "Time insight sub-queries waited before running, for the team's concurrency limit and for a free worker.",
+)
+
+# ClickHouse error code for queries which took longer than they are allowed to
+TIMEOUT_EXCEEDED_ERROR_CODE = 159
+
+
+@dataclass
+class InsightQuery:
+    "A sub-query of an insight, e.g. one series of a trend, which is run with `insight_sync_execute`"
+
+    sql: str
+    params: Dict
+    query_type: str
+    filter: Optional[FilterType] = None
+    # Popped with `pop_property_accesses` right after compiling the query, as it's executed on another thread
+    property_accesses: Set[PropertyAccess] = field(default_factory=set)
+
+
+class InsightQueryExecutor:
+    """
+    Runs the sub-queries of insights in parallel on a pool of threads shared by the whole process, so that a single
+    large insight can't open an unbounded number of ClickHouse connections.
+
+    Every team can only have `team_concurrency` sub-queries running at once, so one team's insights can't take up the
+    whole pool. Sub-queries of an insight that has failed or timed out are cancelled, and the ones which are already
+    running are killed in ClickHouse by their query id.
+    """
+
+    def __init__(self, max_workers: int, team_concurrency: int) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="insight-query")
+        self._team_concurrency = team_concurrency
+        self._team_semaphores: Dict[int, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def execute(
+        self, queries: List[InsightQuery], team_id: int, query_tags: Dict, timeout: Optional[float] = None
+    ) -> List[Any]:
+        "Run the queries and return their results in the same order, raising the first error of any of them"
+        deadline = monotonic() + timeout if timeout is not None else None
+        semaphore = self._get_team_semaphore(team_id)
+        cancelled = threading.Event()
+        query_ids: List[Optional[str]] = [None] * len(queries)
+        futures: List[Future] = []
+
+        def on_done(future: Future) -> None:
+            semaphore.release()
+            if future.cancelled():
+                INSIGHT_QUERY_QUEUE_DEPTH.dec()
+
+        try:
+            for index, query in enumerate(queries):
+                queued_at = perf_counter()
+                if not semaphore.acquire(timeout=_remaining(deadline)):
+                    raise _timeout_error(timeout)
+                INSIGHT_QUERY_QUEUE_DEPTH.inc()
+                future = self._executor.submit(
+                    self._run, query, team_id, query_tags, queued_at, cancelled, query_ids, index
+                )
+                future.add_done_callback(on_done)
+                futures.append(future)
+
+            done, not_done = wait(futures, timeout=_remaining(deadline), return_when=FIRST_EXCEPTION)
+            for future in done:
+                if future.exception() is not None:
+                    raise future.exception()  # type: ignore
+            if not_done:
+                raise _timeout_error(timeout)
+            return [future.result() for future in futures]
+        except BaseException:
+            cancelled.set()
+            self._cancel(futures, query_ids)
+            raise
+
+    def _run(
+        self,
+        query: InsightQuery,
+        team_id: int,
+        query_tags: Dict,
+        queued_at: float,
+        cancelled: threading.Event,
+        query_ids: List[Optional[str]],
+        index: int,
+    ) -> Any:
+        INSIGHT_QUERY_QUEUE_DEPTH.dec()
+        INSIGHT_QUERY_WAIT_TIME.observe(perf_counter() - queued_at)
+        if cancelled.is_set():
+            return None
+
+        # Workers are reused, so the tags of the previous query they ran need to be cleared
+        reset_query_tags()
+        tag_queries(**query_tags)
+        query_ids[index] = query_id = validated_client_query_id()
+        with push_scope() as scope:
+            scope.set_context("query", {"sql": query.sql, "params": query.params})
+            return insight_sync_execute(
+                query.sql,
+                query.params,
+                query_type=query.query_type,
+                filter=query.filter,
+                team_id=team_id,
+                query_id=query_id,
+                property_accesses=query.property_accesses,
+            )
+
+    def _cancel(self, futures: List[Future], query_ids: List[Optional[str]]) -> None:
+        running_query_ids = []
+        for future, query_id in zip(futures, query_ids):
+            if not future.cancel() and not future.done() and query_id is not None:
+                running_query_ids.append(query_id)
+        if not running_query_ids:
+            return
+
+        try:
+            sync_execute(
+                f"KILL QUERY ON CLUSTER '{settings.CLICKHOUSE_CLUSTER}' WHERE query_id IN %(query_ids)s ASYNC",
+                {"query_ids": tuple(running_query_ids)},
+                flush=False,
+            )
+        except Exception as err:
+            capture_exception(err)
+
+    def _get_team_semaphore(self, team_id: int) -> threading.BoundedSemaphore:
+        with self._lock:
+            if team_id not in self._team_semaphores:
+                self._team_semaphores[team_id] = threading.BoundedSemaphore(self._team_concurrency)
+            return self._team_semaphores[team_id]
+
+
+@lru_cache(maxsize=1)
+def get_insight_query_executor() -> InsightQueryExecutor:
+    return InsightQueryExecutor(
+        max_workers=settings.INSIGHT_QUERY_EXECUTOR_WORKERS, team_concurrency=settings.INSIGHT_QUERY_TEAM_CONCURRENCY
+    )
+
+
+def execute_insight_queries(queries: List[InsightQuery], team_id: int, query_tags: Dict) -> List[Any]:
+    "Run the sub-queries of an insight in parallel, within the limits of the shared executor"
+    return get_insight_query_executor().execute(
+        queries, team_id, query_tags, timeout=settings.INSIGHT_QUERY_TIMEOUT_SECONDS or None
+    )
+
+
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    return max(deadline - monotonic(), 0) if deadline is not None else None
+
+
+def _timeout_error(timeout: Optional[float]) -> Exception:
+    return wrap_query_error(
+        ServerException(f"Insight sub-queries didn't finish within {timeout} seconds", TIMEOUT_EXCEEDED_ERROR_CODE)
+    )
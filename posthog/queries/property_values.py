@@ -1,8 +1,13 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from django.utils import timezone
 
 from posthog.models.event.sql import SELECT_PROP_VALUES_SQL_WITH_FILTER
+from posthog.models.event_property_values.sql import (
+    EVENT_PROPERTY_VALUES_EXCLUDED_KEYS,
+    EVENT_PROPERTY_VALUES_TOP_K,
+    SELECT_INDEXED_PROP_VALUES_SQL,
+)
 from posthog.models.person.sql import SELECT_PERSON_PROP_VALUES_SQL, SELECT_PERSON_PROP_VALUES_SQL_WITH_FILTER
 from posthog.models.property.util import get_property_string_expr
 from posthog.models.team import Team
@@ -13,6 +18,11 @@ from posthog.utils import relative_date_parse
 def get_property_values_for_key(
     key: str, team: Team, event_names: Optional[List[str]] = None, value: Optional[str] = None
 ):
+    if key not in EVENT_PROPERTY_VALUES_EXCLUDED_KEYS:
+        indexed_values = get_indexed_property_values_for_key(key, team, event_names, value)
+        if indexed_values is not None:
+            return indexed_values
+
     property_field, mat_column_exists = get_property_string_expr("events", key, "%(key)s", "properties")
     parsed_date_from = "AND timestamp >= '{}'".format(relative_date_parse("-7d").strftime("%Y-%m-%d 00:00:00"))
     parsed_date_to = "AND timestamp <= '{}'".format(timezone.now().strftime("%Y-%m-%d 23:59:59"))
@@ -55,6 +65,48 @@ def get_property_values_for_key(
     )
 
 
+def get_indexed_property_values_for_key(
+    key: str, team: Team, event_names: Optional[List[str]] = None, value: Optional[str] = None
+) -> Optional[List[Tuple[str]]]:
+    """
+    The most common values of an event property in the last 7 days, from the property values index. Returns None when
+    the values might only be found in events: the property isn't indexed yet, or nothing matched and the index doesn't
+    hold all of its values, as it has too many of them or some are too long.
+    """
+    event_filter = ""
+    value_filter = ""
+    extra_params: Dict[str, Any] = {}
+
+    if event_names is not None and len(event_names) > 0:
+        event_filter = "AND event IN %(event_names)s"
+        extra_params["event_names"] = tuple(event_names)
+
+    if value:
+        value_filter = "AND property_value ILIKE %(value)s"
+        extra_params["value"] = "%{}%".format(value)
+
+    [(values, distinct_count, has_long_values)] = insight_sync_execute(
+        SELECT_INDEXED_PROP_VALUES_SQL.format(
+            event_filter=event_filter, value_filter=value_filter, top_k=EVENT_PROPERTY_VALUES_TOP_K
+        ),
+        {
+            "team_id": team.pk,
+            "key": key,
+            "date_from": relative_date_parse("-7d").strftime("%Y-%m-%d"),
+            "date_to": timezone.now().strftime("%Y-%m-%d"),
+            **extra_params,
+        },
+        query_type="get_indexed_property_values",
+        team_id=team.pk,
+    )
+
+    if distinct_count == 0:
+        return None
+    if not values and (distinct_count > EVENT_PROPERTY_VALUES_TOP_K or has_long_values):
+        return None
+    return [(property_value,) for property_value in values[:10]]
+
+
 def get_person_property_values_for_key(key: str, team: Team, value: Optional[str] = None):
     property_field, _ = get_property_string_expr("person", key, "%(key)s", "properties")
 
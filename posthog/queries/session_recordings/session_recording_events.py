@@ -1,6 +1,6 @@
 import json
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from posthog.client import sync_execute
 from posthog.models import Team
@@ -31,7 +31,7 @@ class SessionRecordingEvents:
             team_id = %(team_id)s
             AND session_id = %(session_id)s
             {date_clause}
-        ORDER BY timestamp
+        ORDER BY timestamp, uuid
         {limit_param}
     """
 
@@ -85,3 +85,30 @@ class SessionRecordingEvents:
         if decompressed["snapshot_data_by_window_id"] == {}:
             return None
         return decompressed
+
+    def iterate_snapshots(self, page_size: int) -> Iterator[SnapshotDataTaggedWithWindowId]:
+        """
+        Stream all of the recording's snapshot events, querying `page_size` of them at a time. Every page starts after
+        the (timestamp, uuid) of the last event of the previous one, so ClickHouse never reads earlier events again.
+        """
+        date_clause, date_clause_params = self._get_recording_snapshot_date_clause()
+        fields = "window_id, snapshot_data, timestamp, uuid"
+        after_clause = "AND (timestamp, uuid) > (toDateTime64(%(after_timestamp)s, 6, 'UTC'), toUUID(%(after_uuid)s))"
+        params = {"team_id": self._team.id, "session_id": self._session_recording_id, "limit": page_size}
+
+        query = self._recording_snapshot_query.format(
+            date_clause=date_clause, fields=fields, limit_param="LIMIT %(limit)s"
+        )
+        while True:
+            page = sync_execute(query, {**params, **date_clause_params})
+            for window_id, snapshot_data, _, _ in page:
+                yield SnapshotDataTaggedWithWindowId(window_id=window_id, snapshot_data=json.loads(snapshot_data))
+            if len(page) < page_size:
+                return
+
+            _, _, last_timestamp, last_uuid = page[-1]
+            params["after_timestamp"] = last_timestamp.strftime("%Y-%m-%d %H:%M:%S.%f")
+            params["after_uuid"] = str(last_uuid)
+            query = self._recording_snapshot_query.format(
+                date_clause=f"{date_clause} {after_clause}", fields=fields, limit_param="LIMIT %(limit)s"
+            )
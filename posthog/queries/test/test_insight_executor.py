@@ -0,0 +1,73 @@
+import threading
+import time
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from posthog.clickhouse.property_access import pop_property_accesses, record_property_access
+from posthog.errors import InternalCHQueryError
+from posthog.queries.insight_executor import InsightQuery, InsightQueryExecutor
+
+
+class TestInsightQueryExecutor(TestCase):
+    @patch("posthog.queries.insight_executor.insight_sync_execute")
+    def test_results_are_returned_in_order(self, patch_insight_sync_execute):
+        patch_insight_sync_execute.side_effect = lambda sql, *args, **kwargs: sql
+        executor = InsightQueryExecutor(max_workers=4, team_concurrency=2)
+
+        queries = [InsightQuery(f"SELECT {index}", {}, "trends_total_volume") for index in range(10)]
+        results = executor.execute(queries, team_id=1, query_tags={"kind": "request"})
+
+        self.assertEqual(results, [f"SELECT {index}" for index in range(10)])
+
+    @patch("posthog.queries.insight_executor.insight_sync_execute")
+    def test_team_concurrency_is_limited(self, patch_insight_sync_execute):
+        running = 0
+        max_running = 0
+        lock = threading.Lock()
+
+        def execute(*args, **kwargs):
+            nonlocal running, max_running
+            with lock:
+                running += 1
+                max_running = max(max_running, running)
+            time.sleep(0.01)
+            with lock:
+                running -= 1
+
+        patch_insight_sync_execute.side_effect = execute
+        executor = InsightQueryExecutor(max_workers=8, team_concurrency=2)
+
+        executor.execute([InsightQuery("SELECT 1", {}, "trends_total_volume")] * 6, team_id=1, query_tags={})
+
+        self.assertEqual(max_running, 2)
+
+    @patch("posthog.queries.insight_executor.sync_execute")
+    @patch("posthog.queries.insight_executor.insight_sync_execute")
+    def test_running_queries_are_killed_on_timeout(self, patch_insight_sync_execute, patch_sync_execute):
+        finished = threading.Event()
+        patch_insight_sync_execute.side_effect = lambda *args, **kwargs: finished.wait(1)
+        executor = InsightQueryExecutor(max_workers=2, team_concurrency=2)
+
+        with self.assertRaises(InternalCHQueryError) as error:
+            executor.execute(
+                [InsightQuery("SELECT 1", {}, "trends_total_volume")] * 3, team_id=1, query_tags={}, timeout=0.05
+            )
+        finished.set()
+
+        self.assertEqual(error.exception.code_name, "timeout_exceeded")
+        kill_query, kill_params = patch_sync_execute.call_args[0]
+        self.assertIn("KILL QUERY", kill_query)
+        self.assertEqual(len(kill_params["query_ids"]), 2)
+
+    @patch("posthog.queries.insight_executor.insight_sync_execute")
+    def test_property_accesses_are_passed_to_the_worker(self, patch_insight_sync_execute):
+        patch_insight_sync_execute.side_effect = lambda *args, **kwargs: (threading.get_ident(), kwargs)
+        executor = InsightQueryExecutor(max_workers=2, team_concurrency=2)
+
+        record_property_access("events", "properties", "$browser")
+        query = InsightQuery("SELECT 1", {}, "trends_total_volume", property_accesses=pop_property_accesses())
+        [(thread_id, kwargs)] = executor.execute([query], team_id=1, query_tags={})
+
+        self.assertNotEqual(thread_id, threading.get_ident())
+        self.assertEqual(kwargs["property_accesses"], {("events", "properties", "$browser")})
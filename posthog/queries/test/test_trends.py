@@ -1,12 +1,11 @@
 import json
 import uuid
-from datetime import datetime
+from datetime import date, datetime
 from typing import Dict, List, Optional, Tuple, Union
 from unittest.mock import patch, ANY
 from urllib.parse import parse_qsl, urlparse
 
 import pytz
-from django.conf import settings
 from django.core.cache import cache
 from django.test import override_settings
 from django.utils import timezone
@@ -18,6 +17,7 @@ from posthog.constants import (
     ENTITY_TYPE,
     TREND_FILTER_TYPE_EVENTS,
     TRENDS_BAR_VALUE,
+    TRENDS_CUMULATIVE,
     TRENDS_LINEAR,
     TRENDS_TABLE,
 )
@@ -34,9 +34,11 @@ from posthog.models import (
 from posthog.models.group.util import create_group
 from posthog.models.instance_setting import get_instance_setting, override_instance_config, set_instance_setting
 from posthog.models.person.util import create_person_distinct_id
+from posthog.queries.trends.bucket_cache import TrendBuckets
 from posthog.queries.trends.trends import Trends
 from posthog.test.base import (
     APIBaseTest,
+    BaseTest,
     ClickhouseTestMixin,
     _create_event,
     _create_person,
@@ -48,7 +50,6 @@ from posthog.test.base import (
     snapshot_clickhouse_queries,
 )
 from posthog.test.test_journeys import journeys_for
-from posthog.utils import generate_cache_key
 
 
 def breakdown_label(entity: Entity, value: Union[str, int]) -> Dict[str, Optional[Union[str, int]]]:
@@ -234,6 +235,24 @@ class TestTrends(ClickhouseTestMixin, APIBaseTest):
         self.assertEqual(response[0]["labels"][5], "2-Jan-2020")
         self.assertEqual(response[0]["data"][5], 1.0)
 
+    def test_trends_batched_series_match_individual_series(self):
+        self._create_events()
+        events = [
+            {"id": "sign up"},
+            {"id": "no events"},
+            {"id": "sign up", "math": "dau"},
+            {"id": "sign up", "math": "unique_session"},
+            {"id": "sign up", "properties": [{"key": "$some_property", "value": "value"}]},
+        ]
+        with freeze_time("2020-01-04T13:00:01Z"):
+            filter = Filter(data={"date_from": "-7d", "events": events})
+            self.assertEqual(len(Trends()._get_total_volume_batches(filter)), 1)
+            response = Trends().run(filter, self.team)
+            for index, event in enumerate(events):
+                individual_response = Trends().run(Filter(data={"date_from": "-7d", "events": [event]}), self.team)
+                self.assertEqual(response[index]["data"], individual_response[0]["data"])
+                self.assertEqual(response[index]["count"], individual_response[0]["count"])
+
     @snapshot_clickhouse_queries
     def test_trend_actors_person_on_events_pagination_with_alias_inconsistencies(self):
         test_person_ids = [  # 10 test person IDs (in UUIDT format), hard-coded for deterministic runs
@@ -6817,202 +6836,134 @@ class TestTrends(ClickhouseTestMixin, APIBaseTest):
             self.assertEqual(res[0]["distinct_ids"], ["person1"])
 
 
-class TestTrendUtils(ClickhouseTestMixin, APIBaseTest):
+class TestTrendsBucketCache(ClickhouseTestMixin, APIBaseTest):
     maxDiff = None
 
-    def test_get_cached_result_no_cache(self):
-        set_instance_setting("STRICT_CACHING_TEAMS", "all")
-
-        filter = Filter(
-            data={
-                "date_to": "2020-11-01 10:26:00",
-                "events": [{"id": "sign up", "name": "sign up"}],
-                "interval": "hour",
-            },
-            team=self.team,
-        )
-
-        is_present = Trends().get_cached_result(filter, self.team)
-        self.assertIsNone(is_present)
-
-    def test_get_cached_result_bad_cache(self):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
         set_instance_setting("STRICT_CACHING_TEAMS", "all")
 
-        fake_cached = {
-            "result": [{"days": ["2020-11-01 05:20:00", "2020-11-01 10:22:00", "2020-11-01 10:25:00"], "data": []}]
-        }
-
-        filter = Filter(
-            data={
-                "date_to": "2020-11-01 10:26:00",
-                "events": [{"id": "sign up", "name": "sign up"}],
-                "interval": "hour",
-            },
-            team=self.team,
-        )
-        cache_key = generate_cache_key(f"{filter.toJSON()}_{self.team.pk}")
-        cache.set(cache_key, fake_cached, settings.CACHED_RESULTS_TTL)
+    def _create_pageviews(self, *timestamps: str, properties: Optional[Dict] = None):
+        for timestamp in timestamps:
+            _create_event(
+                team=self.team,
+                event="$pageview",
+                distinct_id="blabla",
+                timestamp=timestamp,
+                properties=properties or {},
+            )
+        flush_persons_and_events()
 
-        is_present = Trends().get_cached_result(filter, self.team)
-        self.assertIsNone(is_present)
+    def _run(self, data: Dict) -> List[Dict]:
+        return Trends().run(Filter(data={"events": [{"id": "$pageview"}], **data}, team=self.team), self.team)
 
-    def test_get_cached_result_hour(self):
-        set_instance_setting("STRICT_CACHING_TEAMS", "all")
+    def test_only_recalculates_unsettled_intervals(self):
+        self._create_pageviews("2020-01-02T12:00:00Z", "2020-01-09T12:00:00Z")
 
-        fake_cached = {
-            "result": [
-                {"days": ["2020-11-01 05:20:00", "2020-11-01 10:22:00", "2020-11-01 10:25:00"], "data": [0.0, 0.0, 0.0]}
-            ]
-        }
+        with freeze_time("2020-01-10T12:00:00Z"):
+            result = self._run({"date_from": "2020-01-01"})
+        self.assertEqual(result[0]["data"], [0, 1, 0, 0, 0, 0, 0, 0, 1, 0])
 
-        filter = Filter(
-            data={
-                "date_to": "2020-11-01 10:26:00",
-                "events": [{"id": "sign up", "name": "sign up"}],
-                "interval": "hour",
-            },
-            team=self.team,
-        )
-        cache_key = generate_cache_key(f"{filter.toJSON()}_{self.team.pk}")
-        cache.set(cache_key, fake_cached, settings.CACHED_RESULTS_TTL)
-
-        res = Trends().get_cached_result(filter, self.team)
-        self.assertIsNotNone(res)
-
-        filter = Filter(
-            data={
-                "date_to": "2020-11-02 05:26:00",
-                "events": [{"id": "sign up", "name": "sign up"}],
-                "interval": "hour",
-            },
-            team=self.team,
-        )
+        # Late events for settled intervals aren't picked up, while the last intervals are queried again
+        self._create_pageviews("2020-01-02T13:00:00Z", "2020-01-09T13:00:00Z", "2020-01-10T13:00:00Z")
 
-        res = Trends().get_cached_result(filter, self.team)
-        self.assertIsNone(res)
+        with freeze_time("2020-01-10T14:00:00Z"):
+            result = self._run({"date_from": "2020-01-01"})
+        self.assertEqual(result[0]["data"], [0, 1, 0, 0, 0, 0, 0, 0, 2, 1])
+        self.assertEqual(result[0]["days"][0], "2020-01-01")
+        self.assertEqual(result[0]["days"][-1], "2020-01-10")
+        self.assertEqual(result[0]["count"], 4)
 
-    def test_get_cached_result_day(self):
-        set_instance_setting("STRICT_CACHING_TEAMS", "all")
-        fake_cached = {"result": [{"days": ["2020-01-02", "2020-01-03", "2020-01-04"], "data": [0.0, 0.0, 0.0]}]}
-        filter = Filter(
-            data={"date_from": "2020-01-02", "date_to": "2020-01-04", "events": [{"id": "sign up", "name": "sign up"}]},
-            team=self.team,
-        )
-        cache_key = generate_cache_key(f"{filter.toJSON()}_{self.team.pk}")
-        cache.set(cache_key, fake_cached, settings.CACHED_RESULTS_TTL)
+    def test_reuses_buckets_across_date_ranges(self):
+        self._create_pageviews("2020-01-02T12:00:00Z", "2020-01-05T12:00:00Z")
 
-        res = Trends().get_cached_result(filter, self.team)
-        self.assertTrue(res)
+        with freeze_time("2020-01-10T12:00:00Z"):
+            self._run({"date_from": "2020-01-01"})
 
-        fake_cached = {"result": [{"days": ["2020-01-01", "2020-01-02", "2020-01-03"], "data": [0.0, 0.0, 0.0]}]}
+        self._create_pageviews("2020-01-05T13:00:00Z")
 
-        cache.set(cache_key, fake_cached, settings.CACHED_RESULTS_TTL)
+        with freeze_time("2020-01-10T12:00:00Z"):
+            result = self._run({"date_from": "2020-01-04", "date_to": "2020-01-06"})
+        self.assertEqual(result[0]["days"], ["2020-01-04", "2020-01-05", "2020-01-06"])
+        self.assertEqual(result[0]["data"], [0, 1, 0])
 
-        res = Trends().get_cached_result(filter, self.team)
-        self.assertFalse(res)
+    def test_breakdown_merges_values_from_cached_and_recalculated_intervals(self):
+        self._create_pageviews("2020-01-02T12:00:00Z", properties={"$browser": "Chrome"})
+        self._create_pageviews("2020-01-09T12:00:00Z", properties={"$browser": "Safari"})
 
-    def test_get_cached_result_week(self):
-        set_instance_setting("STRICT_CACHING_TEAMS", "all")
+        with freeze_time("2020-01-10T12:00:00Z"):
+            self._run({"date_from": "2020-01-01", "breakdown": "$browser"})
 
-        fake_cached = {"result": [{"days": ["2020-11-01", "2020-11-08", "2020-11-15"], "data": [0.0, 0.0, 0.0]}]}
+        self._create_pageviews("2020-01-10T13:00:00Z", properties={"$browser": "Firefox"})
 
-        filter = Filter(
-            data={"date_to": "2020-11-16", "events": [{"id": "sign up", "name": "sign up"}], "interval": "week"},
-            team=self.team,
+        with freeze_time("2020-01-10T14:00:00Z"):
+            result = self._run({"date_from": "2020-01-01", "breakdown": "$browser"})
+        self.assertEqual(
+            {series["breakdown_value"]: series["data"] for series in result},
+            {
+                "Chrome": [0, 1, 0, 0, 0, 0, 0, 0, 0, 0],
+                "Safari": [0, 0, 0, 0, 0, 0, 0, 0, 1, 0],
+                "Firefox": [0, 0, 0, 0, 0, 0, 0, 0, 0, 1],
+            },
         )
-        cache_key = generate_cache_key(f"{filter.toJSON()}_{self.team.pk}")
-        cache.set(cache_key, fake_cached, settings.CACHED_RESULTS_TTL)
 
-        res = Trends().get_cached_result(filter, self.team)
-        self.assertTrue(res)
+    def test_cumulative_accumulates_over_cached_intervals(self):
+        self._create_pageviews("2020-01-02T12:00:00Z", "2020-01-03T12:00:00Z")
 
-        filter = Filter(
-            data={"date_to": "2020-11-23", "events": [{"id": "sign up", "name": "sign up"}], "interval": "week"},
-            team=self.team,
-        )
+        with freeze_time("2020-01-05T12:00:00Z"):
+            self._run({"date_from": "2020-01-01", "display": TRENDS_CUMULATIVE})
 
-        res = Trends().get_cached_result(filter, self.team)
-        self.assertFalse(res)
+        self._create_pageviews("2020-01-05T13:00:00Z")
 
-    def test_get_cached_result_month(self):
-        set_instance_setting("STRICT_CACHING_TEAMS", "all")
+        with freeze_time("2020-01-05T14:00:00Z"):
+            result = self._run({"date_from": "2020-01-01", "display": TRENDS_CUMULATIVE})
+        self.assertEqual(result[0]["data"], [0, 1, 2, 2, 3])
 
-        fake_cached = {"result": [{"days": ["2020-09-01", "2020-10-01", "2020-11-01"], "data": [0.0, 0.0, 0.0]}]}
+    def test_not_used_without_strict_caching(self):
+        set_instance_setting("STRICT_CACHING_TEAMS", "")
+        self._create_pageviews("2020-01-02T12:00:00Z")
 
-        filter = Filter(
-            data={"date_to": "2020-11-16", "events": [{"id": "sign up", "name": "sign up"}], "interval": "month"},
-            team=self.team,
-        )
-        cache_key = generate_cache_key(f"{filter.toJSON()}_{self.team.pk}")
-        cache.set(cache_key, fake_cached, settings.CACHED_RESULTS_TTL)
+        with freeze_time("2020-01-10T12:00:00Z"):
+            self._run({"date_from": "2020-01-01"})
 
-        res = Trends().get_cached_result(filter, self.team)
-        self.assertTrue(res)
+        self._create_pageviews("2020-01-02T13:00:00Z")
 
-        filter = Filter(
-            data={"date_to": "2020-12-01", "events": [{"id": "sign up", "name": "sign up"}], "interval": "week"},
-            team=self.team,
-        )
+        with freeze_time("2020-01-10T12:00:00Z"):
+            result = self._run({"date_from": "2020-01-01"})
+        self.assertEqual(result[0]["data"][1], 2)
 
-        res = Trends().get_cached_result(filter, self.team)
-        self.assertFalse(res)
+    def test_not_used_with_smoothing(self):
+        self._create_pageviews("2020-01-02T12:00:00Z")
 
-    def test_merge_result(self):
-        set_instance_setting("STRICT_CACHING_TEAMS", "all")
-        fake_cached = {
-            "sign up - Chrome_0": {
-                "label": "sign up - Chrome",
-                "days": ["2020-01-02", "2020-01-03", "2020-01-04"],
-                "data": [23.0, 15.0, 1.0],
-            }
-        }
-        filter = Filter(
-            data={"date_from": "2020-01-02", "date_to": "2020-01-04", "events": [{"id": "sign up", "name": "sign up"}]},
-            team=self.team,
-        )
-        result = [{"label": "sign up - Chrome", "data": [15.0, 12.0]}]
+        with freeze_time("2020-01-10T12:00:00Z"):
+            self._run({"date_from": "2020-01-01", "smoothing_intervals": 2})
 
-        merged_result, _ = Trends().merge_results(result, fake_cached, 0, filter, self.team)
-        self.assertEqual(merged_result[0]["data"], [23.0, 15.0, 12.0])
+        self._create_pageviews("2020-01-02T13:00:00Z")
 
-    def test_merge_result_no_cache(self):
+        with freeze_time("2020-01-10T12:00:00Z"):
+            result = self._run({"date_from": "2020-01-01", "smoothing_intervals": 2})
+        self.assertEqual(result[0]["data"][1], 1)
 
-        filter = Filter(
-            data={"date_from": "2020-01-02", "date_to": "2020-01-04", "events": [{"id": "sign up", "name": "sign up"}]},
-            team=self.team,
-        )
 
-        result = [{"label": "sign up - Chrome", "data": [15.0, 12.0]}]
+class TestTrendBuckets(BaseTest):
+    def test_concat_zero_fills_missing_series(self):
+        head = TrendBuckets(points=[date(2020, 1, 1), date(2020, 1, 2)], series={"'a'": ("a", [1, 2])})
+        tail = TrendBuckets(points=[date(2020, 1, 3)], series={"'a'": ("a", [3]), "'b'": ("b", [4])})
 
-        merged_result, _ = Trends().merge_results(result, {}, 0, filter, self.team)
+        buckets = TrendBuckets.concat([head, tail])
 
-        self.assertEqual(merged_result[0]["data"], [15.0, 12.0])
-
-    def test_merge_result_multiple(self):
-        set_instance_setting("STRICT_CACHING_TEAMS", "all")
-        fake_cached = {
-            "sign up - Chrome_0": {
-                "label": "sign up - Chrome",
-                "days": ["2020-01-02", "2020-01-03", "2020-01-04"],
-                "data": [23.0, 15.0, 1.0],
-            },
-            "sign up - Safari_0": {
-                "label": "sign up - Safari",
-                "days": ["2020-01-02", "2020-01-03", "2020-01-04"],
-                "data": [12.0, 11.0, 8.0],
-            },
-        }
-        filter = Filter(
-            data={"date_from": "2020-01-02", "date_to": "2020-01-04", "events": [{"id": "sign up", "name": "sign up"}]},
-            team=self.team,
+        self.assertEqual(buckets.points, [date(2020, 1, 1), date(2020, 1, 2), date(2020, 1, 3)])
+        self.assertEqual(
+            buckets.to_rows(is_breakdown=True), [(buckets.points, [1, 2, 3], "a"), (buckets.points, [0, 0, 4], "b")]
         )
 
-        result = [
-            {"label": "sign up - Chrome", "data": [15.0, 12.0]},
-            {"label": "sign up - Safari", "data": [15.0, 9.0]},
-        ]
-
-        merged_result, _ = Trends().merge_results(result, fake_cached, 0, filter, self.team)
+    def test_rows_round_trip(self):
+        points = [date(2020, 1, 1), date(2020, 1, 2)]
 
-        self.assertEqual(merged_result[0]["data"], [23.0, 15.0, 12.0])
-        self.assertEqual(merged_result[1]["data"], [12.0, 11.0, 9.0])
+        self.assertEqual(TrendBuckets.from_rows([(points, [1, 2])], []).to_rows(is_breakdown=False), [(points, [1, 2])])
+        self.assertEqual(TrendBuckets.from_rows([], points).to_rows(is_breakdown=False), [(points, [0, 0])])
+        self.assertEqual(
+            TrendBuckets.from_rows([(points, [1, 2], "a")], []).slice(1, 2).to_rows(is_breakdown=True),
+            [([date(2020, 1, 2)], [2], "a")],
+        )
@@ -0,0 +1,283 @@
+import json
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import pytz
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from prometheus_client import Counter
+
+from posthog.constants import (
+    EXPLICIT_DATE,
+    MONTHLY_ACTIVE,
+    NON_TIME_SERIES_DISPLAY_TYPES,
+    TRENDS_CUMULATIVE,
+    TRENDS_LIFECYCLE,
+    UNIQUE_GROUPS,
+    UNIQUE_USERS,
+    WEEKLY_ACTIVE,
+)
+from posthog.models.entity import Entity
+from posthog.models.filters import Filter
+from posthog.models.team import Team
+from posthog.queries.query_date_range import QueryDateRange
+from posthog.utils import generate_cache_key, get_safe_cache
+
+TRENDS_BUCKET_CACHE_COUNTER = Counter(
+    "posthog_trends_bucket_cache_total",
+    "Trend series calculated through the bucket cache, by how much had to be queried (hit, partial or miss).",
+    labelnames=["result"],
+)
+
+INTERVAL_DELTAS: Dict[str, relativedelta] = {
+    "hour": relativedelta(hours=1),
+    "day": relativedelta(days=1),
+    "week": relativedelta(weeks=1),
+    "month": relativedelta(months=1),
+}
+
+# Filter keys which don't change the count of an individual interval, so buckets can be shared across them
+IGNORED_FILTER_KEYS = ("date_from", "date_to", EXPLICIT_DATE, "compare", "events", "actions")
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+BucketPoint = Union[date, datetime]
+
+
+@dataclass
+class TrendBuckets:
+    """Raw per-interval counts of a trend, in the shape ClickHouse returns them (a row of counts per series)."""
+
+    points: List[BucketPoint]
+    # Serialized breakdown value -> (breakdown value, count per point). Total volume trends have a single series.
+    series: Dict[str, Tuple[Any, List[Any]]] = field(default_factory=dict)
+
+    @classmethod
+    def from_rows(cls, rows: List, points: List[BucketPoint]) -> "TrendBuckets":
+        buckets = cls(points=list(rows[0][0]) if rows else points)
+        for row in rows:
+            breakdown_value = row[2] if len(row) > 2 else None
+            buckets.series[repr(breakdown_value)] = (breakdown_value, list(row[1]))
+        return buckets
+
+    @classmethod
+    def concat(cls, parts: List["TrendBuckets"]) -> "TrendBuckets":
+        "Join consecutive ranges of buckets, zero-filling series that are missing from some of them"
+        buckets = cls(points=[point for part in parts for point in part.points])
+        for part in parts:
+            for key, (breakdown_value, _) in part.series.items():
+                if key in buckets.series:
+                    continue
+                counts: List[Any] = []
+                for other in parts:
+                    counts.extend(other.series[key][1] if key in other.series else [0] * len(other.points))
+                buckets.series[key] = (breakdown_value, counts)
+        return buckets
+
+    def slice(self, start: int, stop: int) -> "TrendBuckets":
+        return TrendBuckets(
+            points=self.points[start:stop],
+            series={key: (value, counts[start:stop]) for key, (value, counts) in self.series.items()},
+        )
+
+    def to_rows(self, is_breakdown: bool) -> List:
+        if is_breakdown:
+            return [(self.points, counts, breakdown_value) for breakdown_value, counts in self.series.values()]
+        counts = next(iter(self.series.values()))[1] if self.series else [0] * len(self.points)
+        return [(self.points, counts)]
+
+
+class TrendsBucketCache:
+    """
+    Incremental calculation of time series trends.
+
+    The raw count of every interval is cached once it has been over for `TRENDS_BUCKET_CACHE_SETTLE_SECONDS`, as late
+    events are no longer expected after that. Recalculating a trend then only queries ClickHouse for the intervals
+    that can still change, and merges them with the settled ones. Buckets are shared between every date range of the
+    same series, so e.g. the previous period of a comparison is served from the same cache entry.
+    """
+
+    def __init__(self, filter: Filter, entity: Entity, team: Team) -> None:
+        self.filter = filter
+        self.entity = entity
+        self.team = team
+        self._timezone = pytz.timezone(team.timezone)
+        self._interval = INTERVAL_DELTAS[filter.interval]
+        self._is_breakdown = bool(filter.breakdown)
+
+    @staticmethod
+    def is_supported(filter: Filter, entity: Entity, team: Team) -> bool:
+        if filter.shown_as == TRENDS_LIFECYCLE or filter.display in NON_TIME_SERIES_DISPLAY_TYPES:
+            return False
+        if filter.interval not in INTERVAL_DELTAS:
+            return False
+        # Each of these intervals depends on the intervals (or events) before it, not just on its own events
+        if filter.smoothing_intervals > 1 or entity.math in (WEEKLY_ACTIVE, MONTHLY_ACTIVE):
+            return False
+        if filter.display == TRENDS_CUMULATIVE and entity.math in (UNIQUE_USERS, UNIQUE_GROUPS):
+            return False
+        # Session durations are calculated over the whole queried range
+        if entity.math_property == "$session_duration" or filter.breakdown_type == "session":
+            return False
+        if filter.breakdown and (filter.using_histogram or filter.offset):
+            return False
+        return team.strict_caching_enabled
+
+    @property
+    def cache_key(self) -> str:
+        filter_data = {key: value for key, value in self.filter.to_dict().items() if key not in IGNORED_FILTER_KEYS}
+        payload = json.dumps({"filter": filter_data, "entity": self.entity.to_dict()}, sort_keys=True, default=str)
+        return generate_cache_key(
+            f"trends_buckets_{payload}_{self.team.pk}_{self.team.timezone}_{self.team.person_on_events_mode}"
+        )
+
+    def run(self, execute: Callable[[Filter], List]) -> List:
+        """
+        Return the raw rows of the trend for the whole filter, where `execute` runs the trend query for a filter.
+        """
+        date_range = QueryDateRange(self.filter, self.team)
+        date_from = self._to_local(date_range.date_from_param)
+        date_to = self._to_local(date_range.date_to_param)
+        should_round = date_range.should_round
+
+        cached: Optional[TrendBuckets] = get_safe_cache(self.cache_key)
+        start = self._find_start(cached, date_from, should_round) if cached else None
+        if cached is None or start is None:
+            return self._run_full(execute, cached, date_from, date_to, should_round)
+
+        # Only intervals that are entirely inside the range are reusable
+        stop = start
+        while stop < len(cached.points) and self._bucket_end(cached.points[stop]) <= date_to + timedelta(seconds=1):
+            stop += 1
+        if stop == start:
+            return self._run_full(execute, cached, date_from, date_to, should_round)
+
+        head = cached.slice(start, stop)
+        tail_from = self._bucket_end(head.points[-1])
+        if tail_from > date_to:
+            TRENDS_BUCKET_CACHE_COUNTER.labels(result="hit").inc()
+            buckets = head
+        else:
+            TRENDS_BUCKET_CACHE_COUNTER.labels(result="partial").inc()
+            tail_filter = self.filter.shallow_clone(
+                {
+                    "date_from": tail_from.strftime(DATETIME_FORMAT),
+                    "date_to": date_to.strftime(DATETIME_FORMAT),
+                    EXPLICIT_DATE: True,
+                }
+            )
+            tail_rows = execute(tail_filter)
+            if self._is_breakdown and len(tail_rows) >= self.filter.breakdown_limit_or_default:
+                return self._run_full(execute, cached, date_from, date_to, should_round)
+            tail = TrendBuckets.from_rows(tail_rows, self._points_between(tail_from, date_to, sample=head.points[0]))
+            if self._is_breakdown:
+                # Values without events in this range wouldn't be part of the full query's result either
+                head.series = {
+                    key: series
+                    for key, series in head.series.items()
+                    if key in tail.series or any(count != 0 for count in series[1])
+                }
+            buckets = TrendBuckets.concat([head, tail])
+
+        if self._is_breakdown and len(buckets.series) >= self.filter.breakdown_limit_or_default:
+            # The full query only keeps the top values over the whole range, which can't be told from the buckets
+            return self._run_full(execute, cached, date_from, date_to, should_round)
+
+        self._store(buckets, cached, date_from, date_to, should_round)
+        return buckets.to_rows(self._is_breakdown)
+
+    def _run_full(
+        self,
+        execute: Callable[[Filter], List],
+        cached: Optional[TrendBuckets],
+        date_from: datetime,
+        date_to: datetime,
+        should_round: bool,
+    ) -> List:
+        TRENDS_BUCKET_CACHE_COUNTER.labels(result="miss").inc()
+        rows = execute(self.filter)
+        if rows and (not self._is_breakdown or len(rows) < self.filter.breakdown_limit_or_default):
+            self._store(TrendBuckets.from_rows(rows, []), cached, date_from, date_to, should_round)
+        return rows
+
+    def _store(
+        self,
+        buckets: TrendBuckets,
+        cached: Optional[TrendBuckets],
+        date_from: datetime,
+        date_to: datetime,
+        should_round: bool,
+    ) -> None:
+        settled_before = min(
+            date_to + timedelta(seconds=1),
+            self._to_local(timezone.now()) - timedelta(seconds=settings.TRENDS_BUCKET_CACHE_SETTLE_SECONDS),
+        )
+        start = 0
+        if buckets.points and self._to_local(buckets.points[0]) < date_from and not should_round:
+            # The first bucket only counted the events from date_from onwards
+            start = 1
+        stop = start
+        while stop < len(buckets.points) and self._bucket_end(buckets.points[stop]) <= settled_before:
+            stop += 1
+        if stop == start:
+            return
+
+        settled = buckets.slice(start, stop)
+        if cached and cached.points:
+            # Keep the cached buckets adjoining these, e.g. the previous period of a comparison
+            settled_from = self._to_local(settled.points[0])
+            settled_to = self._bucket_end(settled.points[-1])
+            cached_from = self._to_local(cached.points[0])
+            cached_to = self._bucket_end(cached.points[-1])
+            parts = [settled]
+            if cached_from < settled_from <= cached_to:
+                prefix_stop = 0
+                while prefix_stop < len(cached.points) and self._to_local(cached.points[prefix_stop]) < settled_from:
+                    prefix_stop += 1
+                parts.insert(0, cached.slice(0, prefix_stop))
+            if cached_from <= settled_to < cached_to:
+                suffix_start = len(cached.points)
+                while suffix_start > 0 and self._to_local(cached.points[suffix_start - 1]) >= settled_to:
+                    suffix_start -= 1
+                parts.append(cached.slice(suffix_start, len(cached.points)))
+            settled = TrendBuckets.concat(parts)
+
+        if self._is_breakdown and len(settled.series) >= self.filter.breakdown_limit_or_default:
+            return
+        cache.set(self.cache_key, settled, settings.CACHED_RESULTS_TTL)
+
+    def _find_start(self, cached: TrendBuckets, date_from: datetime, should_round: bool) -> Optional[int]:
+        "Index of the cached bucket the range starts with, if the cache reaches back far enough"
+        for index, point in enumerate(cached.points):
+            bucket_start = self._to_local(point)
+            if bucket_start == date_from or (should_round and bucket_start <= date_from < self._bucket_end(point)):
+                return index
+        return None
+
+    def _bucket_end(self, point: BucketPoint) -> datetime:
+        return self._to_local(point) + self._interval
+
+    def _points_between(self, date_from: datetime, date_to: datetime, sample: BucketPoint) -> List[BucketPoint]:
+        "The points ClickHouse zero-fills between two dates, in the same representation as `sample`"
+        points: List[BucketPoint] = []
+        point = date_from
+        while point <= date_to:
+            if not isinstance(sample, datetime):
+                points.append(point.date())
+            elif sample.tzinfo is not None:
+                points.append(self._timezone.localize(point))
+            else:
+                points.append(point)
+            point += self._interval
+        return points
+
+    def _to_local(self, value: BucketPoint) -> datetime:
+        "Naive datetime in the team's timezone, which is how both dates and bucket points are compared"
+        if not isinstance(value, datetime):
+            return datetime.combine(value, time.min)
+        if value.tzinfo is not None:
+            value = value.astimezone(self._timezone)
+        return value.replace(tzinfo=None)
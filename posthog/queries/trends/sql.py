@@ -91,6 +91,28 @@ SELECT groupArray(day_start) as date, groupArray({aggregate}) AS total FROM (
 )
 """
 
+# Several series of a trend counted in one pass over the events, with a total_<index> column for each of them
+BATCHED_VOLUME_SQL = """
+SELECT
+    {aggregate_operations},
+    {interval}(toTimeZone(toDateTime(timestamp, 'UTC'), %(timezone)s)) AS date
+{event_query_base}
+GROUP BY date
+"""
+
+BATCHED_FINAL_TIME_SERIES_SQL = """
+SELECT groupArray(day_start) as date, {totals} FROM (
+    SELECT {sums}, day_start
+    FROM (
+        SELECT {zeros}, day_start FROM ({null_sql})
+        UNION ALL
+        {content_sql}
+    )
+    GROUP BY day_start
+    ORDER BY day_start
+)
+"""
+
 CUMULATIVE_SQL = """
 SELECT {actor_expression} AS actor_id, min(timestamp) AS first_seen_timestamp
 {event_query_base}
@@ -6,7 +6,9 @@ from posthog.clickhouse.query_tagging import tag_queries
 from posthog.constants import (
     MONTHLY_ACTIVE,
     NON_TIME_SERIES_DISPLAY_TYPES,
+    TREND_FILTER_TYPE_EVENTS,
     TRENDS_CUMULATIVE,
+    TRENDS_LIFECYCLE,
     UNIQUE_GROUPS,
     UNIQUE_USERS,
     WEEKLY_ACTIVE,
@@ -19,6 +21,8 @@ from posthog.queries.event_query import EventQuery
 from posthog.queries.trends.sql import (
     ACTIVE_USERS_AGGREGATE_SQL,
     ACTIVE_USERS_SQL,
+    BATCHED_FINAL_TIME_SERIES_SQL,
+    BATCHED_VOLUME_SQL,
     CUMULATIVE_SQL,
     FINAL_TIME_SERIES_SQL,
     SESSION_DURATION_AGGREGATE_SQL,
@@ -29,7 +33,7 @@ from posthog.queries.trends.sql import (
     VOLUME_SQL,
 )
 from posthog.queries.trends.trends_actors import offset_time_series_date_by_interval
-from posthog.queries.trends.trends_event_query import TrendsEventQuery
+from posthog.queries.trends.trends_event_query import BatchedTrendsEventQuery, TrendsEventQuery
 from posthog.queries.trends.util import (
     COUNT_PER_ACTOR_MATH_FUNCTIONS,
     PROPERTY_MATH_FUNCTIONS,
@@ -43,6 +47,10 @@ from posthog.queries.util import TIME_IN_SECONDS, get_interval_func_ch, get_trun
 from posthog.utils import PersonOnEventsMode, encode_get_request_params, generate_short_id
 
 
+# Math that can be calculated for several series in the same query, each with a condition on its event
+BATCHED_MATH_FUNCTIONS = (None, "total", UNIQUE_USERS, "unique_session")
+
+
 class TrendsTotalVolume:
     DISTINCT_ID_TABLE_ALIAS = EventQuery.DISTINCT_ID_TABLE_ALIAS
     EVENT_TABLE_ALIAS = EventQuery.EVENT_TABLE_ALIAS
@@ -53,11 +61,7 @@ class TrendsTotalVolume:
         trunc_func = get_trunc_func_ch(filter.interval)
         interval_func = get_interval_func_ch(filter.interval)
 
-        person_id_alias = f"{self.DISTINCT_ID_TABLE_ALIAS}.person_id"
-        if team.person_on_events_mode == PersonOnEventsMode.V2_ENABLED:
-            person_id_alias = f"if(notEmpty({self.PERSON_ID_OVERRIDES_TABLE_ALIAS}.person_id), {self.PERSON_ID_OVERRIDES_TABLE_ALIAS}.person_id, {self.EVENT_TABLE_ALIAS}.person_id)"
-        elif team.person_on_events_mode == PersonOnEventsMode.V1_ENABLED:
-            person_id_alias = "person_id"
+        person_id_alias = self._get_person_id_alias(team)
 
         aggregate_operation, join_condition, math_params = process_math(
             entity,
@@ -200,6 +204,107 @@ class TrendsTotalVolume:
 
             return final_query, params, self._parse_total_volume_result(filter, entity, team)
 
+    @staticmethod
+    def can_batch_total_volume(filter: Filter, entity: Entity) -> bool:
+        """
+        Whether the series can be counted in the same query as other series of the trend, i.e. it's a time series
+        of one event whose math can be calculated with a condition on that event.
+        """
+        if filter.breakdown or filter.shown_as == TRENDS_LIFECYCLE or filter.display in NON_TIME_SERIES_DISPLAY_TYPES:
+            return False
+        if filter.smoothing_intervals > 1:
+            return False
+        if entity.type != TREND_FILTER_TYPE_EVENTS or entity.id is None or entity.property_groups.values:
+            return False
+        if entity.math_group_type_index is not None:
+            return False
+        if filter.display == TRENDS_CUMULATIVE and entity.math in (UNIQUE_USERS, "unique_session"):
+            return False
+        return entity.math in BATCHED_MATH_FUNCTIONS
+
+    def _get_total_volume_batches(self, filter: Filter) -> List[List[Entity]]:
+        """
+        Groups the series that can be counted in one query. Counting unique users joins persons, which leaves out
+        events without a person, so those series are only batched with each other.
+        """
+        batches: Dict[bool, List[Entity]] = {}
+        for entity in filter.entities:
+            if self.can_batch_total_volume(filter, entity):
+                batches.setdefault(entity.math == UNIQUE_USERS, []).append(entity)
+        return [entities for entities in batches.values() if len(entities) > 1]
+
+    def _batched_total_volume_query(
+        self, entities: List[Entity], filter: Filter, team: Team
+    ) -> Tuple[str, Dict, Callable]:
+        """
+        Like `_total_volume_query`, but for several series at once, so that the events are only scanned once.
+        """
+        trunc_func = get_trunc_func_ch(filter.interval)
+        interval_func = get_interval_func_ch(filter.interval)
+        person_id_alias = self._get_person_id_alias(team)
+
+        # Batches are either all counting unique users or none of them are, see `_get_total_volume_batches`
+        trend_event_query = BatchedTrendsEventQuery(
+            entities=entities,
+            filter=filter,
+            team=team,
+            should_join_distinct_ids=entities[0].math == UNIQUE_USERS and not team.aggregate_users_by_distinct_id,
+            person_on_events_mode=team.person_on_events_mode,
+        )
+        event_query_base, event_query_params = trend_event_query.get_query_base()
+
+        params: Dict = {"team_id": team.id, "timezone": team.timezone, "interval": filter.interval}
+        params = {**params, **event_query_params}
+
+        aggregate_operations = []
+        for entity in entities:
+            params[f"batched_event_{entity.index}"] = entity.id
+            condition = f"event = %(batched_event_{entity.index})s"
+            if entity.math == UNIQUE_USERS:
+                actor = (
+                    f"{self.EVENT_TABLE_ALIAS}.distinct_id" if team.aggregate_users_by_distinct_id else person_id_alias
+                )
+                aggregate_operation = f"count(DISTINCT if({condition}, {actor}, NULL))"
+            elif entity.math == "unique_session":
+                aggregate_operation = f'count(DISTINCT if({condition}, {self.EVENT_TABLE_ALIAS}."$session_id", NULL))'
+            else:
+                aggregate_operation = f"countIf({condition})"
+            aggregate_operations.append(f"{aggregate_operation} AS total_{entity.index}")
+
+        tag_queries(trend_volume_display="time_series", trend_volume_type="batched_volume")
+        content_sql = BATCHED_VOLUME_SQL.format(
+            aggregate_operations=", ".join(aggregate_operations),
+            interval=trunc_func,
+            event_query_base=event_query_base,
+        )
+        final_query = BATCHED_FINAL_TIME_SERIES_SQL.format(
+            totals=", ".join(f"groupArray(count_{entity.index}) AS total_{entity.index}" for entity in entities),
+            sums=", ".join(f"SUM(total_{entity.index}) AS count_{entity.index}" for entity in entities),
+            zeros=", ".join(f"toUInt16(0) AS total_{entity.index}" for entity in entities),
+            null_sql=NULL_SQL.format(trunc_func=trunc_func, interval_func=interval_func),
+            content_sql=content_sql,
+        )
+
+        return final_query, params, self._parse_batched_total_volume_result(entities, filter, team)
+
+    def _parse_batched_total_volume_result(self, entities: List[Entity], filter: Filter, team: Team) -> Callable:
+        def _parse(result: List) -> Dict[int, List]:
+            # Each series is parsed the same as if it had been queried on its own
+            parsed_results = {}
+            for position, entity in enumerate(entities):
+                rows = [(row[0], row[position + 1]) for row in result] if result is not None else None
+                parsed_results[entity.index] = self._parse_total_volume_result(filter, entity, team)(rows)
+            return parsed_results
+
+        return _parse
+
+    def _get_person_id_alias(self, team: Team) -> str:
+        if team.person_on_events_mode == PersonOnEventsMode.V2_ENABLED:
+            return f"if(notEmpty({self.PERSON_ID_OVERRIDES_TABLE_ALIAS}.person_id), {self.PERSON_ID_OVERRIDES_TABLE_ALIAS}.person_id, {self.EVENT_TABLE_ALIAS}.person_id)"
+        elif team.person_on_events_mode == PersonOnEventsMode.V1_ENABLED:
+            return "person_id"
+        return f"{self.DISTINCT_ID_TABLE_ALIAS}.person_id"
+
     def _parse_total_volume_result(self, filter: Filter, entity: Entity, team: Team) -> Callable:
         def _parse(result: List) -> List:
             parsed_results = []
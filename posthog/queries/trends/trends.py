@@ -1,21 +1,17 @@
 import copy
-import threading
-from datetime import datetime, timedelta
 from itertools import accumulate
 from typing import Any, Callable, Dict, List, Optional, Tuple, cast
 
-import pytz
-from dateutil import parser
 from django.db.models.query import Prefetch
 from sentry_sdk import push_scope
 
-from posthog.clickhouse.query_tagging import get_query_tags, tag_queries
+from posthog.clickhouse.property_access import pop_property_accesses
+from posthog.clickhouse.query_tagging import get_query_tags
 from posthog.constants import (
     NON_BREAKDOWN_DISPLAY_TYPES,
     TREND_FILTER_TYPE_ACTIONS,
     TRENDS_CUMULATIVE,
     TRENDS_LIFECYCLE,
-    TRENDS_LINEAR,
 )
 from posthog.models.action import Action
 from posthog.models.action_step import ActionStep
@@ -24,11 +20,12 @@ from posthog.models.filters import Filter
 from posthog.models.team import Team
 from posthog.queries.base import handle_compare
 from posthog.queries.insight import insight_sync_execute
+from posthog.queries.insight_executor import InsightQuery, execute_insight_queries
 from posthog.queries.trends.breakdown import TrendsBreakdown
+from posthog.queries.trends.bucket_cache import TrendsBucketCache
 from posthog.queries.trends.formula import TrendsFormula
 from posthog.queries.trends.lifecycle import Lifecycle
 from posthog.queries.trends.total_volume import TrendsTotalVolume
-from posthog.utils import generate_cache_key, get_safe_cache
 
 
 class Trends(TrendsTotalVolume, Lifecycle, TrendsFormula):
@@ -47,156 +44,104 @@ class Trends(TrendsTotalVolume, Lifecycle, TrendsFormula):
 
         return query_type, sql, params, parse_function
 
-    # Use cached result even on refresh if team has strict caching enabled
-    def get_cached_result(self, filter: Filter, team: Team) -> Optional[List[Dict[str, Any]]]:
-
-        if not team.strict_caching_enabled or filter.breakdown or filter.display != TRENDS_LINEAR:
-            return None
-
-        cache_key = generate_cache_key(f"{filter.toJSON()}_{team.pk}")
-        cached_result_package = get_safe_cache(cache_key)
-        cached_result = (
-            cached_result_package.get("result")
-            if cached_result_package and isinstance(cached_result_package, dict)
-            else None
-        )
-
-        if not cached_result:
-            return None
-
-        _is_present = self.is_present_timerange(cached_result, filter, team)
-
-        return cached_result if _is_present else None
-
-    # Determine if the current timerange is present in the cache
-    def is_present_timerange(self, cached_result: List[Dict[str, Any]], filter: Filter, team: Team) -> bool:
-        if (
-            len(cached_result) > 0
-            and cached_result[0].get("days")
-            and cached_result[0].get("data")
-            and len(cached_result[0]["days"]) > 0
-            and len(cached_result[0]["days"]) == len(cached_result[0]["data"])
-        ):
-            latest_date = cached_result[0]["days"][len(cached_result[0]["days"]) - 1]
-
-            parsed_latest_date = parser.parse(latest_date)
-            parsed_latest_date = parsed_latest_date.replace(tzinfo=pytz.timezone(team.timezone))
-            _is_present = is_filter_date_present(filter, parsed_latest_date)
-        else:
-            _is_present = False
-
-        return _is_present
-
-    # Use a condensed filter if a cached result exists in the current timerange
-    def adjusted_filter(self, filter: Filter, team: Team) -> Tuple[Filter, Optional[Dict[str, Any]]]:
-        cached_result = self.get_cached_result(filter, team)
-
-        new_filter = filter.shallow_clone({"date_from": interval_unit(filter.interval)}) if cached_result else filter
-
-        label_to_payload = {}
-        if cached_result:
-            for payload in cached_result:
-                label_to_payload[f'{payload["label"]}_{payload["action"]["order"]}'] = payload
-
-        return new_filter, label_to_payload
-
-    def merge_results(
-        self, result, cached_result: Optional[Dict[str, Any]], entity_order: int, filter: Filter, team: Team
-    ):
-        if cached_result and filter.display != TRENDS_CUMULATIVE:
-            new_res = []
-
-            for payload in result:
-                cached_series = cached_result.pop(f'{payload["label"]}_{entity_order}')
-                data = cached_series["data"]
-                data.pop()
-                data.append(payload["data"].pop())
-                cached_series["data"] = data
-                new_res.append(cached_series)
-
-            return new_res, cached_result
-        elif filter.display == TRENDS_CUMULATIVE:
-            return self._handle_cumulative(result), {}
-        else:
-            return result, {}
-
-    def _run_query(self, filter: Filter, team: Team, entity: Entity) -> List[Dict[str, Any]]:
-        adjusted_filter, cached_result = self.adjusted_filter(filter, team)
+    def _execute_query(self, filter: Filter, team: Team, entity: Entity) -> Tuple[List, Callable]:
         with push_scope() as scope:
-            query_type, sql, params, parse_function = self._get_sql_for_entity(adjusted_filter, team, entity)
+            query_type, sql, params, parse_function = self._get_sql_for_entity(filter, team, entity)
             scope.set_context("filter", filter.to_dict())
             scope.set_tag("team", team)
-            query_params = {**params, **adjusted_filter.hogql_context.values}
+            query_params = {**params, **filter.hogql_context.values}
             scope.set_context("query", {"sql": sql, "params": query_params})
             result = insight_sync_execute(
                 sql,
                 query_params,
                 settings={"timeout_before_checking_execution_speed": 60},
                 query_type=query_type,
-                filter=adjusted_filter,
+                filter=filter,
                 team_id=team.pk,
             )
-            result = parse_function(result)
-            serialized_data = self._format_serialized(entity, result)
-            merged_results, cached_result = self.merge_results(
-                serialized_data, cached_result, entity.order or entity.index, filter, team
-            )
+        return result, parse_function
 
-        if cached_result:
-            for value in cached_result.values():
-                merged_results.append(value)
+    def _run_query_with_bucket_cache(self, filter: Filter, team: Team, entity: Entity) -> List[Dict[str, Any]]:
+        result = TrendsBucketCache(filter, entity, team).run(
+            lambda query_filter: self._execute_query(query_filter, team, entity)[0]
+        )
+        # The rows cover the whole date range, so they're parsed like the result of a single query for it
+        if filter.breakdown:
+            parse_function = TrendsBreakdown(
+                entity, filter, team, person_on_events_mode=team.person_on_events_mode
+            )._parse_trend_result(filter, entity)
+        else:
+            parse_function = self._parse_total_volume_result(filter, entity, team)
+        return parse_function(result)
 
-        return merged_results
+    def _run_query(self, filter: Filter, team: Team, entity: Entity) -> List[Dict[str, Any]]:
+        if TrendsBucketCache.is_supported(filter, entity, team):
+            result = self._run_query_with_bucket_cache(filter, team, entity)
+        else:
+            raw_result, parse_function = self._execute_query(filter, team, entity)
+            result = parse_function(raw_result)
 
-    def _run_query_for_threading(
-        self, result: List, index: int, query_type, sql, params, query_tags: Dict, filter: Filter, team_id: int
-    ):
-        tag_queries(**query_tags)
-        with push_scope() as scope:
-            scope.set_context("query", {"sql": sql, "params": params})
-            result[index] = insight_sync_execute(sql, params, query_type=query_type, filter=filter, team_id=team_id)
+        serialized_data = self._format_serialized(entity, result)
+        if filter.display == TRENDS_CUMULATIVE:
+            return self._handle_cumulative(serialized_data)
+        return serialized_data
 
     def _run_parallel(self, filter: Filter, team: Team) -> List[Dict[str, Any]]:
         result: List[Optional[List[Dict[str, Any]]]] = [None] * len(filter.entities)
         parse_functions: List[Optional[Callable]] = [None] * len(filter.entities)
         sql_statements_with_params: List[Tuple[Optional[str], Dict]] = [(None, {})] * len(filter.entities)
-        cached_result = None
-        jobs = []
+        queries: List[InsightQuery] = []
+
+        # Series that only differ in their event are counted together, so the events are scanned once for all of them
+        batches = self._get_total_volume_batches(filter)
+        batched_entities = [entity for entities in batches for entity in entities]
+        batched_parse_functions: List[Callable] = []
+        for entities in batches:
+            sql, params, batched_parse_function = self._batched_total_volume_query(entities, filter, team)
+            batched_parse_functions.append(batched_parse_function)
+            query_params = {**params, **filter.hogql_context.values}
+            for entity in entities:
+                sql_statements_with_params[entity.index] = (sql, query_params)
+            queries.append(
+                InsightQuery(
+                    sql, query_params, "trends_batched_total_volume", filter, property_accesses=pop_property_accesses()
+                )
+            )
 
-        for entity in filter.entities:
-            adjusted_filter, cached_result = self.adjusted_filter(filter, team)
-            query_type, sql, params, parse_function = self._get_sql_for_entity(adjusted_filter, team, entity)
+        unbatched_entities = [entity for entity in filter.entities if entity not in batched_entities]
+        for entity in unbatched_entities:
+            query_type, sql, params, parse_function = self._get_sql_for_entity(filter, team, entity)
             parse_functions[entity.index] = parse_function
-            query_params = {**params, **adjusted_filter.hogql_context.values}
+            query_params = {**params, **filter.hogql_context.values}
             sql_statements_with_params[entity.index] = (sql, query_params)
-            thread = threading.Thread(
-                target=self._run_query_for_threading,
-                args=(result, entity.index, query_type, sql, query_params, get_query_tags(), adjusted_filter, team.pk),
+            queries.append(
+                InsightQuery(sql, query_params, query_type, filter, property_accesses=pop_property_accesses())
             )
-            jobs.append(thread)
 
-        # Start the threads (i.e. calculate the random number lists)
-        for j in jobs:
-            j.start()
+        query_results = execute_insight_queries(queries, team.pk, get_query_tags())
+        batched_results = query_results[: len(batches)]
+        for entity, entity_result in zip(unbatched_entities, query_results[len(batches) :]):
+            result[entity.index] = entity_result
 
-        # Ensure all of the threads have finished
-        for j in jobs:
-            j.join()
-
-        # Parse results for each thread
+        # Parse results for each query
         with push_scope() as scope:
             scope.set_context("filter", filter.to_dict())
             scope.set_tag("team", team)
+            batched_parsed_results: Dict[int, List] = {}
+            for batch_index, batched_parse_function in enumerate(batched_parse_functions):
+                batched_parsed_results.update(batched_parse_function(batched_results[batch_index]))
             for i, entity in enumerate(filter.entities):
                 scope.set_context(
                     "query", {"sql": sql_statements_with_params[i][0], "params": sql_statements_with_params[i][1]}
                 )
-                serialized_data = cast(List[Callable], parse_functions)[entity.index](result[entity.index])
+                if entity in batched_entities:
+                    serialized_data = batched_parsed_results[entity.index]
+                else:
+                    serialized_data = cast(List[Callable], parse_functions)[entity.index](result[entity.index])
                 serialized_data = self._format_serialized(entity, serialized_data)
-                merged_results, cached_result = self.merge_results(
-                    serialized_data, cached_result, entity.order or entity.index, filter, team
-                )
-                result[entity.index] = merged_results
+                if filter.display == TRENDS_CUMULATIVE:
+                    serialized_data = self._handle_cumulative(serialized_data)
+                result[entity.index] = serialized_data
 
         # flatten results
         flat_results: List[Dict[str, Any]] = []
@@ -204,10 +149,6 @@ class Trends(TrendsTotalVolume, Lifecycle, TrendsFormula):
             for flat in cast(List[Dict[str, Any]], item):
                 flat_results.append(flat)
 
-            if cached_result:
-                for value in cached_result.values():
-                    flat_results.append(value)
-
         return flat_results
 
     def run(self, filter: Filter, team: Team, *args, **kwargs) -> List[Dict[str, Any]]:
@@ -226,7 +167,12 @@ class Trends(TrendsTotalVolume, Lifecycle, TrendsFormula):
                 except Action.DoesNotExist:
                     return []
 
-        if len(filter.entities) == 1 or filter.compare:
+        # Series calculated incrementally query different date ranges, so they're not run in parallel
+        if (
+            len(filter.entities) == 1
+            or filter.compare
+            or any(TrendsBucketCache.is_supported(filter, entity, team) for entity in filter.entities)
+        ):
             result = []
             for entity in filter.entities:
                 result.extend(handle_compare(filter, self._run_query, team, entity=entity))
@@ -258,29 +204,3 @@ class Trends(TrendsTotalVolume, Lifecycle, TrendsFormula):
         for metrics in entity_metrics:
             metrics.update(data=list(accumulate(metrics["data"])))
         return entity_metrics
-
-
-def is_filter_date_present(filter: Filter, latest_cached_datetime: datetime) -> bool:
-    diff = filter.date_to - latest_cached_datetime
-
-    if filter.interval == "hour":
-        return diff < timedelta(hours=1)
-    elif filter.interval == "day":
-        return diff < timedelta(days=1)
-    elif filter.interval == "week":
-        return diff < timedelta(weeks=1)
-    elif filter.interval == "month":
-        return diff < timedelta(days=30)
-
-
-def interval_unit(interval: str) -> str:
-    if interval == "hour":
-        return "-1hr"
-    if interval == "day":
-        return "-1d"
-    elif interval == "week":
-        return "-1w"
-    elif interval == "month":
-        return "-1m"
-    else:
-        raise ValueError("Invalid interval")
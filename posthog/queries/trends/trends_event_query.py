@@ -1,7 +1,10 @@
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, List, Tuple
 
+from posthog.models.entity import Entity
+from posthog.models.entity.util import get_entity_filtering_params
 from posthog.models.property.util import get_property_string_expr
 from posthog.queries.trends.trends_event_query_base import TrendsEventQueryBase
+from posthog.queries.util import get_person_properties_mode
 from posthog.utils import PersonOnEventsMode
 
 
@@ -77,3 +80,27 @@ class TrendsEventQuery(TrendsEventQueryBase):
                 f", {self.PERSON_TABLE_ALIAS}.{column_name} as {column_name}"
                 for column_name in self._extra_person_fields
             )
+
+
+class BatchedTrendsEventQuery(TrendsEventQuery):
+    """
+    Event query shared by several series of a trend, matching the events of any of them.
+
+    The series must only differ in their event and math, so the rest of the query is built from the first of them.
+    """
+
+    def __init__(self, entities: List[Entity], *args, **kwargs):
+        self._entities = entities
+        super().__init__(entities[0], *args, **kwargs)
+
+    def _get_entity_query(self) -> Tuple[str, Dict]:
+        entity_params, entity_format_params = get_entity_filtering_params(
+            allowed_entities=self._entities,
+            team_id=self._team_id,
+            table_name=self.EVENT_TABLE_ALIAS,
+            person_properties_mode=get_person_properties_mode(self._team),
+            hogql_context=self._filter.hogql_context,
+            person_id_joined_alias=self._person_id_alias,
+        )
+
+        return entity_format_params["entity_query"], entity_params
@@ -252,18 +252,6 @@ class HogQLNotice(BaseModel):
     start: Optional[float] = None
 
 
-class HogQLQueryResponse(BaseModel):
-    class Config:
-        extra = Extra.forbid
-
-    clickhouse: Optional[str] = None
-    columns: Optional[List] = None
-    hogql: Optional[str] = None
-    query: Optional[str] = None
-    results: Optional[List] = None
-    types: Optional[List] = None
-
-
 class IntervalType(str, Enum):
     hour = "hour"
     day = "day"
@@ -350,6 +338,14 @@ class PropertyOperator(str, Enum):
     max = "max"
 
 
+class QueryTiming(BaseModel):
+    class Config:
+        extra = Extra.forbid
+
+    k: str = Field(..., description="Key. Shortened to 'k' to save on data.")
+    t: float = Field(..., description="Time in seconds. Shortened to 't' to save on data.")
+
+
 class RecordingDurationFilter(BaseModel):
     class Config:
         extra = Extra.forbid
@@ -553,6 +549,21 @@ class HogQLMetadataResponse(BaseModel):
     warnings: List[HogQLNotice]
 
 
+class HogQLQueryResponse(BaseModel):
+    class Config:
+        extra = Extra.forbid
+
+    clickhouse: Optional[str] = None
+    columns: Optional[List] = None
+    hogql: Optional[str] = None
+    query: Optional[str] = None
+    results: Optional[List] = None
+    timings: Optional[List[QueryTiming]] = Field(
+        None, description="Measured timings for different parts of the query generation process"
+    )
+    types: Optional[List] = None
+
+
 class HogQLPropertyFilter(BaseModel):
     class Config:
         extra = Extra.forbid
@@ -3,7 +3,7 @@ import gzip
 import json
 from collections import defaultdict
 from datetime import datetime, timezone
-from typing import Any, Callable, DefaultDict, Dict, Generator, List, Optional
+from typing import Any, Callable, Dict, Generator, Iterable, Iterator, List, Optional, Tuple
 
 from dateutil.parser import ParserError, parse
 from sentry_sdk.api import capture_exception
@@ -14,6 +14,7 @@ from posthog.models.session_recording.metadata import (
     SessionRecordingEventSummary,
     SnapshotData,
     SnapshotDataTaggedWithWindowId,
+    WindowId,
 )
 from posthog.utils import flatten
 
@@ -273,6 +274,67 @@ def decompress(base64data: str) -> str:
     return gzip.decompress(compressed_bytes).decode("utf-16", "surrogatepass")
 
 
+class CompleteSnapshot:
+    """
+    An unchunked snapshot event, or all the events of a chunk once every one of them has been seen.
+
+    Nothing is decoded until `decompress` or `activity_data` is called, so that snapshots which are skipped over
+    (e.g. before the requested page) cost no more than collecting them.
+    """
+
+    def __init__(self, window_id: WindowId, snapshot_data: SnapshotData, chunks: Optional[List[str]] = None):
+        self.window_id = window_id
+        self.snapshot_data = snapshot_data
+        # The base64 data of each chunk, in chunk index order
+        self.chunks = chunks
+
+    def decompress(self) -> List[SnapshotData]:
+        if self.chunks is not None:
+            decompressed_data = json.loads(decompress("".join(self.chunks)))
+            return [decompressed_data] if type(decompressed_data) is dict else decompressed_data
+        if self.snapshot_data.get("data_items"):
+            # New format where the event is a list of raw rrweb events
+            return [json.loads(decompress(x)) for x in self.snapshot_data["data_items"]]
+        # Really old format where the event is just a single raw rrweb event
+        return [self.snapshot_data]
+
+    def activity_data(self) -> List[SnapshotData]:
+        if self.chunks is None and self.snapshot_data.get("data_items"):
+            return self.snapshot_data["events_summary"]
+        return get_events_summary_from_snapshot_data(self.decompress())
+
+
+def assemble_snapshot_chunks(recording_events: Iterable[SnapshotDataTaggedWithWindowId]) -> Iterator[CompleteSnapshot]:
+    """
+    Yields every snapshot of a recording as soon as it is complete, in the order they are completed.
+
+    Chunks are collected by chunk id and chunk index, so a duplicated chunk is dropped in constant time and only the
+    chunks that are still incomplete are held in memory.
+    """
+    chunks_collector: Dict[str, Dict[int, str]] = {}
+    processed_chunk_ids = set()
+
+    for event in recording_events:
+        snapshot_data = event["snapshot_data"]
+
+        if "chunk_id" not in snapshot_data:
+            yield CompleteSnapshot(event["window_id"], snapshot_data)
+            continue
+
+        chunk_id = snapshot_data["chunk_id"]
+        if chunk_id in processed_chunk_ids:
+            continue
+
+        # Only the first event seen for each chunk index is kept
+        chunks = chunks_collector.setdefault(chunk_id, {})
+        chunks.setdefault(snapshot_data["chunk_index"], snapshot_data["data"])
+
+        if len(chunks) == snapshot_data["chunk_count"]:
+            del chunks_collector[chunk_id]
+            processed_chunk_ids.add(chunk_id)
+            yield CompleteSnapshot(event["window_id"], snapshot_data, [chunks[index] for index in sorted(chunks)])
+
+
 def decompress_chunked_snapshot_data(
     all_recording_events: List[SnapshotDataTaggedWithWindowId],
     limit: Optional[int] = None,
@@ -284,7 +346,7 @@ def decompress_chunked_snapshot_data(
     gets back to the original data by unchunking the events and then decompressing the data.
 
     If limit + offset is provided, then it will paginate the decompression by chunks (not by events, because
-    you can't decompress an incomplete chunk).
+    you can't decompress an incomplete chunk). Chunks before the offset are never decompressed.
 
     Depending on the size of the recording, this function can return a lot of data. To decrease the
     memory used, you should either use the pagination parameters or pass in 'return_only_activity_data' which
@@ -295,72 +357,17 @@ def decompress_chunked_snapshot_data(
         return DecompressedRecordingData(has_next=False, snapshot_data_by_window_id={})
 
     snapshot_data_by_window_id = defaultdict(list)
-    chunks_collector: DefaultDict[str, List[SnapshotDataTaggedWithWindowId]] = defaultdict(list)
-    processed_chunk_ids = set()
     count = 0
 
-    for event in all_recording_events:
-        # Handle unchunked snapshots
-        if "chunk_id" not in event["snapshot_data"]:
-            count += 1
-
-            if offset >= count:
-                continue
-
-            if event["snapshot_data"].get("data_items"):
-                decompressed_items = [json.loads(decompress(x)) for x in event["snapshot_data"]["data_items"]]
+    for snapshot in assemble_snapshot_chunks(all_recording_events):
+        count += 1
 
-                # New format where the event is a list of raw rrweb events
-                snapshot_data_by_window_id[event["window_id"]].extend(
-                    event["snapshot_data"]["events_summary"] if return_only_activity_data else decompressed_items
-                )
-            else:
-                # Really old format where the event is just a single raw rrweb event
-                snapshot_data_by_window_id[event["window_id"]].append(
-                    get_events_summary_from_snapshot_data([event["snapshot_data"]])[0]
-                    if return_only_activity_data
-                    else event["snapshot_data"]
-                )
-        else:
-            # Handle chunked snapshots
-            if event["snapshot_data"]["chunk_id"] in processed_chunk_ids:
-                continue
-
-            chunks = chunks_collector[event["snapshot_data"]["chunk_id"]]
-            chunks.append(event)
-
-            deduplicated_chunks = {}
-            for chunk in chunks:
-                # reduce the chunks into deduplicated chunks by chunk_id taking only the first seen for each chunk_id
-                if chunk["snapshot_data"]["chunk_index"] not in deduplicated_chunks:
-                    deduplicated_chunks[chunk["snapshot_data"]["chunk_index"]] = chunk
-
-            chunks = chunks_collector[event["snapshot_data"]["chunk_id"]] = list(deduplicated_chunks.values())
-
-            if len(chunks) == event["snapshot_data"]["chunk_count"]:
-                count += 1
-                chunks_collector[event["snapshot_data"]["chunk_id"]] = None
-
-                # Somehow mark this chunk_id as processed...
-                processed_chunk_ids.add(event["snapshot_data"]["chunk_id"])
-
-                if offset >= count:
-                    continue
-
-                b64_compressed_data = "".join(
-                    chunk["snapshot_data"]["data"]
-                    for chunk in sorted(chunks, key=lambda c: c["snapshot_data"]["chunk_index"])
-                )
-                decompressed_data = json.loads(decompress(b64_compressed_data))
-
-                if type(decompressed_data) is dict:
-                    decompressed_data = [decompressed_data]
+        if offset >= count:
+            continue
 
-                if return_only_activity_data:
-                    events_with_only_activity_data = get_events_summary_from_snapshot_data(decompressed_data)
-                    snapshot_data_by_window_id[event["window_id"]].extend(events_with_only_activity_data)
-                else:
-                    snapshot_data_by_window_id[event["window_id"]].extend(decompressed_data)
+        snapshot_data_by_window_id[snapshot.window_id].extend(
+            snapshot.activity_data() if return_only_activity_data else snapshot.decompress()
+        )
 
         if limit and count >= offset + limit:
             break
@@ -370,6 +377,19 @@ def decompress_chunked_snapshot_data(
     return DecompressedRecordingData(has_next=has_next, snapshot_data_by_window_id=snapshot_data_by_window_id)
 
 
+def iterate_decompressed_snapshot_data(
+    recording_events: Iterable[SnapshotDataTaggedWithWindowId],
+) -> Iterator[Tuple[WindowId, List[SnapshotData]]]:
+    """
+    Streaming version of `decompress_chunked_snapshot_data`, for recordings too large to hold in memory at once.
+
+    Yields the decompressed snapshots of each unchunked event or complete chunk as soon as it has been read, so only
+    the chunks that are still incomplete are kept around. Chunks may be spread over any number of pages of events.
+    """
+    for snapshot in assemble_snapshot_chunks(recording_events):
+        yield snapshot.window_id, snapshot.decompress()
+
+
 def is_active_event(event: SessionRecordingEventSummary) -> bool:
     """
     Determines which rr-web events are "active" - meaning user generated
@@ -139,6 +139,17 @@ CLICKHOUSE_ENABLE_STORAGE_POLICY = get_from_env("CLICKHOUSE_ENABLE_STORAGE_POLIC
 CLICKHOUSE_CONN_POOL_MIN = get_from_env("CLICKHOUSE_CONN_POOL_MIN", 20, type_cast=int)
 CLICKHOUSE_CONN_POOL_MAX = get_from_env("CLICKHOUSE_CONN_POOL_MAX", 1000, type_cast=int)
 
+# Sub-queries of insights (e.g. the series of a trend) run in parallel on a pool of threads shared by the process
+INSIGHT_QUERY_EXECUTOR_WORKERS = get_from_env("INSIGHT_QUERY_EXECUTOR_WORKERS", 32, type_cast=int)
+# How many of those sub-queries a single team can have running at once, per process
+INSIGHT_QUERY_TEAM_CONCURRENCY = get_from_env("INSIGHT_QUERY_TEAM_CONCURRENCY", 8, type_cast=int)
+# Sub-queries still running after this long are killed. 0 disables the timeout
+INSIGHT_QUERY_TIMEOUT_SECONDS = get_from_env("INSIGHT_QUERY_TIMEOUT_SECONDS", 10 * 60, type_cast=int)
+# How long identical insight queries share their ClickHouse result for. 0 disables the result cache for insights
+INSIGHT_QUERY_RESULT_CACHE_TTL_SECONDS = get_from_env("INSIGHT_QUERY_RESULT_CACHE_TTL_SECONDS", 0, type_cast=int)
+# Larger results aren't kept in the ClickHouse result cache, though concurrent identical queries still share them
+CLICKHOUSE_RESULT_CACHE_MAX_BYTES = get_from_env("CLICKHOUSE_RESULT_CACHE_MAX_BYTES", 5 * 1024 * 1024, type_cast=int)
+
 CLICKHOUSE_STABLE_HOST = get_from_env("CLICKHOUSE_STABLE_HOST", CLICKHOUSE_HOST)
 # If enabled, some queries will use system.cluster table to query each shard
 CLICKHOUSE_ALLOW_PER_SHARD_EXECUTION = get_from_env(
@@ -210,6 +221,11 @@ SESSION_RECORDING_KAFKA_MAX_REQUEST_SIZE_BYTES: int = get_from_env(
     type_cast=int,
 )
 
+# Producer batching: how long to wait for more messages before sending a batch to a partition, and how large a batch
+# can get. The defaults are those of kafka-python, i.e. send immediately.
+KAFKA_PRODUCER_LINGER_MS: int = get_from_env("KAFKA_PRODUCER_LINGER_MS", 0, type_cast=int)
+KAFKA_PRODUCER_BATCH_SIZE_BYTES: int = get_from_env("KAFKA_PRODUCER_BATCH_SIZE_BYTES", 16 * 1024, type_cast=int)
+
 KAFKA_SECURITY_PROTOCOL = os.getenv("KAFKA_SECURITY_PROTOCOL", None)
 SESSION_RECORDING_KAFKA_SECURITY_PROTOCOL = os.getenv(
     "SESSION_RECORDING_KAFKA_SECURITY_PROTOCOL", KAFKA_SECURITY_PROTOCOL
@@ -264,6 +280,11 @@ if not REDIS_URL:
         "https://posthog.com/docs/deployment/upgrading-posthog#upgrading-from-before-1011"
     )
 
+# Teams and feature flags read from Redis on every request are also kept in a small per-process cache for this
+# many seconds, after which they're revalidated against a version key in Redis. Set to 0 to disable.
+LOCAL_CACHE_TTL_SECONDS = get_from_env("LOCAL_CACHE_TTL_SECONDS", 0 if TEST else 5, type_cast=float)
+LOCAL_CACHE_MAX_SIZE = get_from_env("LOCAL_CACHE_MAX_SIZE", 10_000, type_cast=int)
+
 # Controls whether the TolerantZlibCompressor is used for Redis compression when writing to Redis.
 # The TolerantZlibCompressor is a drop-in replacement for the standard Django ZlibCompressor that
 # can cope with compressed and uncompressed reading at the same time
@@ -25,6 +25,9 @@ COUNT_TILES_WITH_NO_FILTERS_HASH_INTERVAL_SECONDS = get_from_env(
 
 CACHED_RESULTS_TTL = 7 * 24 * 60 * 60  # how long to keep cached results for
 
+# How long after an interval has ended before its trend counts are cached as final, i.e. late events stop arriving
+TRENDS_BUCKET_CACHE_SETTLE_SECONDS = get_from_env("TRENDS_BUCKET_CACHE_SETTLE_SECONDS", 24 * 60 * 60, type_cast=int)
+
 # Schedule to run asynchronous data deletion on. Follows crontab syntax.
 # Use empty string to prevent this
 CLEAR_CLICKHOUSE_REMOVED_DATA_SCHEDULE_CRON = get_from_env(
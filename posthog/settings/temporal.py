@@ -12,3 +12,5 @@ TEMPORAL_WORKFLOW_MAX_ATTEMPTS = os.getenv("TEMPORAL_WORKFLOW_MAX_ATTEMPTS", "3"
 
 BATCH_EXPORT_S3_UPLOAD_CHUNK_SIZE_BYTES = 1024 * 1024 * 50  # 50MB
 BATCH_EXPORT_SNOWFLAKE_UPLOAD_CHUNK_SIZE_BYTES = 1024 * 1024 * 100  # 100MB
+BATCH_EXPORT_S3_MAX_CONCURRENT_UPLOADS = 4  # parts, each up to BATCH_EXPORT_S3_UPLOAD_CHUNK_SIZE_BYTES on disk
+BATCH_EXPORT_S3_PARQUET_ROW_GROUP_SIZE = 50_000  # rows, kept in memory until written out
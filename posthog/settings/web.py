@@ -4,6 +4,7 @@ from datetime import timedelta
 from typing import List
 
 from corsheaders.defaults import default_headers
+from django.core.exceptions import ImproperlyConfigured
 
 from posthog.settings.base_variables import BASE_DIR, DEBUG, TEST
 from posthog.settings.statsd import STATSD_HOST
@@ -25,6 +26,13 @@ DECIDE_RATE_LIMIT_ENABLED = get_from_env("DECIDE_RATE_LIMIT_ENABLED", False, typ
 DECIDE_BUCKET_CAPACITY = get_from_env("DECIDE_BUCKET_CAPACITY", type_cast=int, default=500)
 DECIDE_BUCKET_REPLENISH_RATE = get_from_env("DECIDE_BUCKET_REPLENISH_RATE", type_cast=float, default=10.0)
 
+# Decide flag evaluation: when enabled, flag conditions (including super conditions) that can be fully resolved from
+# the person and group property overrides sent with the request are never sent to Postgres, and the flag matching
+# query only includes the remaining conditions.
+DECIDE_LOCAL_FLAG_EVALUATION_ENABLED = get_from_env(
+    "DECIDE_LOCAL_FLAG_EVALUATION_ENABLED", False, type_cast=str_to_bool
+)
+
 # Decide billing analytics
 
 DECIDE_BILLING_SAMPLING_RATE = get_from_env("DECIDE_BILLING_SAMPLING_RATE", 0.1, type_cast=float)
@@ -320,6 +328,20 @@ GZIP_RESPONSE_ALLOW_LIST = get_list(
 
 KAFKA_PRODUCE_ACK_TIMEOUT_SECONDS = int(os.getenv("KAFKA_PRODUCE_ACK_TIMEOUT_SECONDS", None) or 10)
 
+# How capture waits for Kafka to acknowledge produced events:
+# - "sequential": wait on each future in turn, sharing one deadline (the original behaviour)
+# - "batch": wait on all futures of a request at once, returning as soon as all succeed or any fails
+# - "async": don't wait at all, failures are only reported via metrics and logs
+CAPTURE_KAFKA_ACK_MODE = os.getenv("CAPTURE_KAFKA_ACK_MODE", "sequential")
+if CAPTURE_KAFKA_ACK_MODE not in ("sequential", "batch", "async"):
+    raise ImproperlyConfigured(
+        f"CAPTURE_KAFKA_ACK_MODE must be one of 'sequential', 'batch' or 'async', got '{CAPTURE_KAFKA_ACK_MODE}'"
+    )
+
+# Whether capture produces the events of a request to Kafka with a single `produce_batch` call, instead of one
+# `produce` call per event
+CAPTURE_KAFKA_BATCH_PRODUCE = get_from_env("CAPTURE_KAFKA_BATCH_PRODUCE", False, type_cast=str_to_bool)
+
 # Prometheus Django metrics settings, see
 # https://github.com/korfuri/django-prometheus for more details
 
@@ -1,5 +1,5 @@
 import abc
-from typing import Optional, Union, List
+from typing import IO, Dict, Iterable, List, Optional, Union
 
 import structlog
 from boto3 import client
@@ -9,6 +9,9 @@ from sentry_sdk import capture_exception
 
 logger = structlog.get_logger(__name__)
 
+# S3 needs every part of a multipart upload but the last one to be at least 5 MiB
+MULTIPART_UPLOAD_PART_SIZE = 8 * 1024 * 1024
+
 
 class ObjectStorageError(Exception):
     pass
@@ -37,10 +40,18 @@ class ObjectStorageClient(metaclass=abc.ABCMeta):
     def read_bytes(self, bucket: str, key: str) -> Optional[bytes]:
         pass
 
+    @abc.abstractmethod
+    def read_stream(self, bucket: str, key: str) -> Optional[IO[bytes]]:
+        pass
+
     @abc.abstractmethod
     def write(self, bucket: str, key: str, content: Union[str, bytes]) -> None:
         pass
 
+    @abc.abstractmethod
+    def write_stream(self, bucket: str, key: str, chunks: Iterable[bytes]) -> None:
+        pass
+
 
 class UnavailableStorage(ObjectStorageClient):
     def head_bucket(self, bucket: str):
@@ -58,9 +69,15 @@ class UnavailableStorage(ObjectStorageClient):
     def read_bytes(self, bucket: str, key: str) -> Optional[bytes]:
         pass
 
+    def read_stream(self, bucket: str, key: str) -> Optional[IO[bytes]]:
+        pass
+
     def write(self, bucket: str, key: str, content: Union[str, bytes]) -> None:
         pass
 
+    def write_stream(self, bucket: str, key: str, chunks: Iterable[bytes]) -> None:
+        pass
+
 
 class ObjectStorage(ObjectStorageClient):
     def __init__(self, aws_client) -> None:
@@ -115,6 +132,16 @@ class ObjectStorage(ObjectStorageClient):
             capture_exception(e)
             raise ObjectStorageError("read failed") from e
 
+    def read_stream(self, bucket: str, key: str) -> Optional[IO[bytes]]:
+        s3_response = {}
+        try:
+            s3_response = self.aws_client.get_object(Bucket=bucket, Key=key)
+            return s3_response["Body"]
+        except Exception as e:
+            logger.error("object_storage.read_failed", bucket=bucket, file_name=key, error=e, s3_response=s3_response)
+            capture_exception(e)
+            raise ObjectStorageError("read failed") from e
+
     def write(self, bucket: str, key: str, content: Union[str, bytes]) -> None:
         s3_response = {}
         try:
@@ -124,6 +151,57 @@ class ObjectStorage(ObjectStorageClient):
             capture_exception(e)
             raise ObjectStorageError("write failed") from e
 
+    def write_stream(self, bucket: str, key: str, chunks: Iterable[bytes]) -> None:
+        """
+        Write content that is produced incrementally, holding at most one part of it in memory.
+
+        Content smaller than a single part is written with a plain PUT, anything larger as a multipart upload which is
+        aborted if either producing or uploading the content fails.
+        """
+        upload_id: Optional[str] = None
+        parts: List[Dict] = []
+        buffer = bytearray()
+        try:
+            for chunk in chunks:
+                buffer += chunk
+                if len(buffer) < MULTIPART_UPLOAD_PART_SIZE:
+                    continue
+                if upload_id is None:
+                    upload_id = self._multipart_upload_call("create_multipart_upload", bucket, key)["UploadId"]
+                parts.append(self._upload_part(bucket, key, upload_id, len(parts) + 1, bytes(buffer)))
+                buffer = bytearray()
+
+            if upload_id is None:
+                self.write(bucket, key, bytes(buffer))
+                return
+
+            if buffer:
+                parts.append(self._upload_part(bucket, key, upload_id, len(parts) + 1, bytes(buffer)))
+            self._multipart_upload_call(
+                "complete_multipart_upload", bucket, key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+            )
+        except Exception:
+            if upload_id is not None:
+                try:
+                    self.aws_client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+                except Exception as e:
+                    logger.warn("object_storage.abort_multipart_upload_failed", bucket=bucket, file_name=key, error=e)
+            raise
+
+    def _upload_part(self, bucket: str, key: str, upload_id: str, part_number: int, content: bytes) -> Dict:
+        response = self._multipart_upload_call(
+            "upload_part", bucket, key, UploadId=upload_id, PartNumber=part_number, Body=content
+        )
+        return {"ETag": response["ETag"], "PartNumber": part_number}
+
+    def _multipart_upload_call(self, method: str, bucket: str, key: str, **kwargs) -> Dict:
+        try:
+            return getattr(self.aws_client, method)(Bucket=bucket, Key=key, **kwargs)
+        except Exception as e:
+            logger.error("object_storage.write_failed", bucket=bucket, file_name=key, error=e, method=method)
+            capture_exception(e)
+            raise ObjectStorageError("write failed") from e
+
 
 _client: ObjectStorageClient = UnavailableStorage()
 
@@ -152,6 +230,10 @@ def write(file_name: str, content: Union[str, bytes]) -> None:
     return object_storage_client().write(bucket=settings.OBJECT_STORAGE_BUCKET, key=file_name, content=content)
 
 
+def write_stream(file_name: str, chunks: Iterable[bytes]) -> None:
+    return object_storage_client().write_stream(bucket=settings.OBJECT_STORAGE_BUCKET, key=file_name, chunks=chunks)
+
+
 def read(file_name: str) -> Optional[str]:
     return object_storage_client().read(bucket=settings.OBJECT_STORAGE_BUCKET, key=file_name)
 
@@ -160,6 +242,10 @@ def read_bytes(file_name: str) -> Optional[bytes]:
     return object_storage_client().read_bytes(bucket=settings.OBJECT_STORAGE_BUCKET, key=file_name)
 
 
+def read_stream(file_name: str) -> Optional[IO[bytes]]:
+    return object_storage_client().read_stream(bucket=settings.OBJECT_STORAGE_BUCKET, key=file_name)
+
+
 def list_objects(prefix: str) -> Optional[List[str]]:
     return object_storage_client().list_objects(bucket=settings.OBJECT_STORAGE_BUCKET, prefix=prefix)
 
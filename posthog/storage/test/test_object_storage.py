@@ -10,7 +10,16 @@ from posthog.settings import (
     OBJECT_STORAGE_ENDPOINT,
     OBJECT_STORAGE_SECRET_ACCESS_KEY,
 )
-from posthog.storage.object_storage import health_check, read, write, get_presigned_url, list_objects
+from posthog.storage.object_storage import (
+    get_presigned_url,
+    health_check,
+    list_objects,
+    read,
+    read_bytes,
+    read_stream,
+    write,
+    write_stream,
+)
 from posthog.test.base import APIBaseTest
 
 TEST_BUCKET = "test_storage_bucket"
@@ -103,3 +112,32 @@ class TestStorage(APIBaseTest):
             listing = list_objects(prefix=shared_prefix)
 
             assert listing is None
+
+    def test_write_stream_and_read_stream_small_content(self) -> None:
+        with self.settings(OBJECT_STORAGE_ENABLED=True):
+            file_name = f"{TEST_BUCKET}/test_write_stream_and_read_stream_small_content/{uuid.uuid4()}"
+            write_stream(file_name, iter([b"my ", b"content"]))
+
+            stream = read_stream(file_name)
+            assert stream is not None
+            self.assertEqual(stream.read(), b"my content")
+
+    def test_write_stream_uploads_large_content_in_parts(self) -> None:
+        with self.settings(OBJECT_STORAGE_ENABLED=True):
+            file_name = f"{TEST_BUCKET}/test_write_stream_uploads_large_content_in_parts/{uuid.uuid4()}"
+            chunks = [bytes([index]) * 1024 * 1024 for index in range(12)]
+            write_stream(file_name, iter(chunks))
+
+            self.assertEqual(read_bytes(file_name), b"".join(chunks))
+
+    def test_write_stream_aborts_upload_when_content_fails(self) -> None:
+        def failing_chunks():
+            yield b"a" * 9 * 1024 * 1024
+            raise ValueError("content failed")
+
+        with self.settings(OBJECT_STORAGE_ENABLED=True):
+            file_name = f"{TEST_BUCKET}/test_write_stream_aborts_upload_when_content_fails/{uuid.uuid4()}"
+            with self.assertRaises(ValueError):
+                write_stream(file_name, failing_chunks())
+
+            assert list_objects(prefix=file_name) is None
@@ -1,42 +1,121 @@
 import time
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Set
 
 import structlog
-from celery import shared_task
+from celery import chain, shared_task
 from dateutil.relativedelta import relativedelta
 from django.conf import settings
-from django.db.models import F
+from django.core.cache import cache
+from django.db.models import F, QuerySet
 from django.utils import timezone
 
 from posthog.models import Cohort
 from posthog.models.cohort import get_and_update_pending_version
-from posthog.models.cohort.util import clear_stale_cohortpeople
+from posthog.models.cohort.util import clear_stale_cohortpeople, get_dependent_cohorts
 
 logger = structlog.get_logger(__name__)
 
 MAX_AGE_MINUTES = 15
+# How many of the most stale cohorts are considered each run, as a multiple of CALCULATE_X_COHORTS_PARALLEL
+CANDIDATE_COHORTS_FACTOR = 4
+# Calculation durations are only used for prioritising, so it's fine for them to be forgotten eventually
+CALCULATION_DURATION_TTL = 7 * 24 * 60 * 60
 
 
 def calculate_cohorts() -> None:
     # This task will be run every minute
-    # Every minute, grab a few cohorts off the list and execute them
-    for cohort in (
-        Cohort.objects.filter(
-            deleted=False,
-            is_calculating=False,
-            last_calculation__lte=timezone.now() - relativedelta(minutes=MAX_AGE_MINUTES),
-            errors_calculating__lte=20,
-        )
-        .exclude(is_static=True)
-        .order_by(F("last_calculation").asc(nulls_first=True))[0 : settings.CALCULATE_X_COHORTS_PARALLEL]
-    ):
-        cohort = Cohort.objects.filter(pk=cohort.pk).get()
-        update_cohort(cohort)
-
-
-def update_cohort(cohort: Cohort) -> None:
+    # Every minute, grab a few cohorts off the list and execute them, along with the stale cohorts they're based on
+    candidates = list(
+        get_stale_cohorts().order_by(F("last_calculation").asc(nulls_first=True))[
+            0 : settings.CALCULATE_X_COHORTS_PARALLEL * CANDIDATE_COHORTS_FACTOR
+        ]
+    )
+    cohorts = prioritize_cohorts(candidates)[0 : settings.CALCULATE_X_COHORTS_PARALLEL]
+
+    for cohorts_in_order in get_cohort_calculation_order(cohorts):
+        if len(cohorts_in_order) == 1:
+            # Nothing about the cohort itself has changed, so only persons that changed need to be looked at again
+            update_cohort(cohorts_in_order[0], incremental=True)
+        else:
+            # Each cohort is only calculated once the cohorts it's based on are, so it never uses stale results
+            chain(
+                *(
+                    calculate_cohort_ch.si(cohort.id, get_and_update_pending_version(cohort), True)
+                    for cohort in cohorts_in_order
+                )
+            ).apply_async()
+
+
+def get_stale_cohorts() -> QuerySet:
+    return Cohort.objects.filter(
+        deleted=False,
+        is_calculating=False,
+        last_calculation__lte=timezone.now() - relativedelta(minutes=MAX_AGE_MINUTES),
+        errors_calculating__lte=20,
+    ).exclude(is_static=True)
+
+
+def prioritize_cohorts(cohorts: List[Cohort]) -> List[Cohort]:
+    """
+    Order cohorts by how stale they are relative to how long they take to calculate, so that cheap cohorts don't
+    wait behind expensive ones.
+    """
+    durations: Dict[str, float] = cache.get_many([_calculation_duration_key(cohort.pk) for cohort in cohorts])
+    now = timezone.now()
+
+    def priority(cohort: Cohort) -> float:
+        if cohort.last_calculation is None:
+            return float("inf")
+        staleness = (now - cohort.last_calculation).total_seconds()
+        # Cohorts without a known duration are calculated soon, to find out how long they take
+        return staleness / max(durations.get(_calculation_duration_key(cohort.pk), 1.0), 1.0)
+
+    return sorted(cohorts, key=priority, reverse=True)
+
+
+def get_cohort_calculation_order(cohorts: List[Cohort]) -> List[List[Cohort]]:
+    """
+    Split cohorts into groups that depend on each other, each ordered so that a cohort comes after the cohorts it's
+    based on. Stale cohorts that the given ones are based on are added, so that they're calculated first.
+    """
+    stale_cohort_ids = set(get_stale_cohorts().values_list("pk", flat=True))
+    scheduled: Dict[int, Cohort] = {cohort.pk: cohort for cohort in cohorts}
+    dependencies: Dict[int, Set[int]] = {}
+
+    queue = list(scheduled.values())
+    while queue:
+        cohort = queue.pop()
+        dependencies[cohort.pk] = set()
+        for dependency in get_dependent_cohorts(cohort):
+            if dependency.pk in scheduled or dependency.pk in stale_cohort_ids:
+                dependencies[cohort.pk].add(dependency.pk)
+                if dependency.pk not in scheduled:
+                    scheduled[dependency.pk] = dependency
+                    queue.append(dependency)
+
+    # Group cohorts connected by dependencies, so that unrelated groups can be calculated in parallel
+    group_of: Dict[int, int] = {pk: pk for pk in scheduled}
+
+    def find(pk: int) -> int:
+        while group_of[pk] != pk:
+            pk = group_of[pk]
+        return pk
+
+    for pk, dependency_pks in dependencies.items():
+        for dependency_pk in dependency_pks:
+            group_of[find(dependency_pk)] = find(pk)
+
+    groups: Dict[int, List[Cohort]] = {}
+    for pk, cohort in scheduled.items():
+        groups.setdefault(find(pk), []).append(cohort)
+
+    # Dependencies are transitive, so a cohort always has more of them than any of the cohorts it's based on
+    return [sorted(group, key=lambda cohort: len(dependencies[cohort.pk])) for group in groups.values()]
+
+
+def update_cohort(cohort: Cohort, incremental: bool = False) -> None:
     pending_version = get_and_update_pending_version(cohort)
-    calculate_cohort_ch.delay(cohort.id, pending_version)
+    calculate_cohort_ch.delay(cohort.id, pending_version, incremental)
 
 
 @shared_task(ignore_result=True)
@@ -46,9 +125,15 @@ def clear_stale_cohort(cohort_id: int, before_version: int) -> None:
 
 
 @shared_task(ignore_result=True, max_retries=2)
-def calculate_cohort_ch(cohort_id: int, pending_version: int) -> None:
+def calculate_cohort_ch(cohort_id: int, pending_version: int, incremental: bool = False) -> None:
     cohort: Cohort = Cohort.objects.get(pk=cohort_id)
-    cohort.calculate_people_ch(pending_version)
+    start_time = time.monotonic()
+    cohort.calculate_people_ch(pending_version, incremental=incremental)
+    cache.set(_calculation_duration_key(cohort_id), time.monotonic() - start_time, CALCULATION_DURATION_TTL)
+
+
+def _calculation_duration_key(cohort_id: int) -> str:
+    return f"cohort_calculation_duration_{cohort_id}"
 
 
 @shared_task(ignore_result=True, max_retries=1)
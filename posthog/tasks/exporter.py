@@ -16,7 +16,7 @@ def export_asset(exported_asset_id: int, limit: Optional[int] = None) -> None:
 
     is_csv_export = exported_asset.export_format == ExportedAsset.ExportFormat.CSV
     if is_csv_export:
-        max_limit = exported_asset.export_context.get("max_limit", 10000)
+        max_limit = exported_asset.export_context.get("max_limit", csv_exporter.CSV_EXPORT_MAX_ROWS)
         csv_exporter.export_csv(exported_asset, limit=limit, max_limit=max_limit)
         statsd.incr("csv_exporter.queued", tags={"team_id": str(exported_asset.team_id)})
     else:
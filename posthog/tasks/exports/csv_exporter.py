@@ -1,22 +1,35 @@
+import csv
 import datetime
-from typing import Any, Dict, List, Optional, Tuple
+import io
+import pickle
+import tempfile
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 from urllib.parse import parse_qsl, quote, urlencode, urlparse, urlunparse
 
 import requests
 import structlog
+from django.utils import timezone
 from sentry_sdk import capture_exception, push_scope
 from statshog.defaults.django import statsd
 
 from posthog.jwt import PosthogJwtAudience, encode_jwt
 from posthog.api.query import process_query
 from posthog.logging.timing import timed
-from posthog.models.exported_asset import ExportedAsset, save_content
+from posthog.models.exported_asset import ExportedAsset, save_content_from_file
 from posthog.utils import absolute_uri
 
 from .ordered_csv_renderer import OrderedCsvRenderer
 
 logger = structlog.get_logger(__name__)
 
+# Rows are written to a temporary file as they are loaded, so exports aren't limited by the memory of the worker
+CSV_EXPORT_MAX_ROWS = 100_000
+
+# Loading that many rows can take longer than an access token lives, so a new token is issued for any page that
+# would start with less than the margin left on the current one
+CSV_EXPORT_ACCESS_TOKEN_LIFETIME = datetime.timedelta(minutes=15)
+CSV_EXPORT_ACCESS_TOKEN_REFRESH_MARGIN = datetime.timedelta(minutes=5)
+
 
 # SUPPORTED CSV TYPES
 
@@ -38,9 +51,9 @@ logger = structlog.get_logger(__name__)
 # HOW DOES THIS WORK
 # 1. We receive an export task with a given resource uri (identical to the API)
 # 2. We call the actual API to load the data with the given params so that we receive a paginateable response
-# 3. We save the response to a chunk in object storage and then load the `next` page of results
+# 3. We flatten the rows of the response to a temporary file and then load the `next` page of results
 # 4. Repeat until exhausted or limit reached
-# 5. We save the final blob output and update the ExportedAsset
+# 5. We write the CSV to another temporary file, stream it to object storage and update the ExportedAsset
 
 
 def add_query_params(url: str, params: Dict[str, str]) -> str:
@@ -165,12 +178,31 @@ class UnexpectedEmptyJsonResponse(Exception):
     pass
 
 
-def _export_to_csv(exported_asset: ExportedAsset, limit: int = 1000, max_limit: int = 3_500) -> None:
+def _export_to_csv(exported_asset: ExportedAsset, limit: int = 1000, max_limit: int = CSV_EXPORT_MAX_ROWS) -> None:
     resource = exported_asset.export_context
 
     columns: List[str] = resource.get("columns", [])
 
-    all_csv_rows: List[Any] = []
+    with tempfile.TemporaryFile() as rows_file, tempfile.TemporaryFile() as csv_file:
+        header = _write_flattened_rows(_iter_csv_rows(exported_asset, limit, max_limit), columns, rows_file)
+        if header is not None:
+            _write_csv(header, rows_file, csv_file)
+        save_content_from_file(exported_asset, csv_file)
+
+
+def _issue_access_token(exported_asset: ExportedAsset) -> Tuple[str, datetime.datetime]:
+    expires_at = timezone.now() + CSV_EXPORT_ACCESS_TOKEN_LIFETIME
+    access_token = encode_jwt(
+        {"id": exported_asset.created_by_id}, CSV_EXPORT_ACCESS_TOKEN_LIFETIME, PosthogJwtAudience.IMPERSONATED_USER
+    )
+    return access_token, expires_at
+
+
+def _iter_csv_rows(exported_asset: ExportedAsset, limit: int, max_limit: int) -> Iterator[List[Any]]:
+    """
+    Yield the rows of the export a page at a time, so that they don't all need to be held in memory
+    """
+    resource = exported_asset.export_context
 
     if resource.get("source"):
         from posthog.hogql.constants import MAX_SELECT_RETURNED_ROWS
@@ -179,66 +211,101 @@ def _export_to_csv(exported_asset: ExportedAsset, limit: int = 1000, max_limit:
         query_response = process_query(
             team=exported_asset.team, query_json=query, default_limit=MAX_SELECT_RETURNED_ROWS
         )
-        all_csv_rows = _convert_response_to_csv_data(query_response)
-
-    else:
-        path: str = resource["path"]
-        method: str = resource.get("method", "GET")
-        body = resource.get("body", None)
-        next_url = None
-        access_token = encode_jwt(
-            {"id": exported_asset.created_by_id}, datetime.timedelta(minutes=15), PosthogJwtAudience.IMPERSONATED_USER
-        )
+        yield _convert_response_to_csv_data(query_response)
+        return
 
-        while len(all_csv_rows) < max_limit:
-            response = make_api_call(access_token, body, limit, method, next_url, path)
-
-            if response.status_code != 200:
-                # noinspection PyBroadException
-                try:
-                    response_json = response.json()
-                except Exception:
-                    response_json = "no response json to parse"
-                raise Exception(f"export API call failed with status_code: {response.status_code}. {response_json}")
-
-            # Figure out how to handle funnel polling....
-            data = response.json()
-
-            if data is None:
-                unexpected_empty_json_response = UnexpectedEmptyJsonResponse("JSON is None when calling API for data")
-                logger.error(
-                    "csv_exporter.json_was_none",
-                    exc=unexpected_empty_json_response,
-                    exc_info=True,
-                    response_text=response.text,
-                )
+    path: str = resource["path"]
+    method: str = resource.get("method", "GET")
+    body = resource.get("body", None)
+    next_url = None
+    access_token, access_token_expires_at = _issue_access_token(exported_asset)
 
-                raise unexpected_empty_json_response
+    row_count = 0
+    while row_count < max_limit:
+        if timezone.now() >= access_token_expires_at - CSV_EXPORT_ACCESS_TOKEN_REFRESH_MARGIN:
+            access_token, access_token_expires_at = _issue_access_token(exported_asset)
 
-            csv_rows = _convert_response_to_csv_data(data)
+        response = make_api_call(access_token, body, limit, method, next_url, path)
 
-            all_csv_rows = all_csv_rows + csv_rows
+        if response.status_code != 200:
+            # noinspection PyBroadException
+            try:
+                response_json = response.json()
+            except Exception:
+                response_json = "no response json to parse"
+            raise Exception(f"export API call failed with status_code: {response.status_code}. {response_json}")
 
-            if not data.get("next") or not csv_rows:
-                break
+        # Figure out how to handle funnel polling....
+        data = response.json()
 
-            next_url = data.get("next")
+        if data is None:
+            unexpected_empty_json_response = UnexpectedEmptyJsonResponse("JSON is None when calling API for data")
+            logger.error(
+                "csv_exporter.json_was_none",
+                exc=unexpected_empty_json_response,
+                exc_info=True,
+                response_text=response.text,
+            )
 
-    renderer = OrderedCsvRenderer()
+            raise unexpected_empty_json_response
+
+        csv_rows = _convert_response_to_csv_data(data)
+        row_count += len(csv_rows)
+        yield csv_rows
 
-    # NOTE: This is not ideal as some rows _could_ have different keys
-    # Ideally we would extend the csvrenderer to supported keeping the order in place
-    if len(all_csv_rows):
-        if not [x for x in all_csv_rows[0].values() if isinstance(x, dict) or isinstance(x, list)]:
-            # If values are serialised then keep the order of the keys, else allow it to be unordered
-            renderer.header = all_csv_rows[0].keys()
+        if not data.get("next") or not csv_rows:
+            break
 
-    render_context = {}
-    if columns:
-        render_context["header"] = columns
+        next_url = data.get("next")
 
-    rendered_csv_content = renderer.render(all_csv_rows, renderer_context=render_context)
-    save_content(exported_asset, rendered_csv_content)
+
+def _write_flattened_rows(pages: Iterable[List[Any]], columns: List[str], rows_file: IO[bytes]) -> Optional[List[str]]:
+    """
+    Flatten the rows the same way `OrderedCsvRenderer` does, and pickle them to `rows_file` one by one, as the header
+    can only be known once all of them have been seen. Returns the header, or None if there were no rows.
+    """
+    renderer = OrderedCsvRenderer()
+    header: Optional[List[str]] = columns or None
+    # Same order as `OrderedCsvRenderer.tablize`, i.e. keys with the same prefix are grouped together
+    ordered_fields: Dict[str, List[str]] = {}
+    seen_fields: Set[str] = set()
+    has_rows = False
+
+    for page in pages:
+        for row in page:
+            if not has_rows and header is None:
+                # NOTE: This is not ideal as some rows _could_ have different keys
+                if not [x for x in row.values() if isinstance(x, dict) or isinstance(x, list)]:
+                    # If values are serialised then keep the order of the keys, else allow it to be unordered
+                    header = list(row.keys())
+            has_rows = True
+
+            flat_row = renderer.flatten_item(row)
+            if header is None:
+                for field in flat_row.keys():
+                    if field not in seen_fields:
+                        seen_fields.add(field)
+                        ordered_fields.setdefault(field.split(".")[0], []).append(field)
+            pickle.dump(flat_row, rows_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    if not has_rows:
+        return None
+    return header or [field for fields in ordered_fields.values() for field in fields]
+
+
+def _write_csv(header: List[str], rows_file: IO[bytes], csv_file: IO[bytes]) -> None:
+    rows_file.seek(0)
+    csv_text = io.TextIOWrapper(csv_file, encoding="utf-8", newline="", write_through=True)
+    writer = csv.writer(csv_text)
+    writer.writerow(header)
+    while True:
+        try:
+            flat_row = pickle.load(rows_file)
+        except EOFError:
+            break
+        writer.writerow([flat_row.get(field, None) for field in header])
+    # Leave the file open for saving its content
+    csv_text.detach()
 
 
 def make_api_call(
@@ -265,7 +332,9 @@ def make_api_call(
 
 
 @timed("csv_exporter")
-def export_csv(exported_asset: ExportedAsset, limit: Optional[int] = None, max_limit: int = 3_500) -> None:
+def export_csv(
+    exported_asset: ExportedAsset, limit: Optional[int] = None, max_limit: int = CSV_EXPORT_MAX_ROWS
+) -> None:
     if not limit:
         limit = 1000
 
@@ -1,3 +1,4 @@
+import datetime
 from typing import Any, Dict, Optional
 from unittest.mock import MagicMock, Mock, patch
 
@@ -7,6 +8,7 @@ from botocore.client import Config
 from dateutil.relativedelta import relativedelta
 from django.test import override_settings
 from django.utils.timezone import now
+from freezegun import freeze_time
 
 from posthog.models import ExportedAsset
 from posthog.models.utils import UUIDT
@@ -341,6 +343,61 @@ class TestCSVExporter(APIBaseTest):
             self.assertEqual(first_row[2], "$pageview")
             self.assertEqual(first_row[5], str(self.team.pk))
 
+    @patch("posthog.tasks.exports.csv_exporter.make_api_call")
+    def test_csv_exporter_streams_pages_past_the_old_row_limit(self, patched_api_call) -> None:
+        def page(index: int) -> Dict[str, Any]:
+            results = [{"id": index * 1000 + row, "properties": {f"prop_{index}": row}} for row in range(1000)]
+            return {"next": f"http://testserver/api/literally/anything?page={index + 1}", "results": results}
+
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.side_effect = [page(index) for index in range(5)]
+        patched_api_call.return_value = mock_response
+
+        exported_asset = self._create_asset()
+        with self.settings(OBJECT_STORAGE_ENABLED=False):
+            csv_exporter.export_csv(exported_asset, max_limit=5000)
+
+        lines = exported_asset.content.decode("utf-8").split("\r\n")
+        assert patched_api_call.call_count == 5
+        # the header has the columns of all pages, not only the first one
+        assert (
+            lines[0] == "id,properties.prop_0,properties.prop_1,properties.prop_2,properties.prop_3,properties.prop_4"
+        )
+        assert len(lines) == 5002
+        assert lines[1] == "0,0,,,,"
+        assert lines[5000] == "4999,,,,,999"
+
+    @patch("posthog.tasks.exports.csv_exporter.make_api_call")
+    def test_csv_exporter_reissues_the_access_token_before_it_expires(self, patched_api_call) -> None:
+        access_tokens = []
+
+        with freeze_time("2023-05-10T12:00:00Z") as frozen_time:
+
+            def api_call(access_token, *args) -> Mock:
+                access_tokens.append(access_token)
+                # every page takes six minutes to load
+                frozen_time.tick(datetime.timedelta(minutes=6))
+                mock_response = Mock()
+                mock_response.status_code = 200
+                mock_response.json.return_value = {
+                    "next": f"http://testserver/api/literally/anything?page={len(access_tokens)}",
+                    "results": [{"id": len(access_tokens)}],
+                }
+                return mock_response
+
+            patched_api_call.side_effect = api_call
+
+            exported_asset = self._create_asset()
+            with self.settings(OBJECT_STORAGE_ENABLED=False):
+                csv_exporter.export_csv(exported_asset, limit=1, max_limit=3)
+
+        assert patched_api_call.call_count == 3
+        # the third page would start with only three minutes left on the first token
+        assert access_tokens[0] == access_tokens[1]
+        assert access_tokens[2] != access_tokens[1]
+        assert exported_asset.content.decode("utf-8").split("\r\n")[1:4] == ["1", "2", "3"]
+
     def _split_to_dict(self, url: str) -> Dict[str, Any]:
         first_split_parts = url.split("?")
         assert len(first_split_parts) == 2
@@ -1,12 +1,20 @@
+from datetime import timedelta
 from typing import Callable
 from unittest.mock import MagicMock, patch
 
+from django.core.cache import cache
+from django.utils import timezone
 from freezegun import freeze_time
 
 from posthog.models.cohort import Cohort
 from posthog.models.feature_flag import FeatureFlag
 from posthog.models.person import Person
-from posthog.tasks.calculate_cohort import calculate_cohort_from_list, calculate_cohorts
+from posthog.tasks.calculate_cohort import (
+    calculate_cohort_from_list,
+    calculate_cohorts,
+    get_cohort_calculation_order,
+    prioritize_cohorts,
+)
 from posthog.test.base import APIBaseTest
 
 
@@ -97,4 +105,47 @@ def calculate_cohort_test_factory(event_factory: Callable, person_factory: Calla
 
             calculate_cohorts()
 
+        def test_cohort_calculation_order_includes_stale_dependencies(self) -> None:
+            stale = timezone.now() - timedelta(hours=1)
+            base_cohort = Cohort.objects.create(
+                team=self.team,
+                groups=[{"properties": [{"key": "$some_prop", "value": "something", "type": "person"}]}],
+                last_calculation=stale,
+            )
+            dependent_cohort = Cohort.objects.create(
+                team=self.team,
+                filters={
+                    "properties": {"type": "AND", "values": [{"key": "id", "value": base_cohort.pk, "type": "cohort"}]}
+                },
+                last_calculation=stale,
+            )
+            unrelated_cohort = Cohort.objects.create(
+                team=self.team,
+                groups=[{"properties": [{"key": "$other_prop", "value": "something", "type": "person"}]}],
+                last_calculation=stale,
+            )
+
+            order = get_cohort_calculation_order([dependent_cohort, unrelated_cohort])
+
+            self.assertCountEqual(
+                [[cohort.pk for cohort in cohorts] for cohorts in order],
+                [[base_cohort.pk, dependent_cohort.pk], [unrelated_cohort.pk]],
+            )
+
+        def test_prioritize_cohorts_by_staleness_and_duration(self) -> None:
+            expensive_cohort = Cohort.objects.create(
+                team=self.team,
+                groups=[{"properties": [{"key": "$some_prop", "value": "something", "type": "person"}]}],
+                last_calculation=timezone.now() - timedelta(hours=2),
+            )
+            cheap_cohort = Cohort.objects.create(
+                team=self.team,
+                groups=[{"properties": [{"key": "$other_prop", "value": "something", "type": "person"}]}],
+                last_calculation=timezone.now() - timedelta(hours=1),
+            )
+            cache.set(f"cohort_calculation_duration_{expensive_cohort.pk}", 600)
+            cache.set(f"cohort_calculation_duration_{cheap_cohort.pk}", 5)
+
+            self.assertEqual(prioritize_cohorts([expensive_cohort, cheap_cohort]), [cheap_cohort, expensive_cohort])
+
     return TestCalculateCohort
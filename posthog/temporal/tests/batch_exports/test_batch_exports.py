@@ -1,3 +1,5 @@
+import datetime as dt
+import io
 import json
 import operator
 from random import randint
@@ -5,13 +7,16 @@ from typing import TypedDict
 from uuid import uuid4
 
 import aiohttp
+import pyarrow as pa
 import pytest
 import pytest_asyncio
 from django.conf import settings
 
 from posthog.temporal.workflows.batch_exports import (
+    format_record_batch,
     get_results_iterator,
     get_rows_count,
+    write_record_batch_as_jsonl,
 )
 from posthog.temporal.workflows.clickhouse import ClickHouseClient
 
@@ -171,3 +176,39 @@ async def test_get_results_iterator(client):
         for key, value in result.items():
             # Some keys will be missing from result, so let's only check the ones we have.
             assert value == expected[key], f"{key} value in {result} didn't match value in {expected}"
+
+
+def test_write_record_batch_as_jsonl():
+    """Test records are formatted and written as one JSON object per line, without re-serializing JSON columns."""
+    batch = pa.RecordBatch.from_arrays(
+        [
+            pa.array([b"a-uuid", b'with "quotes" and \\ backslashes'], pa.binary()),
+            pa.array([b"control\x01character", "\u00fcnicode".encode("utf-8")], pa.binary()),
+            pa.array([dt.datetime(2023, 4, 20, 14, 30, 0, 123), None], pa.timestamp("us", tz="UTC")),
+            pa.array([b'{"$browser":"Chrome"}', b""], pa.binary()),
+            pa.array([None, b'{"$os": "Mac OS X"}'], pa.binary()),
+        ],
+        names=["uuid", "event", "inserted_at", "properties", "person_properties"],
+    )
+    file = io.BytesIO()
+
+    write_record_batch_as_jsonl(format_record_batch(batch), file)
+
+    lines = file.getvalue().decode("utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {
+            "uuid": "a-uuid",
+            "event": "control\x01character",
+            "inserted_at": "2023-04-20 14:30:00.000123",
+            "properties": {"$browser": "Chrome"},
+            "person_properties": None,
+        },
+        {
+            "uuid": 'with "quotes" and \\ backslashes',
+            "event": "\u00fcnicode",
+            "inserted_at": None,
+            "properties": None,
+            "person_properties": {"$os": "Mac OS X"},
+        },
+    ]
+    assert lines[0].endswith('"properties": {"$browser":"Chrome"}, "person_properties": null}')
@@ -1,19 +1,25 @@
+import copy
+import dataclasses
 import datetime as dt
 import functools
+import gzip
+import io
 import json
+import threading
 from random import randint
 from typing import Literal, TypedDict
 from unittest import mock
 from uuid import uuid4
 
 import boto3
+import pyarrow.parquet as pq
 import pytest
 from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.test import Client as HttpClient
 from django.test import override_settings
 from temporalio.common import RetryPolicy
-from temporalio.testing import WorkflowEnvironment
+from temporalio.testing import ActivityEnvironment, WorkflowEnvironment
 from temporalio.worker import UnsandboxedWorkflowRunner, Worker
 
 from ee.clickhouse.materialized_columns.columns import materialize
@@ -21,12 +27,13 @@ from posthog.api.test.test_organization import acreate_organization
 from posthog.api.test.test_team import acreate_team
 from posthog.batch_exports.service import acreate_batch_export, afetch_batch_export_runs
 from posthog.temporal.workflows.base import create_export_run, update_export_run_status
-from posthog.temporal.workflows.batch_exports import get_results_iterator
+from posthog.temporal.workflows.batch_exports import get_record_batches_iterator
 from posthog.temporal.workflows.clickhouse import ClickHouseClient
 from posthog.temporal.workflows.s3_batch_export import (
     S3BatchExportInputs,
     S3BatchExportWorkflow,
     S3InsertInputs,
+    get_sub_ranges,
     insert_into_s3_activity,
 )
 
@@ -137,7 +144,22 @@ def amaterialize(table: Literal["events", "person", "groups"], column: str):
     return materialize(table, column)
 
 
-def assert_events_in_s3(s3_client, bucket_name, key_prefix, events):
+def read_s3_data_as_json(data: bytes, file_format: str, compression: str | None) -> list[dict]:
+    """Read the records of an exported file, with JSON columns parsed as for JSONLines."""
+    if file_format == "Parquet":
+        records = pq.read_table(io.BytesIO(data)).to_pylist()
+        for record in records:
+            for column in ("properties", "person_properties"):
+                record[column] = json.loads(record[column]) if record[column] else None
+        return records
+
+    if compression == "gzip":
+        data = gzip.decompress(data)
+
+    return [json.loads(line) for line in data.decode("utf-8").split("\n") if line]
+
+
+def assert_events_in_s3(s3_client, bucket_name, key_prefix, events, file_format="JSONLines", compression=None):
     """Assert provided events written to JSON in key_prefix in S3 bucket_name."""
     # List the objects in the bucket with the prefix.
     objects = s3_client.list_objects_v2(Bucket=bucket_name, Prefix=key_prefix)
@@ -152,7 +174,7 @@ def assert_events_in_s3(s3_client, bucket_name, key_prefix, events):
     data = object["Body"].read()
 
     # Check that the data is correct.
-    json_data = [json.loads(line) for line in data.decode("utf-8").split("\n") if line]
+    json_data = read_s3_data_as_json(data, file_format, compression)
     # Pull out the fields we inserted only
 
     json_data.sort(key=lambda x: x["timestamp"])
@@ -169,7 +191,13 @@ def assert_events_in_s3(s3_client, bucket_name, key_prefix, events):
 
 @pytest.mark.django_db
 @pytest.mark.asyncio
-async def test_insert_into_s3_activity_puts_data_into_s3(bucket_name, s3_client, activity_environment):
+@pytest.mark.parametrize(
+    "file_format,compression",
+    [("JSONLines", None), ("JSONLines", "gzip"), ("Parquet", None), ("Parquet", "zstd")],
+)
+async def test_insert_into_s3_activity_puts_data_into_s3(
+    bucket_name, s3_client, activity_environment, file_format, compression
+):
     """
     Test that the insert_into_s3_activity function puts data into S3. We do not
     assume anything about the Django models, and instead just check that the
@@ -308,6 +336,9 @@ async def test_insert_into_s3_activity_puts_data_into_s3(bucket_name, s3_client,
         data_interval_end=data_interval_end,
         aws_access_key_id="object_storage_root_user",
         aws_secret_access_key="object_storage_root_password",
+        file_format=file_format,
+        compression=compression,
+        row_group_size=1000,
     )
 
     with override_settings(
@@ -316,7 +347,7 @@ async def test_insert_into_s3_activity_puts_data_into_s3(bucket_name, s3_client,
         with mock.patch("posthog.temporal.workflows.s3_batch_export.boto3.client", side_effect=create_test_client):
             await activity_environment.run(insert_into_s3_activity, insert_inputs)
 
-    assert_events_in_s3(s3_client, bucket_name, prefix, events)
+    assert_events_in_s3(s3_client, bucket_name, prefix, events, file_format, compression)
 
 
 @pytest.mark.django_db
@@ -434,6 +465,237 @@ async def test_s3_export_workflow_with_minio_bucket(client: HttpClient, s3_clien
     assert_events_in_s3(s3_client, bucket_name, prefix, events)
 
 
+@pytest.mark.django_db
+@pytest.mark.asyncio
+async def test_s3_export_workflow_with_parallelism_exports_each_sub_range(client: HttpClient, s3_client, bucket_name):
+    """Test the S3 workflow exports each sub-range of the batch window to its own file when parallelism is set."""
+    ch_client = ClickHouseClient(
+        url=settings.CLICKHOUSE_HTTP_URL,
+        user=settings.CLICKHOUSE_USER,
+        password=settings.CLICKHOUSE_PASSWORD,
+        database=settings.CLICKHOUSE_DATABASE,
+    )
+
+    prefix = f"posthog-events-{str(uuid4())}"
+    destination_data = {
+        "type": "S3",
+        "config": {
+            "bucket_name": bucket_name,
+            "region": "us-east-1",
+            "prefix": prefix,
+            "batch_window_size": 3600,
+            "aws_access_key_id": "object_storage_root_user",
+            "aws_secret_access_key": "object_storage_root_password",
+            "parallelism": 4,
+        },
+    }
+
+    organization = await acreate_organization("test")
+    team = await acreate_team(organization=organization)
+    batch_export = await acreate_batch_export(
+        team_id=team.pk,
+        name="my-production-s3-bucket-destination",
+        destination_data=destination_data,
+        interval="hour",
+    )
+
+    # One event in each 15 minute sub-range.
+    events: list[EventValues] = [
+        {
+            "uuid": str(uuid4()),
+            "event": "test",
+            "timestamp": f"2023-04-25 {time}.000000",
+            "created_at": f"2023-04-25 {time}.000000",
+            "inserted_at": f"2023-04-25 {time}.000000",
+            "_timestamp": f"2023-04-25 {time}",
+            "person_id": str(uuid4()),
+            "person_properties": {"$browser": "Chrome", "$os": "Mac OS X"},
+            "team_id": team.pk,
+            "properties": {"$browser": "Chrome", "$os": "Mac OS X"},
+            "distinct_id": str(uuid4()),
+            "elements_chain": "this is a comman, separated, list, of css selectors(?)",
+        }
+        for time in ("13:30:00", "13:50:00", "14:10:00", "14:29:00")
+    ]
+
+    await insert_events(
+        client=ch_client,
+        events=events,
+    )
+
+    inputs = S3BatchExportInputs(
+        team_id=team.pk,
+        batch_export_id=str(batch_export.id),
+        data_interval_end="2023-04-25 14:30:00.000000",
+        **batch_export.destination.config,
+    )
+
+    async with await WorkflowEnvironment.start_time_skipping() as activity_environment:
+        async with Worker(
+            activity_environment.client,
+            task_queue=settings.TEMPORAL_TASK_QUEUE,
+            workflows=[S3BatchExportWorkflow],
+            activities=[create_export_run, insert_into_s3_activity, update_export_run_status],
+            workflow_runner=UnsandboxedWorkflowRunner(),
+        ):
+            with mock.patch("posthog.temporal.workflows.s3_batch_export.boto3.client", side_effect=create_test_client):
+                await activity_environment.client.execute_workflow(
+                    S3BatchExportWorkflow.run,
+                    inputs,
+                    id=str(uuid4()),
+                    task_queue=settings.TEMPORAL_TASK_QUEUE,
+                    retry_policy=RetryPolicy(maximum_attempts=1),
+                    execution_timeout=dt.timedelta(seconds=10),
+                )
+
+    runs = await afetch_batch_export_runs(batch_export_id=batch_export.id)
+    assert len(runs) == 1
+    assert runs[0].status == "Completed"
+
+    objects = s3_client.list_objects_v2(Bucket=bucket_name, Prefix=prefix)
+    keys = sorted(object["Key"] for object in objects.get("Contents", []))
+    assert keys == [
+        f"{prefix}/2023-04-25T13:30:00-2023-04-25T13:45:00.jsonl",
+        f"{prefix}/2023-04-25T13:45:00-2023-04-25T14:00:00.jsonl",
+        f"{prefix}/2023-04-25T14:00:00-2023-04-25T14:15:00.jsonl",
+        f"{prefix}/2023-04-25T14:15:00-2023-04-25T14:30:00.jsonl",
+    ]
+
+    for key, event in zip(keys, events):
+        data = s3_client.get_object(Bucket=bucket_name, Key=key)["Body"].read()
+        assert [record["uuid"] for record in read_s3_data_as_json(data, "JSONLines", None)] == [event["uuid"]]
+
+
+def test_get_sub_ranges():
+    """Test sub-ranges cover the whole data interval without overlapping, aligned to whole seconds."""
+    start = dt.datetime(2023, 4, 25, 13, 30)
+    end = dt.datetime(2023, 4, 25, 14, 30)
+
+    assert get_sub_ranges(start, end, 1) == [(start, end)]
+    assert get_sub_ranges(start, end, 3) == [
+        (start, dt.datetime(2023, 4, 25, 13, 50)),
+        (dt.datetime(2023, 4, 25, 13, 50), dt.datetime(2023, 4, 25, 14, 10)),
+        (dt.datetime(2023, 4, 25, 14, 10), end),
+    ]
+
+    sub_ranges = get_sub_ranges(start, end, 7)
+    assert len(sub_ranges) == 7
+    assert sub_ranges[0][0] == start and sub_ranges[-1][1] == end
+    assert all(previous[1] == current[0] for previous, current in zip(sub_ranges, sub_ranges[1:]))
+    assert all(sub_range_start.microsecond == 0 for sub_range_start, _ in sub_ranges)
+
+    # Intervals that are too short to split are split into fewer sub-ranges.
+    assert get_sub_ranges(start, start + dt.timedelta(seconds=2), 5) == [
+        (start, start + dt.timedelta(seconds=1)),
+        (start + dt.timedelta(seconds=1), start + dt.timedelta(seconds=2)),
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.asyncio
+async def test_insert_into_s3_activity_resumes_after_parts_complete_out_of_order(
+    bucket_name, s3_client, activity_environment
+):
+    """Test parts are only heartbeated once all the parts before them are uploaded, and that the
+    export resumes from those heartbeat details when completing the upload fails."""
+    team_id = randint(1, 1000000)
+
+    client = ClickHouseClient(
+        url=settings.CLICKHOUSE_HTTP_URL,
+        user=settings.CLICKHOUSE_USER,
+        password=settings.CLICKHOUSE_PASSWORD,
+        database=settings.CLICKHOUSE_DATABASE,
+    )
+
+    # Enough events for two parts, as the minimum part chunk size is 5MB.
+    events: list[EventValues] = [
+        {
+            "uuid": str(uuid4()),
+            "event": "test",
+            "_timestamp": "2023-04-20 14:30:00",
+            "timestamp": f"2023-04-20 14:30:{i // 1000:02d}.{i:06d}",
+            "inserted_at": f"2023-04-20 14:30:{i // 1000:02d}.{i:06d}",
+            "created_at": "2023-04-20 14:30:00.000000",
+            "distinct_id": str(uuid4()),
+            "person_id": str(uuid4()),
+            "person_properties": {"$browser": "Chrome", "$os": "Mac OS X"},
+            "team_id": team_id,
+            "properties": {"$browser": "Chrome", "$os": "Mac OS X"},
+            "elements_chain": "this that and the other",
+        }
+        for i in range(10000)
+    ]
+    await insert_events(client=client, events=events)
+
+    prefix = str(uuid4())
+    insert_inputs = S3InsertInputs(
+        bucket_name=bucket_name,
+        region="us-east-1",
+        prefix=prefix,
+        team_id=team_id,
+        data_interval_start="2023-04-20 14:00:00",
+        data_interval_end="2023-04-20 15:00:00",
+        aws_access_key_id="object_storage_root_user",
+        aws_secret_access_key="object_storage_root_password",
+    )
+
+    second_part_uploaded = threading.Event()
+
+    def create_out_of_order_client(*args, **kwargs):
+        """A client which uploads the first part only once the second one is done, and fails to complete."""
+        s3_client = create_test_client(*args, **kwargs)
+        upload_part = s3_client.upload_part
+
+        def out_of_order_upload_part(**kwargs):
+            if kwargs["PartNumber"] == 1:
+                assert second_part_uploaded.wait(timeout=10)
+            response = upload_part(**kwargs)
+            if kwargs["PartNumber"] == 2:
+                second_part_uploaded.set()
+            return response
+
+        def fail_to_complete_multipart_upload(**kwargs):
+            raise ConnectionError("Failed to complete the multipart upload")
+
+        s3_client.upload_part = out_of_order_upload_part
+        s3_client.complete_multipart_upload = fail_to_complete_multipart_upload
+        return s3_client
+
+    heartbeats = []
+    activity_environment.on_heartbeat = lambda *details: heartbeats.append(copy.deepcopy(details))
+
+    with override_settings(BATCH_EXPORT_S3_UPLOAD_CHUNK_SIZE_BYTES=5 * 1024**2):
+        with mock.patch(
+            "posthog.temporal.workflows.s3_batch_export.boto3.client", side_effect=create_out_of_order_client
+        ):
+            with pytest.raises(ConnectionError):
+                await activity_environment.run(insert_into_s3_activity, insert_inputs)
+
+    # Nothing is heartbeated while only the second part is uploaded, and then both parts at once
+    assert heartbeats
+    assert all(last_uploaded_part_timestamp is not None for last_uploaded_part_timestamp, *_ in heartbeats)
+    assert [part["PartNumber"] for part in heartbeats[0][2]][:2] == [1, 2]
+    _, _, parts, next_part_number = heartbeats[-1]
+    assert next_part_number == len(parts) + 1
+
+    resumed_activity_environment = ActivityEnvironment()
+    resumed_activity_environment.info = dataclasses.replace(
+        resumed_activity_environment.info, heartbeat_details=heartbeats[-1]
+    )
+
+    with override_settings(BATCH_EXPORT_S3_UPLOAD_CHUNK_SIZE_BYTES=5 * 1024**2):
+        with mock.patch("posthog.temporal.workflows.s3_batch_export.boto3.client", side_effect=create_test_client):
+            await resumed_activity_environment.run(insert_into_s3_activity, insert_inputs)
+
+    objects = s3_client.list_objects_v2(Bucket=bucket_name, Prefix=prefix)
+    assert len(objects.get("Contents", [])) == 1
+    data = s3_client.get_object(Bucket=bucket_name, Key=objects["Contents"][0]["Key"])["Body"].read()
+    # Resuming exports the rows of the last recorded second again, but nothing is missing
+    assert {record["uuid"] for record in read_s3_data_as_json(data, "JSONLines", None)} == {
+        event["uuid"] for event in events
+    }
+
+
 @pytest.mark.django_db
 @pytest.mark.asyncio
 async def test_s3_export_workflow_with_minio_bucket_and_a_lot_of_data(client: HttpClient, s3_client, bucket_name):
@@ -848,15 +1110,15 @@ async def test_s3_export_workflow_continues_on_json_decode_error(client: HttpCli
     )
     error_raised = False
 
-    def fake_get_results_iterator(*args, **kwargs):
+    def fake_get_record_batches_iterator(*args, **kwargs):
         nonlocal error_raised
 
-        for result in get_results_iterator(*args, **kwargs):
+        for batch in get_record_batches_iterator(*args, **kwargs):
             if error_raised is False:
                 error_raised = True
                 raise json.JSONDecodeError("Test error", "A ClickHouse error message\n", 0)
 
-            yield result
+            yield batch
 
     async with await WorkflowEnvironment.start_time_skipping() as activity_environment:
         async with Worker(
@@ -868,8 +1130,8 @@ async def test_s3_export_workflow_continues_on_json_decode_error(client: HttpCli
         ):
             with mock.patch("posthog.temporal.workflows.s3_batch_export.boto3.client", side_effect=create_test_client):
                 with mock.patch(
-                    "posthog.temporal.workflows.s3_batch_export.get_results_iterator",
-                    side_effect=fake_get_results_iterator,
+                    "posthog.temporal.workflows.s3_batch_export.get_record_batches_iterator",
+                    side_effect=fake_get_record_batches_iterator,
                 ) as mocked_iterator:
                     await activity_environment.client.execute_workflow(
                         S3BatchExportWorkflow.run,
@@ -990,14 +1252,17 @@ async def test_s3_export_workflow_continues_on_multiple_json_decode_error(client
     def should_fail(event):
         return bool(int(event["event"]) % 2)
 
-    def fake_get_results_iterator(*args, **kwargs):
-        for result in get_results_iterator(*args, **kwargs):
-            if result["event"] not in failed_events and should_fail(result):
-                # Will raise an exception every other row.
-                failed_events.add(result["event"])  # Otherwise we infinite loop
-                raise json.JSONDecodeError("Test error", "A ClickHouse error message\n", 0)
+    def fake_get_record_batches_iterator(*args, **kwargs):
+        for batch in get_record_batches_iterator(*args, **kwargs):
+            # Yield one row at a time, so that we can fail on specific rows.
+            for index in range(batch.num_rows):
+                result = batch.slice(index, 1).to_pylist()[0]
+                if result["event"] not in failed_events and should_fail(result):
+                    # Will raise an exception every other row.
+                    failed_events.add(result["event"])  # Otherwise we infinite loop
+                    raise json.JSONDecodeError("Test error", "A ClickHouse error message\n", 0)
 
-            yield result
+                yield batch.slice(index, 1)
 
     async with await WorkflowEnvironment.start_time_skipping() as activity_environment:
         async with Worker(
@@ -1009,8 +1274,8 @@ async def test_s3_export_workflow_continues_on_multiple_json_decode_error(client
         ):
             with mock.patch("posthog.temporal.workflows.s3_batch_export.boto3.client", side_effect=create_test_client):
                 with mock.patch(
-                    "posthog.temporal.workflows.s3_batch_export.get_results_iterator",
-                    side_effect=fake_get_results_iterator,
+                    "posthog.temporal.workflows.s3_batch_export.get_record_batches_iterator",
+                    side_effect=fake_get_record_batches_iterator,
                 ) as mocked_iterator:
                     await activity_environment.client.execute_workflow(
                         S3BatchExportWorkflow.run,
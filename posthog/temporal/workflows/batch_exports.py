@@ -3,6 +3,9 @@ import typing
 from datetime import datetime
 from string import Template
 
+import pyarrow as pa
+import pyarrow.compute as pc
+
 SELECT_QUERY_TEMPLATE = Template(
     """
     SELECT $fields
@@ -21,6 +24,9 @@ SELECT_QUERY_TEMPLATE = Template(
     """
 )
 
+# Columns that ClickHouse stores as `String`s, but that hold JSON objects.
+JSON_COLUMNS = ("properties", "person_properties")
+
 
 async def get_rows_count(client, team_id: int, interval_start: str, interval_end: str):
     data_interval_start_ch = datetime.fromisoformat(interval_start).strftime("%Y-%m-%d %H:%M:%S")
@@ -41,22 +47,27 @@ async def get_rows_count(client, team_id: int, interval_start: str, interval_end
     return int(count)
 
 
-def get_results_iterator(
+def get_record_batches_iterator(
     client, team_id: int, interval_start: str, interval_end: str
-) -> typing.Generator[dict[str, typing.Any], None, None]:
+) -> typing.Generator[pa.RecordBatch, None, None]:
+    """Stream the events to export as Arrow record batches, already formatted for exporting.
+
+    All the formatting is done with vectorized Arrow compute kernels, one column at a time. See
+    `format_record_batch` for details.
+    """
     data_interval_start_ch = datetime.fromisoformat(interval_start).strftime("%Y-%m-%d %H:%M:%S")
     data_interval_end_ch = datetime.fromisoformat(interval_end).strftime("%Y-%m-%d %H:%M:%S")
     query = SELECT_QUERY_TEMPLATE.substitute(
         fields="""
                     toString(uuid) as uuid,
-                    timestamp,
-                    inserted_at,
-                    created_at,
-                    event,
-                    properties,
                     -- Point in time identity fields
                     toString(distinct_id) as distinct_id,
                     toString(person_id) as person_id,
+                    event,
+                    inserted_at,
+                    created_at,
+                    timestamp,
+                    properties,
                     person_properties,
                     -- Autocapture fields
                     elements_chain
@@ -73,24 +84,79 @@ def get_results_iterator(
             "data_interval_end": data_interval_end_ch,
         },
     ):
-        # Make sure to parse `properties` and
-        # `person_properties` are parsed as JSON to `dict`s. In ClickHouse they
-        # are stored as `String`s.
+        yield format_record_batch(batch)
+
+
+def format_record_batch(batch: pa.RecordBatch) -> pa.RecordBatch:
+    """Format a record batch as returned by ClickHouse into the types we export.
+
+    ClickHouse `String`s are sent as Arrow binary, so we cast them to (UTF-8) strings, and timestamps are
+    formatted as strings with microsecond precision. The `JSON_COLUMNS` are left as strings: they are
+    already JSON, so destinations can either write them as they are or parse them if they need to.
+    """
+    columns = []
+    for field, column in zip(batch.schema, batch.columns):
+        if pa.types.is_timestamp(field.type):
+            # Casting to microseconds first makes '%S' include 6 fractional digits.
+            column = pc.strftime(column.cast(pa.timestamp("us", tz=field.type.tz)), format="%Y-%m-%d %H:%M:%S")
+        elif pa.types.is_binary(field.type) or pa.types.is_large_binary(field.type):
+            column = column.cast(pa.string())
+        columns.append(column)
+
+    return pa.RecordBatch.from_arrays(columns, names=batch.schema.names)
+
+
+def get_results_iterator(
+    client, team_id: int, interval_start: str, interval_end: str
+) -> typing.Generator[dict[str, typing.Any], None, None]:
+    """Stream the events to export one at a time, as `dict`s.
+
+    This is only needed by destinations that require row-wise processing, prefer `get_record_batches_iterator`.
+    """
+    for batch in get_record_batches_iterator(client, team_id, interval_start, interval_end):
         for record in batch.to_pylist():
-            properties = record.get("properties")
-            person_properties = record.get("person_properties")
-
-            yield {
-                "uuid": record.get("uuid").decode(),
-                "distinct_id": record.get("distinct_id").decode(),
-                "person_id": record.get("person_id").decode(),
-                "event": record.get("event").decode(),
-                "inserted_at": record.get("inserted_at").strftime("%Y-%m-%d %H:%M:%S.%f")
-                if record.get("inserted_at")
-                else None,
-                "created_at": record.get("created_at").strftime("%Y-%m-%d %H:%M:%S.%f"),
-                "timestamp": record.get("timestamp").strftime("%Y-%m-%d %H:%M:%S.%f"),
-                "properties": json.loads(properties) if properties else None,
-                "person_properties": json.loads(person_properties) if person_properties else None,
-                "elements_chain": record.get("elements_chain").decode(),
-            }
+            # Make sure `properties` and `person_properties` are parsed as JSON to `dict`s.
+            # In ClickHouse they are stored as `String`s.
+            for column in JSON_COLUMNS:
+                value = record.get(column)
+                record[column] = json.loads(value) if value else None
+
+            yield record
+
+
+def _json_encode_strings(column: pa.Array) -> pa.Array:
+    """JSON-encode each value of a string column, leaving nulls as nulls."""
+    if pc.any(pc.match_substring_regex(column, r"[\x00-\x1f]")).as_py():
+        # Escaping control characters is not worth doing with Arrow kernels, as it's very rare.
+        return pa.array([None if value is None else json.dumps(value) for value in column.to_pylist()], pa.string())
+
+    escaped = pc.replace_substring(pc.replace_substring(column, "\\", "\\\\"), '"', '\\"')
+    return pc.binary_join_element_wise('"', escaped, '"', "")
+
+
+def write_record_batch_as_jsonl(batch: pa.RecordBatch, file: typing.IO[bytes]) -> None:
+    """Write a record batch as returned by `get_record_batches_iterator` to a file, one JSON object per line.
+
+    Lines are built one column at a time with Arrow compute kernels and written out straight from the
+    resulting Arrow buffer. `JSON_COLUMNS` are written as they are, without parsing and re-serializing them.
+    """
+    if batch.num_rows == 0:
+        return
+
+    fields = []
+    for name, column in zip(batch.schema.names, batch.columns):
+        if name in JSON_COLUMNS:
+            value = pc.if_else(pc.equal(column, ""), None, column)
+        elif pa.types.is_string(column.type):
+            value = _json_encode_strings(column)
+        else:
+            value = pa.array([json.dumps(value) for value in column.to_pylist()], pa.string())
+
+        fields.append(pc.binary_join_element_wise(json.dumps(name) + ": ", pc.fill_null(value, "null"), ""))
+
+    lines = pc.binary_join_element_wise("{", pc.binary_join_element_wise(*fields, ", "), "}\n", "")
+
+    # The values of a string array are stored back to back in a single buffer, so that's the whole file chunk.
+    _, offsets_buffer, data_buffer = lines.buffers()
+    offsets = pa.Array.from_buffers(pa.int32(), len(lines) + 1, [None, offsets_buffer], offset=lines.offset)
+    file.write(data_buffer[offsets[0].as_py() : offsets[-1].as_py()])
@@ -2,10 +2,12 @@ import asyncio
 import datetime as dt
 import json
 import tempfile
-from dataclasses import dataclass
-from typing import TYPE_CHECKING, List
+from dataclasses import dataclass, replace
+from typing import IO, TYPE_CHECKING, List
 
 import boto3
+import pyarrow as pa
+import pyarrow.parquet as pq
 from django.conf import settings
 from temporalio import activity, workflow
 from temporalio.common import RetryPolicy
@@ -19,8 +21,9 @@ from posthog.temporal.workflows.base import (
     update_export_run_status,
 )
 from posthog.temporal.workflows.batch_exports import (
-    get_results_iterator,
+    get_record_batches_iterator,
     get_rows_count,
+    write_record_batch_as_jsonl,
 )
 from posthog.temporal.workflows.clickhouse import get_client
 
@@ -44,6 +47,144 @@ def get_allowed_template_variables(inputs) -> dict[str, str]:
     }
 
 
+# Compression codecs supported by each file format. The first one is the default.
+SUPPORTED_COMPRESSIONS: dict[str, tuple[str | None, ...]] = {
+    "JSONLines": (None, "gzip"),
+    "Parquet": ("snappy", "zstd", "gzip", "brotli", "lz4", "none"),
+}
+
+FILE_EXTENSIONS = {"JSONLines": "jsonl", "Parquet": "parquet"}
+COMPRESSION_EXTENSIONS = {"gzip": "gz"}
+
+
+def get_s3_key(inputs) -> str:
+    """Return the S3 key to export to, including the extension for the file format and compression."""
+    template_variables = get_allowed_template_variables(inputs)
+    key_prefix = inputs.prefix.format(**template_variables)
+    extension = FILE_EXTENSIONS[inputs.file_format]
+
+    if inputs.file_format == "JSONLines" and inputs.compression is not None:
+        extension = f"{extension}.{COMPRESSION_EXTENSIONS[inputs.compression]}"
+
+    if inputs.sub_range_start is not None and inputs.sub_range_end is not None:
+        return f"{key_prefix}/{inputs.sub_range_start}-{inputs.sub_range_end}.{extension}"
+
+    return f"{key_prefix}/{inputs.data_interval_start}-{inputs.data_interval_end}.{extension}"
+
+
+class UploadBuffer:
+    """A local file to buffer the parts of a multipart upload.
+
+    Writers like Parquet's record the offsets of what they write, so `tell` returns all the bytes written
+    since creation, even though a new file is started every time a part is taken to be uploaded.
+    """
+
+    def __init__(self):
+        self._file = tempfile.TemporaryFile()
+        self.bytes_total = 0
+        # Writers close their sink when they are done, but we still have to upload the last part.
+        self.closed = False
+
+    def write(self, data) -> int:
+        written = self._file.write(data)
+        self.bytes_total += written
+        return written
+
+    def tell(self) -> int:
+        return self.bytes_total
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def writable(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        self.closed = True
+
+    @property
+    def bytes_since_reset(self) -> int:
+        return self._file.tell()
+
+    def take_part(self) -> IO[bytes]:
+        """Return a file with everything written since the last part, ready to upload, and start a new one.
+
+        Closing the returned file is up to the caller, once the part is uploaded.
+        """
+        part_file = self._file
+        part_file.seek(0)
+        self._file = tempfile.TemporaryFile()
+        return part_file
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self._file.close()
+
+
+class RecordBatchWriter:
+    """Write Arrow record batches to an UploadBuffer in one of the SUPPORTED_COMPRESSIONS formats.
+
+    Parquet row groups are accumulated in memory until they reach `row_group_size` rows, so memory usage is
+    bounded by one row group regardless of how many rows are exported.
+    """
+
+    def __init__(self, buffer: UploadBuffer, file_format: str, compression: str | None, row_group_size: int):
+        self.buffer = buffer
+        self.file_format = file_format
+        self.compression = compression
+        self.row_group_size = row_group_size
+
+        self._jsonl_sink: UploadBuffer | pa.CompressedOutputStream | None = None
+        self._parquet_writer: pq.ParquetWriter | None = None
+        self._row_group: list[pa.RecordBatch] = []
+        self._row_group_rows = 0
+
+    def write(self, batch: pa.RecordBatch) -> None:
+        if self.file_format == "JSONLines":
+            if self._jsonl_sink is None:
+                self._jsonl_sink = (
+                    self.buffer
+                    if self.compression is None
+                    else pa.CompressedOutputStream(self.buffer, self.compression)
+                )
+            write_record_batch_as_jsonl(batch, self._jsonl_sink)
+            return
+
+        self._row_group.append(batch)
+        self._row_group_rows += batch.num_rows
+        if self._row_group_rows >= self.row_group_size:
+            self._flush_row_groups(final=False)
+
+    def _flush_row_groups(self, final: bool) -> None:
+        """Write out all complete row groups, or everything pending if this is the `final` flush."""
+        if not self._row_group:
+            return
+
+        table = pa.Table.from_batches(self._row_group)
+        rows_to_write = table.num_rows if final else table.num_rows - table.num_rows % self.row_group_size
+
+        if self._parquet_writer is None:
+            self._parquet_writer = pq.ParquetWriter(self.buffer, table.schema, compression=self.compression)
+        self._parquet_writer.write_table(table.slice(0, rows_to_write), row_group_size=self.row_group_size)
+
+        remainder = table.slice(rows_to_write)
+        self._row_group = remainder.to_batches()
+        self._row_group_rows = remainder.num_rows
+
+    def close(self) -> None:
+        """Write out anything still pending, like the last row group and the Parquet footer."""
+        if self.file_format == "JSONLines":
+            if isinstance(self._jsonl_sink, pa.CompressedOutputStream):
+                self._jsonl_sink.close()
+            return
+
+        self._flush_row_groups(final=True)
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
 @dataclass
 class S3InsertInputs:
     """Inputs for S3 exports."""
@@ -60,20 +201,37 @@ class S3InsertInputs:
     data_interval_end: str
     aws_access_key_id: str | None = None
     aws_secret_access_key: str | None = None
+    file_format: str = "JSONLines"
+    compression: str | None = None
+    row_group_size: int | None = None
+    # When the workflow splits the data interval to export it in parallel, the part of it to export.
+    sub_range_start: str | None = None
+    sub_range_end: str | None = None
 
 
 @activity.defn
 async def insert_into_s3_activity(inputs: S3InsertInputs):
     """
-    Activity streams data from ClickHouse to S3. It currently only creates a
-    single file per run, and uploads as a multipart upload.
+    Activity streams data from ClickHouse to S3. It creates a single file per
+    run (or per sub-range, when the workflow splits the interval to export it in
+    parallel), and uploads it as a multipart upload. The file is written as JSON
+    lines (optionally gzipped) or Parquet, see SUPPORTED_COMPRESSIONS.
 
-    TODO: this implementation currently tries to export as one run, but it could
-    be a very big date range and time consuming, better to split into multiple
-    runs, timing out after say 30 seconds or something and upload multiple
-    files.
+    Parts are uploaded concurrently while we keep reading from ClickHouse, with at
+    most BATCH_EXPORT_S3_MAX_CONCURRENT_UPLOADS parts in flight at a time.
     """
-    activity.logger.info("Running S3 export batch %s - %s", inputs.data_interval_start, inputs.data_interval_end)
+    query_interval_start = inputs.sub_range_start or inputs.data_interval_start
+    query_interval_end = inputs.sub_range_end or inputs.data_interval_end
+    activity.logger.info("Running S3 export batch %s - %s", query_interval_start, query_interval_end)
+
+    if inputs.file_format not in SUPPORTED_COMPRESSIONS:
+        raise ValueError(f"Unsupported file format for S3 batch exports: '{inputs.file_format}'")
+
+    compression = inputs.compression
+    if compression is None:
+        compression = SUPPORTED_COMPRESSIONS[inputs.file_format][0]
+    if compression not in SUPPORTED_COMPRESSIONS[inputs.file_format]:
+        raise ValueError(f"Unsupported compression for {inputs.file_format} S3 batch exports: '{compression}'")
 
     async with get_client() as client:
         if not await client.is_alive():
@@ -82,15 +240,15 @@ async def insert_into_s3_activity(inputs: S3InsertInputs):
         count = await get_rows_count(
             client=client,
             team_id=inputs.team_id,
-            interval_start=inputs.data_interval_start,
-            interval_end=inputs.data_interval_end,
+            interval_start=query_interval_start,
+            interval_end=query_interval_end,
         )
 
         if count == 0:
             activity.logger.info(
                 "Nothing to export in batch %s - %s. Exiting.",
-                inputs.data_interval_start,
-                inputs.data_interval_end,
+                query_interval_start,
+                query_interval_end,
                 count,
             )
             return
@@ -98,9 +256,7 @@ async def insert_into_s3_activity(inputs: S3InsertInputs):
         activity.logger.info("BatchExporting %s rows to S3", count)
 
         # Create a multipart upload to S3
-        template_variables = get_allowed_template_variables(inputs)
-        key_prefix = inputs.prefix.format(**template_variables)
-        key = f"{key_prefix}/{inputs.data_interval_start}-{inputs.data_interval_end}.jsonl"
+        key = get_s3_key(inputs)
         s3_client = boto3.client(
             "s3",
             region_name=inputs.region,
@@ -111,31 +267,97 @@ async def insert_into_s3_activity(inputs: S3InsertInputs):
 
         parts: List[CompletedPartTypeDef] = []
 
-        if len(details) == 4:
+        # Only plain JSON lines can be appended to across attempts: compressed streams and Parquet files
+        # would have to be continued from the middle, so those exports start over instead.
+        can_resume = inputs.file_format == "JSONLines" and compression is None
+
+        if len(details) == 4 and can_resume:
             interval_start, upload_id, parts, part_number = details
             activity.logger.info(f"Received details from previous activity. Export will resume from {interval_start}")
 
         else:
+            if len(details) >= 2:
+                activity.logger.info("Received details from previous activity, but export can't resume. Restarting.")
+                try:
+                    s3_client.abort_multipart_upload(Bucket=inputs.bucket_name, Key=key, UploadId=details[1])
+                except s3_client.exceptions.NoSuchUpload:
+                    pass
+
             multipart_response = s3_client.create_multipart_upload(Bucket=inputs.bucket_name, Key=key)
             upload_id = multipart_response["UploadId"]
-            interval_start = inputs.data_interval_start
+            interval_start = query_interval_start
             part_number = 1
 
         # Iterate through chunks of results from ClickHouse and push them to S3
         # as a multipart upload. The intention here is to keep memory usage low,
         # even if the entire results set is large. We receive results from
-        # ClickHouse, write them to a local file, and then upload the file to S3
-        # when it reaches 50MB in size.
+        # ClickHouse as Arrow record batches, write them to a local file, and then
+        # upload the file to S3 when it reaches 50MB in size.
 
-        results_iterator = get_results_iterator(
+        results_iterator = get_record_batches_iterator(
             client=client,
             team_id=inputs.team_id,
             interval_start=interval_start,
-            interval_end=inputs.data_interval_end,
+            interval_end=query_interval_end,
         )
 
-        result = None
-        last_uploaded_part_timestamp = None
+        last_written_inserted_at = None
+        # Where to resume from when no part has been recorded yet: the start of this attempt
+        last_uploaded_part_timestamp = interval_start
+
+        # Parts can finish uploading in any order, so we only record (and heartbeat) the parts that have
+        # been uploaded contiguously from the start. Resuming never skips a part that was still in flight.
+        next_part_number_to_record = part_number
+        uploaded_parts: dict[int, tuple[CompletedPartTypeDef, str | None]] = {}
+        uploads_in_flight = asyncio.Semaphore(settings.BATCH_EXPORT_S3_MAX_CONCURRENT_UPLOADS)
+        upload_tasks: list[asyncio.Task] = []
+
+        async def upload_part(part_file: IO[bytes], part_number: int, inserted_at: str | None):
+            nonlocal last_uploaded_part_timestamp, next_part_number_to_record
+
+            try:
+                response = await asyncio.to_thread(
+                    s3_client.upload_part,
+                    Bucket=inputs.bucket_name,
+                    Key=key,
+                    PartNumber=part_number,
+                    UploadId=upload_id,
+                    Body=part_file,
+                )
+            finally:
+                part_file.close()
+                uploads_in_flight.release()
+
+            # Record the ETag for the part
+            uploaded_parts[part_number] = ({"PartNumber": part_number, "ETag": response["ETag"]}, inserted_at)
+
+            if next_part_number_to_record not in uploaded_parts:
+                # Waiting on an earlier part, there's nothing new to record
+                return
+
+            while next_part_number_to_record in uploaded_parts:
+                part, inserted_at = uploaded_parts.pop(next_part_number_to_record)
+                parts.append(part)
+                next_part_number_to_record += 1
+                if inserted_at is not None:
+                    last_uploaded_part_timestamp = inserted_at
+
+            activity.heartbeat(last_uploaded_part_timestamp, upload_id, parts, next_part_number_to_record)
+
+        async def start_part_upload(local_results_file: UploadBuffer):
+            nonlocal part_number
+
+            # Surface failed uploads as soon as possible, instead of when the export is done.
+            for task in upload_tasks:
+                if task.done():
+                    task.result()
+
+            await uploads_in_flight.acquire()
+            activity.logger.info("Uploading part %s", part_number)
+            upload_tasks.append(
+                asyncio.create_task(upload_part(local_results_file.take_part(), part_number, last_written_inserted_at))
+            )
+            part_number += 1
 
         async def worker_shutdown_handler():
             """Handle the Worker shutting down by heart-beating our latest status."""
@@ -143,88 +365,72 @@ async def insert_into_s3_activity(inputs: S3InsertInputs):
             activity.logger.warn(
                 f"Worker shutting down! Reporting back latest exported part {last_uploaded_part_timestamp}"
             )
-            activity.heartbeat(last_uploaded_part_timestamp, upload_id)
+            activity.heartbeat(last_uploaded_part_timestamp, upload_id, parts, next_part_number_to_record)
 
         asyncio.create_task(worker_shutdown_handler())
 
-        with tempfile.NamedTemporaryFile() as local_results_file:
-            while True:
-                try:
-                    result = results_iterator.__next__()
-                except StopIteration:
-                    break
-                except json.JSONDecodeError:
-                    # This is raised by aiochclient as we try to decode an error message from ClickHouse.
-                    # So far, this error message only indicated that we were too slow consuming rows.
-                    # So, we can resume from the last result.
-                    if result is None:
-                        # We failed right at the beginning
-                        new_interval_start = None
-                    else:
-                        new_interval_start = result.get("inserted_at", None)
-
-                    if not isinstance(new_interval_start, str):
-                        new_interval_start = inputs.data_interval_start
-
-                    activity.logger.warn(
-                        f"Failed to decode a JSON value while iterating, potentially due to a ClickHouse error. Resuming from {new_interval_start}"
-                    )
-
-                    results_iterator = get_results_iterator(
-                        client=client,
-                        team_id=inputs.team_id,
-                        interval_start=new_interval_start,  # This means we'll generate at least one duplicate.
-                        interval_end=inputs.data_interval_end,
-                    )
-                    continue
-
-                if not result:
-                    break
-
-                # Write the results to a local file
-                local_results_file.write(json.dumps(result).encode("utf-8"))
-                local_results_file.write("\n".encode("utf-8"))
-
-                # Write results to S3 when the file reaches 50MB and reset the
-                # file, or if there is nothing else to write.
-                if (
-                    local_results_file.tell()
-                    and local_results_file.tell() > settings.BATCH_EXPORT_S3_UPLOAD_CHUNK_SIZE_BYTES
-                ):
-                    activity.logger.info("Uploading part %s", part_number)
-
-                    local_results_file.seek(0)
-                    response = s3_client.upload_part(
-                        Bucket=inputs.bucket_name,
-                        Key=key,
-                        PartNumber=part_number,
-                        UploadId=upload_id,
-                        Body=local_results_file,
-                    )
-                    last_uploaded_part_timestamp = result["inserted_at"]
-                    # Record the ETag for the part
-                    parts.append({"PartNumber": part_number, "ETag": response["ETag"]})
-                    part_number += 1
-
-                    activity.heartbeat(last_uploaded_part_timestamp, upload_id, parts, part_number)
-
-                    # Reset the file
-                    local_results_file.seek(0)
-                    local_results_file.truncate()
-
-            # Upload the last part
-            local_results_file.seek(0)
-            response = s3_client.upload_part(
-                Bucket=inputs.bucket_name,
-                Key=key,
-                PartNumber=part_number,
-                UploadId=upload_id,
-                Body=local_results_file,
+        with UploadBuffer() as local_results_file:
+            writer = RecordBatchWriter(
+                local_results_file,
+                file_format=inputs.file_format,
+                compression=compression,
+                row_group_size=inputs.row_group_size or settings.BATCH_EXPORT_S3_PARQUET_ROW_GROUP_SIZE,
             )
-            activity.heartbeat(last_uploaded_part_timestamp, upload_id, parts, part_number)
 
-            # Record the ETag for the last part
-            parts.append({"PartNumber": part_number, "ETag": response["ETag"]})
+            try:
+                while True:
+                    try:
+                        # Reading from ClickHouse blocks, so do it in a thread to let uploads (and other
+                        # sub-ranges of the same export running in this worker) make progress meanwhile.
+                        batch = await asyncio.to_thread(next, results_iterator, None)
+                    except json.JSONDecodeError:
+                        # This is raised by aiochclient as we try to decode an error message from ClickHouse.
+                        # So far, this error message only indicated that we were too slow consuming rows.
+                        # So, we can resume from the last result.
+                        new_interval_start = last_written_inserted_at
+
+                        if not isinstance(new_interval_start, str):
+                            # We failed right at the beginning
+                            new_interval_start = query_interval_start
+
+                        activity.logger.warn(
+                            f"Failed to decode a JSON value while iterating, potentially due to a ClickHouse error. Resuming from {new_interval_start}"
+                        )
+
+                        results_iterator = get_record_batches_iterator(
+                            client=client,
+                            team_id=inputs.team_id,
+                            interval_start=new_interval_start,  # This means we'll generate at least one duplicate.
+                            interval_end=query_interval_end,
+                        )
+                        continue
+
+                    if batch is None:
+                        break
+
+                    if batch.num_rows == 0:
+                        continue
+
+                    # Write the results to a local file
+                    writer.write(batch)
+                    # Results are ordered by inserted_at, so the last row is where we'd resume from.
+                    last_written_inserted_at = batch.column("inserted_at")[-1].as_py()
+
+                    # Write results to S3 when the file reaches 50MB and start a new
+                    # file, or if there is nothing else to write.
+                    if local_results_file.bytes_since_reset > settings.BATCH_EXPORT_S3_UPLOAD_CHUNK_SIZE_BYTES:
+                        await start_part_upload(local_results_file)
+
+                # Write out anything the writer still holds, like the Parquet footer, and upload the last part
+                writer.close()
+                await start_part_upload(local_results_file)
+                await asyncio.gather(*upload_tasks)
+            except BaseException:
+                # Don't leave uploads running (and holding on to their part files) once the export has failed
+                for task in upload_tasks:
+                    task.cancel()
+                await asyncio.gather(*upload_tasks, return_exceptions=True)
+                raise
 
         # Complete the multipart upload
         s3_client.complete_multipart_upload(
@@ -286,19 +492,41 @@ class S3BatchExportWorkflow(PostHogWorkflow):
             aws_secret_access_key=inputs.aws_secret_access_key,
             data_interval_start=data_interval_start.isoformat(),
             data_interval_end=data_interval_end.isoformat(),
+            file_format=inputs.file_format,
+            compression=inputs.compression,
+            row_group_size=inputs.row_group_size,
         )
+        if inputs.parallelism > 1:
+            # Each sub-range is exported to its own file by its own activity, so that each one can retry
+            # and resume from its heartbeat details independently of the others.
+            sub_ranges_inputs = [
+                replace(
+                    insert_inputs, sub_range_start=sub_range_start.isoformat(), sub_range_end=sub_range_end.isoformat()
+                )
+                for sub_range_start, sub_range_end in get_sub_ranges(
+                    data_interval_start, data_interval_end, inputs.parallelism
+                )
+            ]
+        else:
+            sub_ranges_inputs = [insert_inputs]
+
         try:
-            await workflow.execute_activity(
-                insert_into_s3_activity,
-                insert_inputs,
-                start_to_close_timeout=dt.timedelta(minutes=10),
-                retry_policy=RetryPolicy(
-                    maximum_attempts=6,
-                    non_retryable_error_types=[
-                        # Validation failed, and will keep failing.
-                        "ValueError",
-                    ],
-                ),
+            await asyncio.gather(
+                *(
+                    workflow.execute_activity(
+                        insert_into_s3_activity,
+                        sub_range_inputs,
+                        start_to_close_timeout=dt.timedelta(minutes=10),
+                        retry_policy=RetryPolicy(
+                            maximum_attempts=6,
+                            non_retryable_error_types=[
+                                # Validation failed, and will keep failing.
+                                "ValueError",
+                            ],
+                        ),
+                    )
+                    for sub_range_inputs in sub_ranges_inputs
+                )
             )
 
         except Exception as e:
@@ -320,6 +548,29 @@ class S3BatchExportWorkflow(PostHogWorkflow):
             )
 
 
+def get_sub_ranges(
+    data_interval_start: dt.datetime, data_interval_end: dt.datetime, count: int
+) -> list[tuple[dt.datetime, dt.datetime]]:
+    """Split a data interval into `count` contiguous sub-ranges of (about) the same size.
+
+    Sub-ranges are aligned to whole seconds, so there may be fewer than `count` of them for very short intervals.
+    """
+    step = max((data_interval_end - data_interval_start) / count, dt.timedelta(seconds=1))
+    step = dt.timedelta(seconds=int(step.total_seconds()))
+
+    sub_ranges = []
+    sub_range_start = data_interval_start
+    for _ in range(count - 1):
+        sub_range_end = sub_range_start + step
+        if sub_range_end >= data_interval_end:
+            break
+        sub_ranges.append((sub_range_start, sub_range_end))
+        sub_range_start = sub_range_end
+
+    sub_ranges.append((sub_range_start, data_interval_end))
+    return sub_ranges
+
+
 def get_data_interval_from_workflow_inputs(inputs: S3BatchExportInputs) -> tuple[dt.datetime, dt.datetime]:
     """Return the start and end of an export's data interval.
 
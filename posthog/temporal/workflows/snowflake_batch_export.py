@@ -18,8 +18,9 @@ from posthog.temporal.workflows.base import (
     update_export_run_status,
 )
 from posthog.temporal.workflows.batch_exports import (
-    get_results_iterator,
+    get_record_batches_iterator,
     get_rows_count,
+    write_record_batch_as_jsonl,
 )
 from posthog.temporal.workflows.clickhouse import get_client
 
@@ -155,18 +156,18 @@ async def insert_into_snowflake_activity(inputs: SnowflakeInsertInputs):
                 """
             )
 
-            results_iterator = get_results_iterator(
+            results_iterator = get_record_batches_iterator(
                 client=client,
                 team_id=inputs.team_id,
                 interval_start=inputs.data_interval_start,
                 interval_end=inputs.data_interval_end,
             )
-            result = None
+            last_written_inserted_at = None
             local_results_file = tempfile.NamedTemporaryFile(suffix=".jsonl")
             try:
                 while True:
                     try:
-                        result = results_iterator.__next__()
+                        batch = results_iterator.__next__()
 
                     except StopIteration:
                         break
@@ -178,16 +179,13 @@ async def insert_into_snowflake_activity(inputs: SnowflakeInsertInputs):
                         # This is raised by aiochclient as we try to decode an error message from ClickHouse.
                         # So far, this error message only indicated that we were too slow consuming rows.
                         # So, we can resume from the last result.
-                        if result is None:
-                            # We failed right at the beginning
-                            new_interval_start = None
-                        else:
-                            new_interval_start = result.get("inserted_at", None)
+                        new_interval_start = last_written_inserted_at
 
                         if not isinstance(new_interval_start, str):
+                            # We failed right at the beginning
                             new_interval_start = inputs.data_interval_start
 
-                        results_iterator = get_results_iterator(
+                        results_iterator = get_record_batches_iterator(
                             client=client,
                             team_id=inputs.team_id,
                             interval_start=new_interval_start,  # This means we'll generate at least one duplicate.
@@ -195,12 +193,13 @@ async def insert_into_snowflake_activity(inputs: SnowflakeInsertInputs):
                         )
                         continue
 
-                    if not result:
-                        break
+                    if batch.num_rows == 0:
+                        continue
 
                     # Write the results to a local file
-                    local_results_file.write(json.dumps(result).encode("utf-8"))
-                    local_results_file.write("\n".encode("utf-8"))
+                    write_record_batch_as_jsonl(batch, local_results_file)
+                    # Results are ordered by inserted_at, so the last row is where we'd resume from.
+                    last_written_inserted_at = batch.column("inserted_at")[-1].as_py()
 
                     # Write results to Snowflake when the file reaches 50MB and
                     # reset the file, or if there is nothing else to write.
@@ -237,7 +236,9 @@ async def insert_into_snowflake_activity(inputs: SnowflakeInsertInputs):
                 for query_result in results:
                     if not isinstance(query_result, tuple):
                         # Mostly to appease mypy, as this query should always return a tuple.
-                        raise TypeError(f"Expected tuple from Snowflake COPY INTO query but got: '{type(result)}'")
+                        raise TypeError(
+                            f"Expected tuple from Snowflake COPY INTO query but got: '{type(query_result)}'"
+                        )
 
                     if len(query_result) < 2:
                         raise SnowflakeFileNotLoadedError(
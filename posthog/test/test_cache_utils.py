@@ -3,7 +3,10 @@ from time import sleep
 from typing import Optional
 from unittest.mock import Mock
 
-from posthog.cache_utils import cache_for
+from django.core.cache import cache
+from django.test import override_settings
+
+from posthog.cache_utils import LocalCache, cache_for
 from posthog.test.base import APIBaseTest
 
 mocked_dependency = Mock()
@@ -93,3 +96,64 @@ class TestCacheUtils(APIBaseTest):
             "Background task finished",
             "Post refresh call 1",
         ]
+
+
+@override_settings(LOCAL_CACHE_TTL_SECONDS=0.2, LOCAL_CACHE_MAX_SIZE=2)
+class TestLocalCache(APIBaseTest):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.local_cache = LocalCache("test")
+        self.load = Mock(side_effect=lambda: f"value {self.load.call_count}")
+
+    def test_serves_from_memory_within_ttl(self) -> None:
+        assert "value 1" == self.local_cache.get("key", self.load)
+        assert "value 1" == self.local_cache.get("key", self.load)
+        assert self.load.call_count == 1
+
+    def test_revalidates_against_version_after_ttl(self) -> None:
+        self.local_cache.bump_version("key")
+        assert "value 1" == self.local_cache.get("key", self.load)
+
+        sleep(0.3)
+        # the version in redis hasn't changed, so there's nothing to reload
+        assert "value 1" == self.local_cache.get("key", self.load)
+        assert self.load.call_count == 1
+
+        # a write from another process bumps the version...
+        cache.set("local_cache_version:test:key", "another version")
+        assert "value 1" == self.local_cache.get("key", self.load)
+
+        # ...which is picked up once the ttl expires
+        sleep(0.3)
+        assert "value 2" == self.local_cache.get("key", self.load)
+        assert self.load.call_count == 2
+
+    def test_bump_version_invalidates_local_copy(self) -> None:
+        assert "value 1" == self.local_cache.get("key", self.load)
+        self.local_cache.bump_version("key")
+        assert "value 2" == self.local_cache.get("key", self.load)
+
+    def test_does_not_cache_missing_values(self) -> None:
+        load = Mock(return_value=None)
+        assert self.local_cache.get("key", load) is None
+        assert self.local_cache.get("key", load) is None
+        assert load.call_count == 2
+
+    def test_evicts_least_recently_used_entries(self) -> None:
+        self.local_cache.get("a", self.load)
+        self.local_cache.get("b", self.load)
+        self.local_cache.get("a", self.load)
+        self.local_cache.get("c", self.load)
+        assert self.load.call_count == 3
+
+        self.local_cache.get("a", self.load)
+        assert self.load.call_count == 3
+        self.local_cache.get("b", self.load)
+        assert self.load.call_count == 4
+
+    @override_settings(LOCAL_CACHE_TTL_SECONDS=0)
+    def test_disabled_with_zero_ttl(self) -> None:
+        self.local_cache.get("key", self.load)
+        self.local_cache.get("key", self.load)
+        assert self.load.call_count == 2
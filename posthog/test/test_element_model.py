@@ -1,4 +1,13 @@
-from posthog.models.element import Element, chain_to_elements, elements_to_string
+from posthog.api.element import ElementSerializer
+from posthog.models.element import (
+    Element,
+    ParsedElement,
+    chain_to_element_dicts,
+    chain_to_elements,
+    elements_to_string,
+    parse_elements_chain,
+    parse_elements_chains,
+)
 from posthog.test.base import BaseTest, ClickhouseTestMixin
 
 
@@ -75,3 +84,38 @@ class TestElement(ClickhouseTestMixin, BaseTest):
         self.assertEqual(elements[0].tag_name, "a")
         self.assertEqual(elements[0].href, "/a-url")
         self.assertEqual(elements[0].attr_class, ["small", "xy:z"])
+
+    def test_parsed_chains_are_cached_and_serialize_like_elements(self):
+        chain = 'a.small:href="/a-url"nth-child="1"nth-of-type="0"prop="value"text="bla bla";div:attr_id="nested"'
+
+        self.assertIs(parse_elements_chain(chain), parse_elements_chain(chain))
+        self.assertEqual(
+            chain_to_element_dicts(chain), [ElementSerializer(element).data for element in chain_to_elements(chain)]
+        )
+        self.assertEqual(
+            chain_to_element_dicts(chain)[0],
+            {
+                "text": "bla bla",
+                "tag_name": "a",
+                "attr_class": ["small"],
+                "href": "/a-url",
+                "attr_id": None,
+                "nth_child": 1,
+                "nth_of_type": 0,
+                "attributes": {"prop": "value"},
+                "order": 0,
+            },
+        )
+
+        # Returned dicts are copies, the cached elements can't be changed through them
+        chain_to_element_dicts(chain)[0]["attributes"]["prop"] = "changed"
+        self.assertEqual(chain_to_elements(chain)[0].attributes, {"prop": "value"})
+
+    def test_parse_elements_chains(self):
+        chains = ["a.small", "button.btn", "a.small"]
+
+        parsed = parse_elements_chains(chains)
+
+        self.assertEqual(set(parsed.keys()), {"a.small", "button.btn"})
+        self.assertEqual(parsed["a.small"], (ParsedElement(order=0, tag_name="a", attr_class=("small",)),))
+        self.assertEqual(parsed["button.btn"], parse_elements_chain("button.btn"))
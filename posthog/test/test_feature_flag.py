@@ -4,7 +4,7 @@ from unittest.mock import patch
 
 from django.core.cache import cache
 from django.db import IntegrityError, connection
-from django.test import TransactionTestCase
+from django.test import TransactionTestCase, override_settings
 from django.utils import timezone
 import pytest
 
@@ -17,6 +17,7 @@ from posthog.models.feature_flag.flag_matching import (
     FeatureFlagMatchReason,
     FlagsMatcherCache,
     get_all_feature_flags,
+    get_compiled_feature_flags,
     get_feature_flag_hash_key_overrides,
     set_feature_flag_hash_key_overrides,
 )
@@ -1313,6 +1314,108 @@ class TestFeatureFlagMatcher(BaseTest, QueryMatchingTest):
                 FeatureFlagMatch(True, None, FeatureFlagMatchReason.SUPER_CONDITION_VALUE, 0),
             )
 
+    @override_settings(DECIDE_LOCAL_FLAG_EVALUATION_ENABLED=True)
+    def test_super_condition_with_override_properties_is_resolved_locally(self):
+        Person.objects.create(team=self.team, distinct_ids=["test_id"], properties={"email": "test@posthog.com"})
+
+        feature_flag = self.create_feature_flag(
+            filters={
+                "groups": [
+                    {"rollout_percentage": 50},
+                ],
+                "super_groups": [
+                    {
+                        "properties": [{"key": "is_enabled", "type": "person", "operator": "exact", "value": True}],
+                        "rollout_percentage": 100,
+                    },
+                ],
+            },
+        )
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                FeatureFlagMatcher([feature_flag], "test_id", property_value_overrides={"is_enabled": True}).get_match(
+                    feature_flag
+                ),
+                FeatureFlagMatch(True, None, FeatureFlagMatchReason.SUPER_CONDITION_VALUE, 0),
+            )
+            self.assertEqual(
+                FeatureFlagMatcher(
+                    [feature_flag], "example_id", property_value_overrides={"is_enabled": False}
+                ).get_match(feature_flag),
+                FeatureFlagMatch(False, None, FeatureFlagMatchReason.SUPER_CONDITION_VALUE, 0),
+            )
+
+    @override_settings(DECIDE_LOCAL_FLAG_EVALUATION_ENABLED=True)
+    def test_local_evaluation_only_queries_conditions_missing_overrides(self):
+        Person.objects.create(
+            team=self.team, distinct_ids=["test_id"], properties={"email": "test@posthog.com", "name": "Test"}
+        )
+        email_flag = self.create_feature_flag(
+            key="email-flag",
+            filters={"groups": [{"properties": [{"key": "email", "value": "test@posthog.com", "type": "person"}]}]},
+        )
+        name_flag = self.create_feature_flag(
+            key="name-flag",
+            filters={"groups": [{"properties": [{"key": "name", "value": "Test", "type": "person"}]}]},
+        )
+
+        # everything is covered by overrides, so no need to go to the database
+        with self.assertNumQueries(0):
+            matcher = FeatureFlagMatcher(
+                [email_flag, name_flag],
+                "test_id",
+                property_value_overrides={"email": "test@posthog.com", "name": "Other"},
+            )
+            self.assertEqual(
+                matcher.get_match(email_flag), FeatureFlagMatch(True, None, FeatureFlagMatchReason.CONDITION_MATCH, 0)
+            )
+            self.assertEqual(
+                matcher.get_match(name_flag),
+                FeatureFlagMatch(False, None, FeatureFlagMatchReason.NO_CONDITION_MATCH, 0),
+            )
+
+        # name isn't overridden, so only that condition goes to the database
+        matcher = FeatureFlagMatcher(
+            [email_flag, name_flag], "test_id", property_value_overrides={"email": "other@posthog.com"}
+        )
+        self.assertEqual(
+            matcher.get_match(email_flag), FeatureFlagMatch(False, None, FeatureFlagMatchReason.NO_CONDITION_MATCH, 0)
+        )
+        self.assertEqual(
+            matcher.get_match(name_flag), FeatureFlagMatch(True, None, FeatureFlagMatchReason.CONDITION_MATCH, 0)
+        )
+        self.assertEqual(matcher.query_conditions, {f"flag_{name_flag.pk}_condition_0": True})
+
+    @override_settings(LOCAL_CACHE_TTL_SECONDS=60)
+    def test_compiled_flags_are_shared_per_version_of_the_flag_cache(self):
+        feature_flag = self.create_feature_flag(
+            filters={"groups": [{"properties": [{"key": "email", "value": "test@posthog.com", "type": "person"}]}]}
+        )
+
+        compiled_flags = get_compiled_feature_flags(get_feature_flags_for_team_in_cache(self.team.pk))  # type: ignore
+        self.assertEqual(compiled_flags[feature_flag.key].condition_properties[0][0].key, "email")
+        with patch("posthog.models.feature_flag.flag_matching.compile_feature_flag") as mock_compile:
+            self.assertIs(
+                get_compiled_feature_flags(get_feature_flags_for_team_in_cache(self.team.pk))[feature_flag.key],  # type: ignore
+                compiled_flags[feature_flag.key],
+            )
+            mock_compile.assert_not_called()
+
+        # Saving the flag rewrites the team's flag cache
+        feature_flag.filters = {
+            "groups": [{"properties": [{"key": "name", "value": "Test", "type": "person"}]}],
+        }
+        feature_flag.save()
+        updated_compiled_flags = get_compiled_feature_flags(get_feature_flags_for_team_in_cache(self.team.pk))  # type: ignore
+        self.assertEqual(updated_compiled_flags[feature_flag.key].condition_properties[0][0].key, "name")
+
+        # Flags which didn't come from the cache are compiled every time
+        self.assertIsNot(
+            get_compiled_feature_flags([feature_flag])[feature_flag.key],
+            get_compiled_feature_flags([feature_flag])[feature_flag.key],
+        )
+
     def test_flag_with_variant_overrides(self):
         Person.objects.create(team=self.team, distinct_ids=["test_id"], properties={"email": "test@posthog.com"})
 
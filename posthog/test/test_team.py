@@ -1,11 +1,12 @@
 from unittest import mock
 
 from django.core.cache import cache
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
 from posthog.models import Dashboard, DashboardTile, Organization, PluginConfig, Team, User
 from posthog.models.instance_setting import override_instance_config
 from posthog.models.team import get_team_in_cache, util
+from posthog.models.team.team_caching import team_local_cache
 from posthog.plugins.test.mock import mocked_plugin_requests_get
 from posthog.utils import PersonOnEventsMode
 
@@ -18,6 +19,7 @@ class TestModelCache(TestCase):
     def setUp(self):
         super().setUp()
         cache.clear()
+        team_local_cache.clear()
 
     def test_save_updates_cache(self):
         api_token = "test_token"
@@ -56,6 +58,44 @@ class TestModelCache(TestCase):
         cached_team = get_team_in_cache(api_token)
         assert cached_team is None
 
+    @override_settings(LOCAL_CACHE_TTL_SECONDS=60)
+    def test_save_updates_local_cache(self):
+        api_token = "test_token"
+        org = Organization.objects.create(name="org name")
+        team = Team.objects.create(organization=org, api_token=api_token, test_account_filters=[])
+
+        cached_team = get_team_in_cache(api_token)
+        assert cached_team is not None
+        self.assertEqual(cached_team.name, "Default Project")
+
+        with mock.patch("posthog.models.team.team_caching.cache.get") as mock_cache_get:
+            # served from the local tier without hitting redis, and as a new instance every time
+            self.assertEqual(get_team_in_cache(api_token).name, "Default Project")  # type: ignore
+            self.assertIsNot(get_team_in_cache(api_token), cached_team)
+            mock_cache_get.assert_not_called()
+
+        team.name = "New name"
+        team.save()
+
+        cached_team = get_team_in_cache(api_token)
+        assert cached_team is not None
+        self.assertEqual(cached_team.name, "New name")
+
+        team.delete()
+        assert get_team_in_cache(api_token) is None
+
+    @override_settings(LOCAL_CACHE_TTL_SECONDS=60)
+    def test_mutating_team_from_local_cache_does_not_change_cache(self):
+        api_token = "test_token"
+        org = Organization.objects.create(name="org name")
+        Team.objects.create(organization=org, api_token=api_token, test_account_filters=[])
+
+        cached_team = get_team_in_cache(api_token)
+        assert cached_team is not None
+        cached_team.test_account_filters.append({"key": "email", "value": "@posthog.com", "type": "person"})
+
+        self.assertEqual(get_team_in_cache(api_token).test_account_filters, [])  # type: ignore
+
 
 class TestTeam(BaseTest):
     def test_team_has_expected_defaults(self):